@@ -19,13 +19,23 @@ function Chatbot({ token, sessionId, setSessionId, isOpen, setIsOpen }) {
     const [loading, setLoading] = useState(false);
     const [isExpanded, setIsExpanded] = useState(false);
     const [sessionsList, setSessionsList] = useState([]);
+    const [sessionsCursor, setSessionsCursor] = useState(null);
+    const [historyBefore, setHistoryBefore] = useState(null);
     const chatRef = useRef(null);
 
-    const loadSessions = async () => {
+    // cursor: next_cursor of the last page loaded, or null for the first page
+    const loadSessions = async (cursor = null) => {
         try {
             const headers = token ? { Authorization: `Bearer ${token}` } : {};
-            const res = await axios.get('http://localhost:8000/sessions', { headers });
-            setSessionsList(res.data);
+            const params = cursor ? { cursor } : {};
+            const res = await axios.get('http://localhost:8000/sessions', { headers, params });
+            const page = res.data.sessions;
+            setSessionsList(prev => {
+                if (!cursor) return page;
+                const seen = new Set(prev.map(s => s.session_id));
+                return [...prev, ...page.filter(s => !seen.has(s.session_id))];
+            });
+            setSessionsCursor(res.data.next_cursor);
         } catch (err) {
             console.error('Failed to load sessions', err);
         }
@@ -38,12 +48,28 @@ function Chatbot({ token, sessionId, setSessionId, isOpen, setIsOpen }) {
             const headers = token ? { Authorization: `Bearer ${token}` } : {};
             const res = await axios.get(`http://localhost:8000/session/${sid}/history`, { headers });
             setMessages(res.data.messages);
+            setHistoryBefore(res.data.next_before);
         } catch (err) {
             console.error('Failed to load session history', err);
         }
         setLoading(false);
     };
 
+    // history is paged newest first; this prepends the page before the oldest loaded message
+    const loadEarlierHistory = async () => {
+        try {
+            const headers = token ? { Authorization: `Bearer ${token}` } : {};
+            const res = await axios.get(`http://localhost:8000/session/${sessionId}/history`, {
+                headers,
+                params: { before: historyBefore },
+            });
+            setMessages((prev) => [...res.data.messages, ...prev]);
+            setHistoryBefore(res.data.next_before);
+        } catch (err) {
+            console.error('Failed to load earlier messages', err);
+        }
+    };
+
     useEffect(() => {
         // Fetch sessions whenever expanded view is opened or a new session is created
         if (isExpanded) {
@@ -64,6 +90,7 @@ function Chatbot({ token, sessionId, setSessionId, isOpen, setIsOpen }) {
             const sess = await axios.post('http://localhost:8000/session/new', {}, { headers });
             setSessionId(sess.data.session_id);
             setMessages([]);
+            setHistoryBefore(null);
         } catch (err) {
             console.error(err);
         }
@@ -199,10 +226,15 @@ function Chatbot({ token, sessionId, setSessionId, isOpen, setIsOpen }) {
                                 >
                                     <MessageOutlined />
                                     <span className="session-id-text">
-                                        Session {s.session_id.split('-')[0]}
+                                        {s.title || `Session ${s.session_id.split('-')[0]}`}
                                     </span>
                                 </div>
                             ))}
+                            {sessionsCursor && (
+                                <Button type="text" block onClick={() => loadSessions(sessionsCursor)}>
+                                    Load more
+                                </Button>
+                            )}
                         </div>
                     </div>
                 )}
@@ -249,6 +281,11 @@ function Chatbot({ token, sessionId, setSessionId, isOpen, setIsOpen }) {
                                 <div style={{ color: 'var(--text-secondary)', fontSize: '13px', maxWidth: 240 }}>Ask me anything about your CSR campaigns, impact data, or sustainability goals.</div>
                             </div>
                         )}
+                        {historyBefore && (
+                            <Button type="text" block onClick={loadEarlierHistory}>
+                                Load earlier messages
+                            </Button>
+                        )}
                         {messages.map((msg, i) => renderMessage(msg, i))}
                         {loading && (
                             <div className="chat-message assistant">
@@ -5,20 +5,44 @@ import sys
 ROOT_DIR = Path(__file__).resolve().parent
 sys.path.insert(0, str(ROOT_DIR))
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
+import asyncio
+import re
 import uuid
 
-from app.schema.selector import select_schema
-from app.schema.builder import build_schema
-from app.llm.text_to_sql import generate_sql
-from app.llm.formatter import format_result
-from app.llm.intent_detector import detect_intent, get_conversational_response
-from app.security.sql_guard import validate_sql
-from app.db.executor import execute_sql
-from app.memory.chat_store import init_db, save_message
-from app.memory.context_builder import build_context
+import pandas as pd
+
+from app.llm.formatter import aformat_result, astream_format_result
+from app.db.executor import astream_sql, wants_all
+from app.config.settings import settings
+from app.llm.factory import close_llms, warmup_llm
+from app.llm.intent_detector import close_intent_log, intent_stats
+from app.llm.summarizer import summarizer_stats
+from app.llm.sql_templates import template_stats
+from app.llm.sql_cache import sql_cache
+from app.db.result_cache import result_cache
+from app.db.dimensions import DIMENSIONS, dimension_cache
+from app.db.statements import statement_registry
+from app.db.cost_gate import cost_gate
+from app.schema.embedding_cache import question_embedding_cache
+from app.export.exporter import EXPORT_FORMATS, export_manager, query_log
+from app.db.connection import get_pool_stats, close_all_pools, close_all_async_pools
+from app.memory.chat_store import init_db, asave_message
+from app.memory.history_writer import history_writer
+from app.memory.store_factory import close_chat_store
+from app.memory.context_cache import context_cache
+from app.pipeline.question_pipeline import (
+    QUESTION_PIPELINE, executable_sql, plan_question, rejected_answer, run_question, split_answer, streams,
+)
+from app.utils.serialization import (
+    ARROW_STREAM, COLUMNAR_JSON, ROWS_JSON, arrow_ipc, columnar_data, dumps, negotiate, rows_data,
+)
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
 
 app = FastAPI()
 
@@ -35,6 +59,26 @@ app.add_middleware(
 # initialize chat database on import
 init_db()
 
+
+@app.on_event("startup")
+async def startup():
+    # drop export artifacts past EXPORT_MAX_AGE or over the EXPORT_MAX_BYTES budget
+    await asyncio.to_thread(export_manager.reap, True)
+    if settings.LLM_WARMUP:
+        await warmup_llm()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await close_llms()
+    await close_all_async_pools()
+    await asyncio.to_thread(history_writer.close)
+    close_chat_store()
+    close_intent_log()
+    close_all_pools()
+    question_embedding_cache.save()
+    export_manager.shutdown()
+
 from typing import Any, List, Dict, Optional
 
 class LoginRequest(BaseModel):
@@ -56,8 +100,12 @@ class QueryResponse(BaseModel):
     data: Optional[List[Dict[str, Any]]] = None
     columns: Optional[List[str]] = None
     sql: Optional[str] = None
+    sql_source: Optional[str] = None  # template | cache | llm
+    query_id: Optional[str] = None  # pass to /export for the full result
     graphData: Optional[List[Dict[str, Any]]] = None
     hint: Optional[str] = None
+    truncated: Optional[bool] = None
+    total_rows_estimate: Optional[int] = None
 
 
 @app.post("/login", response_model=LoginResponse)
@@ -68,7 +116,6 @@ def login(req: LoginRequest):
         # could store user->tokens mapping if needed
         return {"token": token}
     else:
-        from fastapi import HTTPException
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
 
@@ -79,77 +126,417 @@ def new_session():
 
 
 @app.get("/sessions")
-def get_sessions():
-    from app.memory.chat_store import get_all_sessions
-    return get_all_sessions()
+def get_sessions(limit: Optional[int] = None, cursor: Optional[str] = None):
+    """
+    Sessions by most recent activity, one page at a time: pass the
+    `next_cursor` of a page as `cursor` to get the next one.
+    """
+    from app.memory.chat_store import get_sessions as get_sessions_page
+    try:
+        return get_sessions_page(limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @app.get("/session/{session_id}/history")
-def get_session_history(session_id: str):
-    from app.memory.chat_store import get_history
-    rows = get_history(session_id)
-    messages = []
-    for r in rows:
-        messages.append({
-            "role": r[0],
-            "text": r[1]
-        })
-    return {"messages": messages}
+def get_session_history(
+    session_id: str,
+    limit: Optional[int] = None,
+    before: Optional[int] = None,
+    if_none_match: Optional[str] = Header(None),
+):
+    """
+    The newest `limit` messages of a session, oldest first. Pass
+    `next_before` as `before` for the page before it. Answers 304 when
+    If-None-Match matches the page's ETag.
+    """
+    from app.memory.chat_store import get_history_page
+    page = get_history_page(session_id, limit=limit, before=before)
+    headers = {"ETag": page["etag"], "Cache-Control": "private, no-cache"}
+    if if_none_match and page["etag"] in (tag.strip().removeprefix("W/") for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+
+    payload = {
+        "messages": [{"role": role, "text": text} for role, text in page["messages"]],
+        "next_before": page["next_before"],
+    }
+    return Response(dumps(payload), media_type=ROWS_JSON, headers=headers)
+
+@app.get("/metrics/pools")
+def pool_metrics():
+    """Connection pool wait-time and utilization stats."""
+    return {"pools": get_pool_stats()}
+
+@app.get("/metrics/cache")
+def cache_metrics():
+    """Hit-rate and eviction stats for the in-process caches."""
+    return {
+        "sql": sql_cache.stats(),
+        "results": result_cache.stats(),
+        "embeddings": question_embedding_cache.stats(),
+        "exports": export_manager.stats(),
+    }
+
+
+class InvalidateRequest(BaseModel):
+    tables: Optional[List[str]] = None
+
+
+@app.post("/cache/invalidate")
+def invalidate_cache(req: InvalidateRequest):
+    """Hook for sync/ETL jobs: drop cached results reading the given tables (all if omitted)."""
+    if req.tables:
+        dropped = result_cache.invalidate_tables(req.tables)
+    else:
+        dropped = result_cache.clear()
+    dimension_tables = {table for sources in DIMENSIONS.values() for table, _ in sources}
+    if not req.tables or dimension_tables & {t.lower().split(".")[-1] for t in req.tables}:
+        dimension_cache.invalidate()
+    return {"invalidated": dropped}
+
+@app.get("/metrics/intent")
+def intent_metrics():
+    """How intents were decided: keywords, the local model, or the LLM."""
+    return intent_stats()
+
+@app.get("/metrics/insights")
+def insight_metrics():
+    """How many results were explained locally, per shape, instead of by the LLM."""
+    return summarizer_stats()
+
+@app.get("/metrics/templates")
+def template_metrics():
+    """SQL template hits per template vs questions sent to the LLM, and cached dimension sizes."""
+    return template_stats()
+
+@app.get("/metrics/statements")
+def statement_metrics(top: int = 20):
+    """Executed statement shapes (literals replaced by $n) by total time, with prepare/fallback counts."""
+    return statement_registry.stats(top=top)
+
+
+@app.get("/metrics/cost")
+def cost_metrics():
+    """EXPLAIN cost gate: thresholds and how many queries each rule allowed, capped, streamed or rejected."""
+    return cost_gate.stats()
+
+
+@app.get("/metrics/history")
+def history_metrics():
+    """Write-behind chat history: queued and written messages, batch sizes and flush times."""
+    return history_writer.stats()
+
+
+@app.get("/metrics/context")
+def context_metrics():
+    """Per-session context cache: cached sessions, memory use, hit rate and evictions."""
+    return context_cache.stats()
+
+@app.get("/metrics/pipeline")
+def pipeline_metrics():
+    """Per-stage timing stats for the question pipeline."""
+    return QUESTION_PIPELINE.stats()
+
+
+def _result_response(payload: dict, df, media_type: str) -> Response:
+    """Encode a query payload and its rows in the negotiated wire format."""
+    headers = {"Vary": "Accept"}
+    if media_type == ARROW_STREAM:
+        frame = df if df is not None else pd.DataFrame()
+        return Response(arrow_ipc(frame, payload), media_type=ARROW_STREAM, headers=headers)
+
+    if df is not None and not df.empty:
+        payload["columns"] = df.columns.tolist()
+        payload["data"] = columnar_data(df) if media_type == COLUMNAR_JSON else rows_data(df)
+    return Response(dumps(payload), media_type=media_type, headers=headers)
+
 
 @app.post("/query", response_model=QueryResponse)
-def query(req: QueryRequest):
+async def query(req: QueryRequest, accept: Optional[str] = Header(None)):
     """Endpoint used by the React frontend to submit a natural language question.
-    The implementation mirrors the logic in `app/main.py` but runs synchronously.
+    Runs the shared question pipeline (see app/pipeline/question_pipeline.py),
+    the same one `main.py` uses. Questions asking for all data are streamed
+    (see _stream_all_rows) so worker memory does not grow with the result,
+    and so are queries the cost gate expects to return too many rows.
+
+    The Accept header selects the result encoding: row JSON (default),
+    columnar JSON or an Arrow IPC stream (see app/utils/serialization.py).
+    Streamed results are only written as row JSON, so a request that asks
+    for another format gets 406; for the cost-gate case the detail carries
+    the query_id, which /export can write as Parquet instead.
     """
 
     session_id = req.session_id or str(uuid.uuid4())
     question = req.question.strip()
+    media_type = negotiate(accept)
+
+    if wants_all(question):
+        if media_type != ROWS_JSON:
+            raise HTTPException(status_code=406, detail=_NOT_STREAMABLE)
+        return _streaming_response(_stream_all_rows(question, session_id))
+
+    run = await plan_question(question, session_id)
+    if streams(run):
+        if media_type != ROWS_JSON:
+            raise HTTPException(
+                status_code=406, detail={"message": _NOT_STREAMABLE, "query_id": _record_query(run.results)},
+            )
+        return _streaming_response(_stream_all_rows(question, session_id, run))
+    payload, df = await run_question(question, session_id, run)
+    if df is not None:
+        payload["query_id"] = _record_query(run.results)
+    return _result_response(payload, df, media_type)
+
+
+_NOT_STREAMABLE = (
+    f"This result is streamed and is only available as {ROWS_JSON}; "
+    "request that format, or export the query with /export"
+)
+
+
+def _streaming_response(body) -> StreamingResponse:
+    return StreamingResponse(body, media_type=ROWS_JSON, headers={"Vary": "Accept"})
+
+
+def _record_query(results) -> str:
+    """Remember the statement a question ran so /export can re-run it by query id."""
+    return query_log.record(*executable_sql(results))
+
 
-    # save user message
-    save_message(session_id, "user", question)
-
-    context = build_context(session_id)
-    intent = detect_intent(question)
-
-    if intent == "conversation":
-        reply = get_conversational_response(question, context)
-        save_message(session_id, "assistant", reply)
-        return {"answer": reply}
-
-    # database query flow
-    schema_keys = select_schema(question)
-    schema = build_schema(schema_keys)
-    sql = generate_sql(question, schema, context)
-
-    validate_sql(sql)
-    df = execute_sql(sql, question)
-
-    answer = format_result(df, question)
-    # look for optional hints or graph payload inside answer text
-    hint = None
-    graph_data = None
-    # simple marker-based parsing
-    if "GRAPH_DATA:" in answer:
-        parts = answer.split("GRAPH_DATA:")
-        answer = parts[0].strip()
-        try:
-            import json
-            graph_data = json.loads(parts[1].strip())
-        except Exception:
-            graph_data = None
-    if "HINT:" in answer:
-        parts = answer.split("HINT:")
-        answer = parts[0].strip()
-        hint = parts[1].strip()
-
-    save_message(session_id, "assistant", answer)
-
-    result: dict = {"answer": answer, "sql": sql}
+def _ndjson(event: str, **payload) -> str:
+    return _json({"event": event, **payload}) + "\n"
+
+
+def _extend_preview(preview: list, batch: list):
+    """Keep only the first MAX_ROWS streamed rows for the insight text."""
+    room = settings.MAX_ROWS - len(preview)
+    if room > 0:
+        preview.extend(batch[:room])
+
+
+def _json(value) -> str:
+    return dumps(value).decode("utf-8")
+
+
+async def _stream_all_rows(question: str, session_id: str, run=None):
+    """
+    /query for questions that ask for all data. The body is the usual
+    QueryResponse object, but `data` is written batch by batch from a
+    server-side cursor instead of being built in memory; `answer` comes last
+    because it is generated from a MAX_ROWS preview once all rows are sent.
+    `run` is a plan_question run to continue from.
+    """
+    try:
+        if run is None:
+            run = await plan_question(question, session_id, streaming=True)
+        if "reply" in run.results:
+            reply = run.results["reply"]
+            await asave_message(session_id, "assistant", reply)
+            body = {"answer": reply}
+        elif run.results["plan"].action == "reject":
+            body = await rejected_answer(run.results, session_id)
+        else:
+            body = None
+            sql, params = executable_sql(run.results)
+            query_id = _record_query(run.results)
+    except Exception as e:
+        # the response has already started, so errors become the answer text
+        logger.error(f"Query failed: {e}")
+        yield _json({"answer": f"Error: {e}"})
+        return
+    if body is not None:
+        yield _json(body)
+        return
+
+    plan = run.results["plan"]
+    yield (
+        '{"sql": ' + _json(run.results["sql"]) + ', "sql_source": ' + _json(run.results.get("sql_source"))
+        + ', "query_id": ' + _json(query_id)
+    )
+
+    columns = None
+    preview = []
+    info = {}
+    first = True
+    try:
+        async for batch_columns, batch in astream_sql(sql, question, info=info, params=params, plan=plan):
+            if columns is None:
+                columns = batch_columns
+                yield ', "columns": ' + _json(columns) + ', "data": ['
+            if batch:
+                _extend_preview(preview, batch)
+                rows = ", ".join(_json(dict(zip(columns, r))) for r in batch)
+                yield rows if first else ", " + rows
+                first = False
+        if columns is None:
+            columns = []
+            yield ', "columns": [], "data": ['
+
+        df = pd.DataFrame.from_records(preview, columns=columns)
+        total_rows = info.get("total_rows_estimate")
+        answer, hint, graph_data = split_answer(await aformat_result(df, question, total_rows))
+        await asave_message(session_id, "assistant", answer)
+    except Exception as e:
+        # the rows may be half written: close the array and the document
+        # with the error as the answer so the body stays valid JSON
+        logger.error(f"Streaming all rows failed: {e}")
+        yield ("]" if columns is not None else "") + ', "answer": ' + _json(f"Error: {e}") + "}"
+        return
+
+    tail = {"answer": answer, "truncated": info.get("truncated", False), "total_rows_estimate": total_rows}
     if hint:
-        result["hint"] = hint
+        tail["hint"] = hint
     if graph_data:
-        result["graphData"] = graph_data
-    if not df.empty:
-        result["columns"] = df.columns.tolist()
-        result["data"] = df.to_dict(orient="records")
-    return result
+        tail["graphData"] = graph_data
+    yield "], " + _json(tail)[1:]
+
+
+async def _stream_query(req: QueryRequest):
+    """
+    Same pipeline as /query, emitted as NDJSON events while it runs:
+
+        {"event": "session", "session_id": ...}
+        {"event": "intent", "intent": "database" | "conversation"}
+        {"event": "sql", "sql": ...}
+        {"event": "columns", "columns": [...]}
+        {"event": "rows", "data": [{...}, ...]}          (one per cursor batch)
+        {"event": "insight", "delta": "..."}            (one per LLM token chunk)
+        {"event": "done", "answer": ..., "hint": ..., "graphData": ...,
+         "truncated": ..., "total_rows_estimate": ..., "sql_source": ...,
+         "query_id": ...}
+        {"event": "error", "detail": ...}               (terminates the stream)
+
+    Queries rejected by the cost gate end with "done" carrying the reason
+    as `answer` and a `hint`, without columns or rows.
+    """
+    session_id = req.session_id or str(uuid.uuid4())
+    question = req.question.strip()
+    yield _ndjson("session", session_id=session_id)
+
+    try:
+        # Shared pipeline up to SQL generation; rows and insight text are
+        # streamed here instead of going through the result/answer stages.
+        run = None
+        async for name, value in QUESTION_PIPELINE.iter_run(
+            {"question": question, "session_id": session_id, "streaming": True},
+            targets=("save_question", "reply", "plan"),
+        ):
+            if name == "intent":
+                yield _ndjson("intent", intent=value)
+            elif name == "sql":
+                yield _ndjson("sql", sql=value)
+            elif name == "__run__":
+                run = value
+
+        if "reply" in run.results:
+            reply = run.results["reply"]
+            await asave_message(session_id, "assistant", reply)
+            yield _ndjson("insight", delta=reply)
+            yield _ndjson("done", answer=reply)
+            return
+
+        sql, params = executable_sql(run.results)
+        plan = run.results["plan"]
+        if plan.action == "reject":
+            rejected = await rejected_answer(run.results, session_id)
+            yield _ndjson("insight", delta=rejected["answer"])
+            yield _ndjson("done", answer=rejected["answer"], hint=rejected["hint"], sql_source=rejected["sql_source"])
+            return
+
+        columns = None
+        preview = []
+        info = {}
+        async for batch_columns, batch in astream_sql(sql, question, info=info, params=params, plan=plan):
+            if columns is None:
+                columns = batch_columns
+                yield _ndjson("columns", columns=columns)
+            if batch:
+                _extend_preview(preview, batch)
+                yield _ndjson("rows", data=[dict(zip(columns, r)) for r in batch])
+
+        df = pd.DataFrame.from_records(preview, columns=columns)
+
+        chunks = []
+        async for chunk in astream_format_result(df, question, info.get("total_rows_estimate")):
+            chunks.append(chunk)
+            yield _ndjson("insight", delta=chunk)
+
+        answer, hint, graph_data = split_answer("".join(chunks))
+        await asave_message(session_id, "assistant", answer)
+
+        yield _ndjson(
+            "done", answer=answer, hint=hint, graphData=graph_data,
+            truncated=info.get("truncated", False), total_rows_estimate=info.get("total_rows_estimate"),
+            sql_source=run.results.get("sql_source"), query_id=_record_query(run.results),
+        )
+
+    except Exception as e:
+        logger.error(f"Streaming query failed: {e}")
+        yield _ndjson("error", detail=str(e))
+
+
+@app.post("/query/stream")
+async def query_stream(req: QueryRequest):
+    """Streaming variant of /query (NDJSON); /query keeps the QueryResponse shape."""
+    return StreamingResponse(_stream_query(req), media_type="application/x-ndjson")
+
+
+class ExportRequest(BaseModel):
+    query_id: str  # from a /query response
+    format: str = "xlsx"  # xlsx | csv | parquet
+
+
+def _export_file(eid: str, path):
+    fmt = path.suffix.lstrip(".")
+    return FileResponse(path, media_type=EXPORT_FORMATS[fmt], filename=f"query_result_{eid[:12]}.{fmt}")
+
+
+def _export_pending(eid: str):
+    return JSONResponse(
+        {"export_id": eid, "status": "running", "url": f"/export/{eid}"}, status_code=202
+    )
+
+
+async def _wait_for_export(eid: str, future):
+    """Serve the file if the export finishes within EXPORT_WAIT, otherwise 202."""
+    if future is not None:
+        done, _ = await asyncio.wait({asyncio.wrap_future(future)}, timeout=settings.EXPORT_WAIT)
+        if not done:
+            return _export_pending(eid)
+        error = future.exception()
+        if error is not None:
+            status = 400 if isinstance(error, ValueError) else 500
+            raise HTTPException(status_code=status, detail=f"Export failed: {error}")
+    path = export_manager.find(eid)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Export not found or expired")
+    return _export_file(eid, path)
+
+
+@app.post("/export")
+async def export(req: ExportRequest):
+    """
+    Export the full result of a query (the `query_id` returned by /query)
+    as XLSX, CSV or Parquet. The statement recorded for that id is run
+    again; SQL is never taken from the client. Files are written in a
+    background worker and keyed by SQL hash, so repeating a download is
+    served from disk. Exports that take longer than EXPORT_WAIT return 202
+    with a URL to poll.
+    """
+    if req.format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported export format: {req.format}")
+    query = query_log.get(req.query_id)
+    if query is None:
+        raise HTTPException(status_code=404, detail="Query not found or expired; run it again with /query")
+
+    sql, params = query
+    eid, future = export_manager.submit(sql, req.format, params)
+    return await _wait_for_export(eid, future)
+
+
+@app.get("/export/{export_id}")
+async def export_status(export_id: str):
+    """Download a finished export, or 202 while it is still being written."""
+    if not re.fullmatch(r"[0-9a-f]{32}", export_id):
+        raise HTTPException(status_code=404, detail="Export not found or expired")
+    return await _wait_for_export(export_id, export_manager.job(export_id))
@@ -21,6 +21,44 @@ class Settings:
     GROK_API_URL = os.getenv("GROK_API_URL")
     GROK_MODEL = os.getenv("GROK_MODEL")
 
+    OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None  # proxy / compatible endpoint
+
+    # Shared HTTP connection pools for LLM clients
+    LLM_HTTP2 = os.getenv("LLM_HTTP2", "true").lower() == "true"  # needs the h2 package
+    LLM_HTTP_TIMEOUT = float(os.getenv("LLM_HTTP_TIMEOUT", 60))
+    LLM_HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", 100))
+    LLM_HTTP_MAX_KEEPALIVE = int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", 20))
+    LLM_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY", 120))  # idle seconds
+    LLM_WARMUP = os.getenv("LLM_WARMUP", "false").lower() == "true"  # open connections at API startup
+
+    # Local intent classifier (tools/train_intent_model.py)
+    INTENT_MODEL_FILE = os.getenv("INTENT_MODEL_FILE", "intent_model.npz")  # under server/data/
+    INTENT_THRESHOLD = float(os.getenv("INTENT_THRESHOLD", 0.8))  # below this confidence the LLM decides
+    INTENT_LOG_FILE = os.getenv("INTENT_LOG_FILE", "")  # opt-in training data log (stores user questions), e.g. intent_log.jsonl
+    INTENT_LOG_MAX_BYTES = int(os.getenv("INTENT_LOG_MAX_BYTES", 10 * 1024 * 1024))  # rotated past this size
+    INTENT_LOG_BACKUPS = int(os.getenv("INTENT_LOG_BACKUPS", 3))  # rotated files kept
+
+    # Prepared statements (app/db/statements.py)
+    PREPARED_STATEMENTS_ENABLED = os.getenv("PREPARED_STATEMENTS_ENABLED", "true").lower() == "true"  # parameterize literals
+    PREPARED_STATEMENT_CACHE_SIZE = int(os.getenv("PREPARED_STATEMENT_CACHE_SIZE", 100))  # per pooled connection
+    STATEMENT_STATS_MAX_SHAPES = int(os.getenv("STATEMENT_STATS_MAX_SHAPES", 500))
+
+    # Parameterized SQL templates (app/llm/sql_templates.py)
+    SQL_TEMPLATES_ENABLED = os.getenv("SQL_TEMPLATES_ENABLED", "true").lower() == "true"
+    DIMENSION_CACHE_TTL = float(os.getenv("DIMENSION_CACHE_TTL", 3600))  # seconds between reloads of state/year/project names
+    DIMENSION_CACHE_MAX_VALUES = int(os.getenv("DIMENSION_CACHE_MAX_VALUES", 10000))  # per dimension
+
+    # Local insights for simple result shapes (app/llm/summarizer.py)
+    FAST_INSIGHTS_ENABLED = os.getenv("FAST_INSIGHTS_ENABLED", "true").lower() == "true"
+    FAST_INSIGHTS_MAX_GROUPS = int(os.getenv("FAST_INSIGHTS_MAX_GROUPS", 50))  # larger breakdowns go to the LLM
+    FAST_INSIGHTS_TOP_K = int(os.getenv("FAST_INSIGHTS_TOP_K", 3))
+    FAST_INSIGHTS_WIDE_COLUMNS = int(os.getenv("FAST_INSIGHTS_WIDE_COLUMNS", 8))
+
+    # Batched embeddings (schema indexing)
+    EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", 256))  # texts per request, capped per provider
+    EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", 4))  # requests in flight
+    EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", 6))
+
     # DB
     DB_HOST = os.getenv("DB_HOST")
     DB_PORT = int(os.getenv("DB_PORT", 5432))
@@ -28,7 +66,92 @@ class Settings:
     DB_USER = os.getenv("DB_USER")
     DB_PASSWORD = os.getenv("DB_PASSWORD")
 
+    # Vector store (semantic_schema_registry); defaults to the main database
+    VECTOR_DB_HOST = os.getenv("VECTOR_DB_HOST") or DB_HOST
+    VECTOR_DB_PORT = int(os.getenv("VECTOR_DB_PORT") or DB_PORT)
+    VECTOR_DB_NAME = os.getenv("VECTOR_DB_NAME") or DB_NAME
+    VECTOR_DB_USER = os.getenv("VECTOR_DB_USER") or DB_USER
+    VECTOR_DB_PASSWORD = os.getenv("VECTOR_DB_PASSWORD") or DB_PASSWORD
+
+    # Connection pools (chat history writes, analytics queries, vector lookup)
+    DB_POOL_CHAT_MIN = int(os.getenv("DB_POOL_CHAT_MIN", 1))
+    DB_POOL_CHAT_MAX = int(os.getenv("DB_POOL_CHAT_MAX", 5))
+    DB_POOL_ANALYTICS_MIN = int(os.getenv("DB_POOL_ANALYTICS_MIN", 1))
+    DB_POOL_ANALYTICS_MAX = int(os.getenv("DB_POOL_ANALYTICS_MAX", 10))
+    DB_POOL_VECTOR_MIN = int(os.getenv("DB_POOL_VECTOR_MIN", 1))
+    DB_POOL_VECTOR_MAX = int(os.getenv("DB_POOL_VECTOR_MAX", 5))
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 5))  # seconds to wait for a free connection
+    DB_POOL_HEALTHCHECK_INTERVAL = float(os.getenv("DB_POOL_HEALTHCHECK_INTERVAL", 30))  # idle seconds before ping
+    DB_POOL_RECYCLE = float(os.getenv("DB_POOL_RECYCLE", 1800))  # max connection lifetime in seconds
+
+    # Semantic cache in front of SQL generation
+    SQL_CACHE_ENABLED = os.getenv("SQL_CACHE_ENABLED", "true").lower() == "true"
+    SQL_CACHE_SIMILARITY = float(os.getenv("SQL_CACHE_SIMILARITY", 0.95))  # cosine similarity threshold
+    SQL_CACHE_MAX_ENTRIES = int(os.getenv("SQL_CACHE_MAX_ENTRIES", 1000))
+    SQL_CACHE_TTL = float(os.getenv("SQL_CACHE_TTL", 3600))  # seconds
+
+    # Question embedding cache used by the schema selector
+    EMBED_CACHE_MAX_ENTRIES = int(os.getenv("EMBED_CACHE_MAX_ENTRIES", 5000))
+    EMBED_CACHE_PERSIST = os.getenv("EMBED_CACHE_PERSIST", "true").lower() == "true"
+    EMBED_CACHE_FILE = os.getenv("EMBED_CACHE_FILE", "question_embeddings.pkl")  # under server/data/
+
+    # Schema sync (tools/incremental_schema_sync.py)
+    SCHEMA_SYNC_SCHEMAS = os.getenv("SCHEMA_SYNC_SCHEMAS", "public")  # comma-separated
+    SCHEMA_SYNC_EXCLUDE = os.getenv("SCHEMA_SYNC_EXCLUDE", "semantic_schema_registry,chat_history")
+
+    # Query result cache (keyed on canonical SQL, invalidated per table)
+    RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "true").lower() == "true"
+    RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+    RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", 300))  # default seconds per entry
+    RESULT_CACHE_TABLE_TTLS = os.getenv("RESULT_CACHE_TABLE_TTLS", "")  # e.g. "csr_expenditure_view=900,budgets=60"
+
+    # File exports (/export): content-addressed artifacts reaped by age and total size
+    EXPORT_DIR = os.getenv("EXPORT_DIR", "")  # defaults to tmp/ at the repository root
+    EXPORT_MAX_ROWS = int(os.getenv("EXPORT_MAX_ROWS", 1_000_000))  # 0 = no limit
+    EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 5000))  # rows per cursor fetch
+    EXPORT_PARQUET_ROW_GROUP = int(os.getenv("EXPORT_PARQUET_ROW_GROUP", 50_000))
+    EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", 2))
+    EXPORT_WAIT = float(os.getenv("EXPORT_WAIT", 10))  # seconds before /export answers 202 and keeps going
+    EXPORT_REUSE_TTL = float(os.getenv("EXPORT_REUSE_TTL", 300))  # seconds an artifact is served again
+    EXPORT_MAX_AGE = float(os.getenv("EXPORT_MAX_AGE", 24 * 3600))  # seconds before an artifact is reaped
+    EXPORT_MAX_BYTES = int(os.getenv("EXPORT_MAX_BYTES", 1024 * 1024 * 1024))
+    EXPORT_QUERY_TTL = float(os.getenv("EXPORT_QUERY_TTL", 3600))  # seconds a /query result's query_id can be exported
+    EXPORT_QUERY_MAX_ENTRIES = int(os.getenv("EXPORT_QUERY_MAX_ENTRIES", 10_000))  # recorded query ids kept
+
     MAX_ROWS = int(os.getenv("MAX_ROWS", 500))
     QUERY_TIMEOUT = int(os.getenv("QUERY_TIMEOUT", 10))
+    STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", 100))  # rows per streamed batch
+
+    # EXPLAIN cost gate run before each query (app/db/cost_gate.py); 0 disables a rule
+    COST_GATE_ENABLED = os.getenv("COST_GATE_ENABLED", "true").lower() == "true"
+    COST_GATE_MAX_COST = float(os.getenv("COST_GATE_MAX_COST", 10_000_000))  # planner cost units; above: rejected
+    COST_GATE_MAX_ROWS = int(os.getenv("COST_GATE_MAX_ROWS", 200_000))  # cap for "all data" queries expected above this
+    COST_GATE_STREAM_ROWS = int(os.getenv("COST_GATE_STREAM_ROWS", 50_000))  # larger results are streamed, not built in memory
+
+    # Chat history store: "postgres" (CHAT_POOL) or "sqlite" (local file, single node)
+    CHAT_STORE_BACKEND = os.getenv("CHAT_STORE_BACKEND", "postgres")
+    CHAT_SQLITE_PATH = os.getenv("CHAT_SQLITE_PATH", "chat_history.db")  # under server/data/
+    CHAT_SQLITE_STATEMENT_CACHE = int(os.getenv("CHAT_SQLITE_STATEMENT_CACHE", 128))  # compiled statements per connection
+    CHAT_SQLITE_BUSY_TIMEOUT = float(os.getenv("CHAT_SQLITE_BUSY_TIMEOUT", 5))  # seconds to wait for a lock
+
+    # Write-behind chat history (app/memory/history_writer.py)
+    CHAT_WRITE_BEHIND = os.getenv("CHAT_WRITE_BEHIND", "true").lower() == "true"
+    CHAT_WRITE_BATCH_SIZE = int(os.getenv("CHAT_WRITE_BATCH_SIZE", 100))  # messages per INSERT / commit
+    CHAT_WRITE_FLUSH_INTERVAL = float(os.getenv("CHAT_WRITE_FLUSH_INTERVAL", 0.05))  # seconds a message waits for a batch
+    CHAT_WRITE_MAX_PENDING = int(os.getenv("CHAT_WRITE_MAX_PENDING", 10_000))  # unwritten messages before new ones are dropped
+
+    # Recent messages per session kept in process for the LLM context (app/memory/context_cache.py)
+    CONTEXT_CACHE_ENABLED = os.getenv("CONTEXT_CACHE_ENABLED", "true").lower() == "true"
+    CONTEXT_CACHE_TURNS = int(os.getenv("CONTEXT_CACHE_TURNS", 20))  # messages kept per session
+    CONTEXT_CACHE_MAX_SESSIONS = int(os.getenv("CONTEXT_CACHE_MAX_SESSIONS", 10_000))
+    CONTEXT_CACHE_MAX_BYTES = int(os.getenv("CONTEXT_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+    # /sessions pages (keyset-paginated on last activity)
+    SESSIONS_PAGE_SIZE = int(os.getenv("SESSIONS_PAGE_SIZE", 50))
+    SESSIONS_MAX_PAGE_SIZE = int(os.getenv("SESSIONS_MAX_PAGE_SIZE", 200))  # cap for ?limit=
+
+    # /session/{id}/history pages (newest first, before-id cursor)
+    HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", 30))  # messages
+    HISTORY_MAX_PAGE_SIZE = int(os.getenv("HISTORY_MAX_PAGE_SIZE", 200))  # cap for ?limit=
 
 settings = Settings()
@@ -1,28 +1,251 @@
-import psycopg2
+import asyncio
+import threading
+import time
+import asyncpg
 from psycopg2 import OperationalError
 from app.config.settings import settings
+from app.db.pool import ConnectionPool
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
-def get_connection():
-    """Get a PostgreSQL database connection."""
+# Separate pools so chat-history writes and schema lookups never queue
+# behind long-running analytics queries.
+CHAT_POOL = "chat"
+ANALYTICS_POOL = "analytics"
+VECTOR_POOL = "vector"
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+# asyncpg pools are bound to the event loop that created them
+_async_pools = {}
+_async_counters = {}  # name -> {"recycled": n, "failed_health_checks": n}
+
+
+class _PoolConnection(asyncpg.Connection):
+    """asyncpg connection that knows its age and when it was last released."""
+
+    __slots__ = ("created_at", "last_used")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.created_at = self.last_used = time.monotonic()
+
+    def mark_used(self):
+        self.last_used = time.monotonic()
+
+
+def _pool_config(name):
+    if name == VECTOR_POOL:
+        conn_kwargs = {
+            "host": settings.VECTOR_DB_HOST,
+            "port": settings.VECTOR_DB_PORT,
+            "dbname": settings.VECTOR_DB_NAME,
+            "user": settings.VECTOR_DB_USER,
+            "password": settings.VECTOR_DB_PASSWORD,
+        }
+        sizes = (settings.DB_POOL_VECTOR_MIN, settings.DB_POOL_VECTOR_MAX)
+    elif name in (CHAT_POOL, ANALYTICS_POOL):
+        conn_kwargs = {
+            "host": settings.DB_HOST,
+            "port": settings.DB_PORT,
+            "dbname": settings.DB_NAME,
+            "user": settings.DB_USER,
+            "password": settings.DB_PASSWORD,
+        }
+        if name == CHAT_POOL:
+            sizes = (settings.DB_POOL_CHAT_MIN, settings.DB_POOL_CHAT_MAX)
+        else:
+            sizes = (settings.DB_POOL_ANALYTICS_MIN, settings.DB_POOL_ANALYTICS_MAX)
+    else:
+        raise ValueError(f"Unknown connection pool: {name}. Must be one of: {CHAT_POOL}, {ANALYTICS_POOL}, {VECTOR_POOL}")
+
+    if not all([conn_kwargs["host"], conn_kwargs["dbname"], conn_kwargs["user"], conn_kwargs["password"]]):
+        raise ValueError("Missing required database configuration. Please set DB_HOST, DB_NAME, DB_USER, and DB_PASSWORD environment variables.")
+
+    return conn_kwargs, sizes
+
+
+def get_pool(name=ANALYTICS_POOL):
+    """Get (creating on first use) the named connection pool."""
+    pool = _pools.get(name)
+    if pool is not None:
+        return pool
+
+    with _pools_lock:
+        pool = _pools.get(name)
+        if pool is None:
+            conn_kwargs, (minconn, maxconn) = _pool_config(name)
+            conn_kwargs["options"] = f"-c statement_timeout={settings.QUERY_TIMEOUT * 1000}"
+            pool = ConnectionPool(
+                name,
+                conn_kwargs,
+                minconn=minconn,
+                maxconn=maxconn,
+                timeout=settings.DB_POOL_TIMEOUT,
+                healthcheck_interval=settings.DB_POOL_HEALTHCHECK_INTERVAL,
+                recycle=settings.DB_POOL_RECYCLE,
+            )
+            _pools[name] = pool
+            logger.info(f"Created connection pool '{name}' (min={minconn}, max={maxconn})")
+            try:
+                pool.warm()
+            except Exception as e:
+                logger.warning(f"Could not pre-open connections for pool '{name}': {e}")
+    return pool
+
+
+def get_connection(pool=ANALYTICS_POOL):
+    """
+    Get a PostgreSQL database connection from the named pool.
+    Call close() on the returned connection to hand it back to the pool.
+    """
     try:
-        if not all([settings.DB_HOST, settings.DB_NAME, settings.DB_USER, settings.DB_PASSWORD]):
-            raise ValueError("Missing required database configuration. Please set DB_HOST, DB_NAME, DB_USER, and DB_PASSWORD environment variables.")
-        
-        conn = psycopg2.connect(
-            host=settings.DB_HOST,
-            port=settings.DB_PORT,
-            dbname=settings.DB_NAME,
-            user=settings.DB_USER,
-            password=settings.DB_PASSWORD,
-            options=f"-c statement_timeout={settings.QUERY_TIMEOUT * 1000}"
-        )
-        return conn
+        return get_pool(pool).getconn()
     except OperationalError as e:
         logger.error(f"Database connection failed: {e}")
         raise ConnectionError(f"Failed to connect to database: {e}")
     except Exception as e:
         logger.error(f"Unexpected error connecting to database: {e}")
         raise
+
+
+async def get_async_pool(name=ANALYTICS_POOL):
+    """Get (creating on first use) the named asyncpg pool for the running event loop."""
+    loop = asyncio.get_running_loop()
+    entry = _async_pools.get(name)
+    if entry is not None and entry[0] is loop:
+        return entry[1]
+
+    conn_kwargs, (minconn, maxconn) = _pool_config(name)
+    try:
+        pool = await asyncpg.create_pool(
+            host=conn_kwargs["host"],
+            port=conn_kwargs["port"],
+            database=conn_kwargs["dbname"],
+            user=conn_kwargs["user"],
+            password=conn_kwargs["password"],
+            min_size=minconn,
+            max_size=maxconn,
+            connection_class=_PoolConnection,
+            # per-connection LRU of prepared statements used by conn.fetch / conn.cursor
+            statement_cache_size=settings.PREPARED_STATEMENT_CACHE_SIZE,
+            server_settings={"statement_timeout": str(settings.QUERY_TIMEOUT * 1000)},
+        )
+    except (OSError, asyncpg.PostgresError) as e:
+        logger.error(f"Database connection failed: {e}")
+        raise ConnectionError(f"Failed to connect to database: {e}")
+
+    # Another coroutine may have created the pool while we were connecting
+    entry = _async_pools.get(name)
+    if entry is not None and entry[0] is loop:
+        await pool.close()
+        return entry[1]
+
+    _async_pools[name] = (loop, pool)
+    _async_counters.setdefault(name, {"recycled": 0, "failed_health_checks": 0})
+    logger.info(f"Created async connection pool '{name}' (min={minconn}, max={maxconn})")
+    return pool
+
+
+def acquire(pool=ANALYTICS_POOL):
+    """
+    Async context manager yielding an asyncpg connection from the named pool:
+
+        async with acquire(CHAT_POOL) as conn:
+            await conn.execute(...)
+    """
+    return _AsyncAcquire(pool)
+
+
+class _AsyncAcquire:
+    """
+    Checkout with the same rules as the psycopg2 ConnectionPool: connections
+    older than DB_POOL_RECYCLE are closed and replaced, and connections idle
+    for DB_POOL_HEALTHCHECK_INTERVAL are pinged first. Unlike ConnectionPool,
+    asyncpg also closes connections idle for 5 minutes (its
+    max_inactive_connection_lifetime default) and reopens them on demand.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._pool = None
+        self._conn = None
+
+    async def __aenter__(self):
+        self._pool = await get_async_pool(self._name)
+        deadline = time.monotonic() + settings.DB_POOL_TIMEOUT
+        while True:
+            try:
+                conn = await self._pool.acquire(timeout=max(deadline - time.monotonic(), 0.001))
+            except asyncio.TimeoutError:
+                raise ConnectionError(
+                    f"No database connection available in pool '{self._name}' "
+                    f"after {settings.DB_POOL_TIMEOUT}s"
+                )
+            if await self._usable(conn):
+                self._conn = conn
+                return conn
+            # a closed connection is reopened by asyncpg on its next checkout
+            await self._pool.release(conn)
+
+    async def _usable(self, conn):
+        now = time.monotonic()
+        counters = _async_counters[self._name]
+        if now - conn.created_at >= settings.DB_POOL_RECYCLE:
+            counters["recycled"] += 1
+            try:
+                await conn.close(timeout=settings.DB_POOL_TIMEOUT)
+            except Exception:
+                conn.terminate()
+            return False
+        if now - conn.last_used >= settings.DB_POOL_HEALTHCHECK_INTERVAL:
+            try:
+                await conn.fetchval("SELECT 1", timeout=settings.DB_POOL_TIMEOUT)
+            except Exception as e:
+                logger.warning(f"Pool '{self._name}' health check failed: {e}")
+                counters["failed_health_checks"] += 1
+                conn.terminate()
+                return False
+        return True
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if not self._conn.is_closed():
+            self._conn.mark_used()
+        await self._pool.release(self._conn)
+
+
+def get_pool_stats():
+    """Wait-time and utilization stats for every pool created so far."""
+    stats = [pool.stats() for pool in list(_pools.values())]
+    for name, (_, pool) in list(_async_pools.items()):
+        in_use = pool.get_size() - pool.get_idle_size()
+        stats.append({
+            "pool": f"{name} (async)",
+            "min_size": pool.get_min_size(),
+            "max_size": pool.get_max_size(),
+            "open": pool.get_size(),
+            "idle": pool.get_idle_size(),
+            "in_use": in_use,
+            "utilization": round(in_use / pool.get_max_size(), 3),
+            **_async_counters.get(name, {}),
+        })
+    return stats
+
+
+def close_all_pools():
+    """Close idle connections in every pool; used on application shutdown."""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.closeall()
+        _pools.clear()
+
+
+async def close_all_async_pools():
+    """Close the asyncpg pools owned by the running event loop."""
+    loop = asyncio.get_running_loop()
+    for name, (owner, pool) in list(_async_pools.items()):
+        if owner is loop:
+            await pool.close()
+            del _async_pools[name]
@@ -0,0 +1,191 @@
+import json
+import threading
+import time
+
+from app.config.settings import settings
+from app.db.statements import pyformat
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+# ============================================================
+# EXPLAIN COST GATE
+# ============================================================
+#
+# Before a statement runs, EXPLAIN (FORMAT JSON) gives the planner's total
+# cost and row estimate for it (planning only, nothing is executed). Based
+# on those:
+#
+#   reject   total cost above COST_GATE_MAX_COST; the question is answered
+#            with a hint to narrow it instead of burning QUERY_TIMEOUT
+#            seconds of database time
+#   cap      no row cap (the user asked for all data) but more than
+#            COST_GATE_MAX_ROWS rows expected: capped at COST_GATE_MAX_ROWS
+#   stream   more than COST_GATE_STREAM_ROWS rows would be built in memory:
+#            /query sends the rows as a stream instead, other callers keep
+#            a MAX_ROWS preview
+#   allow    everything else, and statements EXPLAIN fails on (the error
+#            resurfaces when they run)
+
+REJECT_HINT = (
+    "Try narrowing the question to a state, year or project, or ask for totals "
+    "instead of individual records."
+)
+
+
+class QueryPlan:
+    """The gate's decision for one statement; `row_cap` is the cap to run it with."""
+
+    __slots__ = ("action", "cost", "rows", "row_cap", "message", "hint")
+
+    def __init__(self, action, cost, rows, row_cap, message=None, hint=None):
+        self.action = action
+        self.cost = cost
+        self.rows = rows
+        self.row_cap = row_cap
+        self.message = message
+        self.hint = hint
+
+
+class QueryRejected(ValueError):
+    """Raised by the executor for statements the gate rejects."""
+
+    def __init__(self, plan):
+        super().__init__(plan.message)
+        self.plan = plan
+        self.hint = plan.hint
+
+
+def plan_estimate(plan):
+    """(total cost, rows) of the top plan node in EXPLAIN (FORMAT JSON) output."""
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    try:
+        node = plan[0]["Plan"]
+        return float(node["Total Cost"]), int(node["Plan Rows"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None, None
+
+
+def _explain_sql(sql: str) -> str:
+    return f"EXPLAIN (FORMAT JSON) {sql.strip().rstrip(';')}"
+
+
+def explain(conn, sql: str, params=None):
+    """(cost, rows) for sql on a psycopg2 connection, (None, None) if EXPLAIN fails."""
+    try:
+        cur = conn.cursor()
+        try:
+            cur.execute(*pyformat(_explain_sql(sql), params))
+            return plan_estimate(cur.fetchone()[0])
+        finally:
+            cur.close()
+    except Exception as e:
+        logger.warning(f"Could not explain query: {e}")
+        conn.rollback()
+        return None, None
+
+
+async def aexplain(conn, sql: str, params=None):
+    """Async variant of explain for an asyncpg connection."""
+    try:
+        return plan_estimate(await conn.fetchval(_explain_sql(sql), *(params or ())))
+    except Exception as e:
+        logger.warning(f"Could not explain query: {e}")
+        return None, None
+
+
+class CostGate:
+    """
+    Decides how (and whether) to run a statement from its EXPLAIN estimate,
+    and counts how often each rule fired.
+    """
+
+    def __init__(self, max_cost, max_rows, stream_rows, enabled=True):
+        self.max_cost = max_cost
+        self.max_rows = max_rows
+        self.stream_rows = stream_rows
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counts = {"checked": 0, "allowed": 0, "rejected": 0, "capped": 0, "streamed": 0, "unplanned": 0}
+        self._explain_ms = 0.0
+
+    def _count(self, rule, explain_ms=0.0):
+        with self._lock:
+            self._counts[rule] += 1
+            self._explain_ms += explain_ms
+
+    def decide(self, cost, rows, row_cap, streaming=False, explain_ms=0.0) -> QueryPlan:
+        """
+        QueryPlan for a statement with the given estimate that would run with
+        `row_cap` (None for no cap). `streaming` callers already send rows
+        as they arrive, so the stream rule does not apply to them.
+        """
+        self._count("checked", explain_ms)
+        if cost is None:
+            self._count("unplanned")
+            return QueryPlan("allow", None, None, row_cap)
+
+        if self.max_cost and cost > self.max_cost:
+            self._count("rejected")
+            message = (
+                f"This query is too expensive to run (estimated cost {cost:,.0f}, "
+                f"about {rows:,} rows)."
+            )
+            logger.warning(f"Cost gate rejected query: cost {cost:,.0f} > {self.max_cost:,.0f}, {rows:,} rows")
+            return QueryPlan("reject", cost, rows, row_cap, message, REJECT_HINT)
+
+        plan = QueryPlan("allow", cost, rows, row_cap)
+        if row_cap is None and self.max_rows and rows > self.max_rows:
+            self._count("capped")
+            plan.action = "cap"
+            plan.row_cap = self.max_rows
+            logger.info(f"Cost gate capped query at {self.max_rows:,} rows (about {rows:,} expected)")
+        expected = rows if plan.row_cap is None else min(rows, plan.row_cap)
+        if not streaming and self.stream_rows and expected > self.stream_rows:
+            self._count("streamed")
+            plan.action = "stream"
+            logger.info(f"Cost gate switched query to streaming (about {expected:,} rows)")
+        if plan.action == "allow":
+            self._count("allowed")
+        return plan
+
+    def check(self, conn, sql: str, params=None, row_cap=None, streaming=False) -> QueryPlan:
+        """EXPLAIN on a psycopg2 connection and decide."""
+        if not self.enabled:
+            return QueryPlan("allow", None, None, row_cap)
+        start = time.perf_counter()
+        cost, rows = explain(conn, sql, params)
+        return self.decide(cost, rows, row_cap, streaming, (time.perf_counter() - start) * 1000)
+
+    async def acheck(self, conn, sql: str, params=None, row_cap=None, streaming=False) -> QueryPlan:
+        """Async variant of check for an asyncpg connection."""
+        if not self.enabled:
+            return QueryPlan("allow", None, None, row_cap)
+        start = time.perf_counter()
+        cost, rows = await aexplain(conn, sql, params)
+        return self.decide(cost, rows, row_cap, streaming, (time.perf_counter() - start) * 1000)
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._counts)
+            explain_ms = self._explain_ms
+        planned = counts["checked"] - counts["unplanned"]
+        return {
+            "enabled": self.enabled,
+            "max_cost": self.max_cost,
+            "max_rows": self.max_rows,
+            "stream_rows": self.stream_rows,
+            **counts,
+            "avg_explain_ms": round(explain_ms / counts["checked"], 2) if counts["checked"] else 0.0,
+            "reject_rate": round(counts["rejected"] / planned, 3) if planned else 0.0,
+        }
+
+
+cost_gate = CostGate(
+    max_cost=settings.COST_GATE_MAX_COST,
+    max_rows=settings.COST_GATE_MAX_ROWS,
+    stream_rows=settings.COST_GATE_STREAM_ROWS,
+    enabled=settings.COST_GATE_ENABLED,
+)
@@ -0,0 +1,193 @@
+import asyncio
+import re
+import time
+
+from app.config.settings import settings
+from app.db.connection import acquire, ANALYTICS_POOL
+from app.schema.registry import SCHEMA_REGISTRY
+from app.utils.logger import get_logger
+from app.utils.text import normalize_question
+
+logger = get_logger(__name__)
+
+# Entity name -> the (table, column) pairs its values are read from. The
+# same year can be spelled "2023-24" in years.year_name and "FY 2023-24" in
+# csr_expenditure_view.financial_year, so every spelling is kept per column
+# and a template binds the one of the column it filters on. Only tables in
+# SCHEMA_REGISTRY are loaded.
+DIMENSIONS = {
+    "state": (("states", "state_name"), ("csr_expenditure_view", "state_name")),
+    "year": (("years", "year_name"), ("csr_expenditure_view", "financial_year")),
+    "project": (("projects", "project_name"),),
+}
+
+# Free-text entities: a one-word value ("Water", "Health") is only matched
+# right before or after the entity word ("project Water", "Water project"),
+# so project names do not match ordinary words in questions.
+FREE_TEXT = {"project": r"projects?"}
+
+_SHORT_FY = re.compile(r"^(\d{2})(\d{2})-(\d{2})$")
+
+
+def _aliases(entity: str, value: str):
+    """Normalized spellings of a dimension value that should match it."""
+    text = normalize_question(value)
+    aliases = {text}
+    if entity == "year":
+        # "FY 2023-24" is also written "2023-24", and "2023-24" "2023-2024"
+        if text.startswith("fy "):
+            text = text[3:]
+            aliases.add(text)
+        m = _SHORT_FY.match(text)
+        if m:
+            aliases.add(f"{m.group(1)}{m.group(2)}-{m.group(1)}{m.group(3)}")
+    return {a for a in aliases if a}
+
+
+def _alternatives(aliases):
+    return "|".join(re.escape(a) for a in sorted(aliases, key=len, reverse=True))
+
+
+def _pattern(aliases, entity_word=None):
+    """One capture group per alternative; the matched value is whichever group is set."""
+    if entity_word is None:
+        return re.compile(rf"(?<![\w-])({_alternatives(aliases)})(?![\w-])")
+    phrases = [a for a in aliases if " " in a]
+    words = [a for a in aliases if " " not in a]
+    parts = []
+    if phrases:
+        parts.append(rf"(?<![\w-])({_alternatives(phrases)})(?![\w-])")
+    if words:
+        parts.append(rf"\b{entity_word}\s+({_alternatives(words)})(?![\w-])")
+        parts.append(rf"(?<![\w-])({_alternatives(words)})\s+{entity_word}\b")
+    return re.compile("|".join(parts))
+
+
+def _matched(m):
+    return next(g for g in m.groups() if g is not None)
+
+
+class DimensionIndex:
+    """Compiled matchers for one snapshot of the dimension values."""
+
+    def __init__(self, values):
+        self.values = values  # (table, column) -> [names]
+        self._lookup = {}  # entity -> alias -> value (first spelling seen, in DIMENSIONS order)
+        self._spellings = {}  # entity -> value -> {(table, column): name}
+        self._patterns = {}
+        for entity, sources in DIMENSIONS.items():
+            lookup, spellings = {}, {}
+            for source in sources:
+                for name in values.get(source, ()):
+                    for alias in _aliases(entity, name):
+                        value = lookup.setdefault(alias, name)
+                        spellings.setdefault(value, {}).setdefault(source, name)
+            if not lookup:
+                continue
+            self._lookup[entity] = lookup
+            self._spellings[entity] = spellings
+            self._patterns[entity] = _pattern(lookup, FREE_TEXT.get(entity))
+
+    def find(self, normalized_question: str):
+        """{entity: [values]} for every dimension value mentioned in the question."""
+        found = {}
+        for entity, pattern in self._patterns.items():
+            lookup = self._lookup[entity]
+            matches = []
+            for m in pattern.finditer(normalized_question):
+                value = lookup[_matched(m)]
+                if value not in matches:
+                    matches.append(value)
+            if matches:
+                found[entity] = matches
+        return found
+
+    def spelling(self, entity: str, value: str, source):
+        """How `value` (from find) is written in the (table, column) `source`, or None."""
+        return self._spellings.get(entity, {}).get(value, {}).get(source)
+
+    def strip(self, normalized_question: str) -> str:
+        """The question with every matched dimension value removed."""
+        for pattern in self._patterns.values():
+            normalized_question = pattern.sub(lambda m: m.group(0).replace(_matched(m), " "), normalized_question)
+        return re.sub(r"\s+", " ", normalized_question).strip()
+
+
+class DimensionCache:
+    """
+    In-process copy of small dimension tables (state names, year labels,
+    project names) used to resolve entity values in questions without a
+    database round trip. Reloaded every `ttl` seconds; after a failed load
+    the previous snapshot is kept and the load retried after `retry` seconds.
+    """
+
+    def __init__(self, ttl=3600.0, retry=60.0, max_values=10000):
+        self.ttl = ttl
+        self.retry = retry
+        self.max_values = max_values
+        self._index = DimensionIndex({})
+        self._expires_at = 0.0
+        self._alock = None
+        self._loads = 0
+        self._failures = 0
+
+    def _queries(self):
+        sources = dict.fromkeys(source for sources in DIMENSIONS.values() for source in sources)
+        for table, column in sources:
+            if table in SCHEMA_REGISTRY:
+                yield (table, column), (
+                    f"SELECT DISTINCT {column} FROM {table} "
+                    f"WHERE {column} IS NOT NULL LIMIT {self.max_values}"
+                )
+
+    def _install(self, values, ok):
+        if ok:
+            self._index = DimensionIndex(values)
+            self._loads += 1
+            self._expires_at = time.monotonic() + self.ttl
+            logger.info(
+                "Loaded dimension values: "
+                + ", ".join(f"{table}.{column}={len(names)}" for (table, column), names in values.items())
+            )
+        else:
+            self._failures += 1
+            self._expires_at = time.monotonic() + self.retry
+
+    async def aget(self) -> DimensionIndex:
+        """The current index, reloaded on the asyncpg analytics pool once expired."""
+        if time.monotonic() < self._expires_at:
+            return self._index
+        if self._alock is None:
+            self._alock = asyncio.Lock()
+        async with self._alock:
+            if time.monotonic() >= self._expires_at:
+                values, ok = {}, True
+                try:
+                    async with acquire(ANALYTICS_POOL) as conn:
+                        for source, sql in self._queries():
+                            values[source] = [str(r[0]) for r in await conn.fetch(sql)]
+                except Exception as e:
+                    logger.warning(f"Could not load dimension values: {e}")
+                    ok = False
+                self._install(values, ok)
+        return self._index
+
+    def current(self) -> DimensionIndex:
+        """The loaded index as is, without a reload (empty before the first aget)."""
+        return self._index
+
+    def invalidate(self):
+        self._expires_at = 0.0
+
+    def stats(self):
+        return {
+            "values": {f"{table}.{column}": len(names) for (table, column), names in self._index.values.items()},
+            "loads": self._loads,
+            "failures": self._failures,
+        }
+
+
+dimension_cache = DimensionCache(
+    ttl=settings.DIMENSION_CACHE_TTL,
+    max_values=settings.DIMENSION_CACHE_MAX_VALUES,
+)
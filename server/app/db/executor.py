@@ -1,44 +1,283 @@
+import re
+import time
+import uuid
+
+import asyncpg
 import pandas as pd
 from psycopg2 import OperationalError, ProgrammingError
-from app.db.connection import get_connection
+from app.db.connection import get_connection, acquire, ANALYTICS_POOL
+from app.db.cost_gate import QueryPlan, QueryRejected, aexplain, cost_gate, explain
+from app.db.result_cache import result_cache
+from app.db.statements import acolumns, aprepare, pyformat, statement_registry
+from app.security.row_limiter import apply_limit
 from app.config.settings import settings
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
-def execute_sql(sql: str, user_query: str = "") -> pd.DataFrame:
-    """Execute SQL query and return results as DataFrame."""
-    conn = None
+ALL_DATA_PHRASES = [
+    "show all", "list all", "get all", "all data", "all records",
+    "all rows", "everything", "entire", "complete", "full"
+]
+
+# whole words only: "completed projects" or "fully funded" is not a request for every row
+_ALL_DATA_RE = re.compile(r"\b(?:%s)\b" % "|".join(
+    re.escape(p).replace(r"\ ", r"\s+") for p in sorted(ALL_DATA_PHRASES, key=len, reverse=True)
+))
+
+
+def wants_all(user_query: str) -> bool:
+    """True when the question asks for the whole result; such results are streamed, not capped."""
+    return bool(user_query) and _ALL_DATA_RE.search(user_query.lower()) is not None
+
+
+def _row_limit(user_query: str):
+    """MAX_ROWS unless the user explicitly asked for all data."""
+    if wants_all(user_query):
+        logger.info("User requested all data, returning rows without limit")
+        return None
+    return settings.MAX_ROWS
+
+
+def _limited_sql(sql: str, limit) -> str:
+    # one extra row tells us whether the result was cut off
+    return sql if limit is None else apply_limit(sql, limit + 1)
+
+
+def _run_cap(plan, streaming=False):
+    """Row cap to run a statement with after the cost gate; raises QueryRejected."""
+    if plan.action == "reject":
+        raise QueryRejected(plan)
+    if plan.action == "stream" and not streaming:
+        # the caller builds the result in memory: keep a MAX_ROWS preview
+        return settings.MAX_ROWS if plan.row_cap is None else min(plan.row_cap, settings.MAX_ROWS)
+    return plan.row_cap
+
+
+def _mark_truncation(df: pd.DataFrame, limit, estimate_rows) -> pd.DataFrame:
+    """
+    Trim the extra probe row and record `truncated` / `total_rows_estimate`
+    in df.attrs. `estimate_rows` is only called when the result was cut off.
+    """
+    truncated = limit is not None and len(df) > limit
+    if truncated:
+        df = df.head(limit)
+        estimate = estimate_rows()
+        logger.warning(f"Query result limited to {limit} rows (planner estimate: {estimate})")
+    else:
+        estimate = len(df)
+    df.attrs["truncated"] = truncated
+    df.attrs["total_rows_estimate"] = estimate
+    logger.info(f"Query executed successfully, returned {len(df)} rows")
+    return df
+
+
+def _estimate_rows(conn, sql: str, params=None, plan=None):
+    if plan is not None and plan.rows is not None:
+        return plan.rows
+    return explain(conn, sql, params)[1]
+
+
+async def _aestimate_rows(conn, sql: str, params=None, plan=None):
+    if plan is not None and plan.rows is not None:
+        return plan.rows
+    return (await aexplain(conn, sql, params))[1]
+
+
+async def aplan_sql(sql: str, user_query: str = "", params=None, streaming: bool = False):
+    """
+    Run the cost gate for a statement (see app/db/cost_gate.py) and return its
+    QueryPlan, to be passed on to aexecute_sql / astream_sql. Statements whose
+    result is cached are not explained.
+    """
+    row_cap = _row_limit(user_query)
+    params = tuple(params or ())
+    if settings.RESULT_CACHE_ENABLED and result_cache.contains(_limited_sql(sql, row_cap), params):
+        return QueryPlan("allow", None, None, row_cap)
+    try:
+        async with acquire(ANALYTICS_POOL) as conn:
+            return await cost_gate.acheck(conn, sql, params, row_cap, streaming)
+    except (asyncpg.PostgresError, asyncpg.InterfaceError, OSError) as e:
+        logger.error(f"Database operation error: {e}")
+        raise ConnectionError(f"Database error: {str(e)}")
+
+
+async def aexecute_sql(sql: str, user_query: str = "", params=None, plan=None) -> pd.DataFrame:
+    """
+    Execute SQL query on the asyncpg analytics pool and return results as
+    DataFrame. Unless the user asked for all data, the statement is wrapped
+    so at most MAX_ROWS rows are fetched; df.attrs carries `truncated` and
+    `total_rows_estimate`. `params` are bound to $1, $2, ... placeholders in
+    the SQL. The cost gate runs first unless its `plan` is given; rejected
+    statements raise QueryRejected.
+    """
+    limit = _row_limit(user_query) if plan is None else _run_cap(plan)
+    params = tuple(params or ())
+
+    if settings.RESULT_CACHE_ENABLED:
+        cached = result_cache.get(_limited_sql(sql, limit), params)
+        if cached is not None:
+            logger.info("Result cache hit")
+            return cached
+
     try:
-        conn = get_connection()
-        df = pd.read_sql(sql, conn)
-        
-        # Check if user asked for "all" data
-        query_lower = user_query.lower() if user_query else ""
-        ask_for_all = any(phrase in query_lower for phrase in [
-            "show all", "list all", "get all", "all data", "all records",
-            "all rows", "everything", "entire", "complete", "full"
-        ])
-        
-        # Only limit if user didn't explicitly ask for all data
-        if not ask_for_all and len(df) > settings.MAX_ROWS:
-            logger.warning(f"Query returned {len(df)} rows, limiting to {settings.MAX_ROWS}")
-            df = df.head(settings.MAX_ROWS)
-        elif ask_for_all:
-            logger.info(f"User requested all data, returning {len(df)} rows without limit")
-
-        logger.info(f"Query executed successfully, returned {len(df)} rows")
+        async with acquire(ANALYTICS_POOL) as conn:
+            if plan is None:
+                plan = await cost_gate.acheck(conn, sql, params, limit)
+                limit = _run_cap(plan)
+            limited_sql = _limited_sql(sql, limit)
+            statement, args, shape = await aprepare(conn, limited_sql, params)
+            start = time.perf_counter()
+            records = await conn.fetch(statement, *args)
+            statement_registry.record(shape, (time.perf_counter() - start) * 1000, len(records))
+            columns = await acolumns(conn, statement, shape, records)
+            truncated = limit is not None and len(records) > limit
+            estimate = await _aestimate_rows(conn, sql, params, plan) if truncated else None
+        df = pd.DataFrame.from_records([tuple(r) for r in records], columns=columns)
+        df = _mark_truncation(df, limit, lambda: estimate)
+        if settings.RESULT_CACHE_ENABLED:
+            result_cache.put(limited_sql, df, params)
         return df
-        
-    except ProgrammingError as e:
+
+    except QueryRejected:
+        raise
+    except asyncpg.SyntaxOrAccessError as e:
         logger.error(f"SQL syntax error: {e}")
         raise ValueError(f"SQL query error: {str(e)}")
-    except OperationalError as e:
+    except (asyncpg.PostgresError, asyncpg.InterfaceError, OSError) as e:
         logger.error(f"Database operation error: {e}")
         raise ConnectionError(f"Database error: {str(e)}")
     except Exception as e:
         logger.error(f"Unexpected error executing SQL: {e}")
         raise
+
+
+def stream_sql(sql: str, user_query: str = "", batch_size: int = None, info: dict = None, max_rows: int = None,
+               params=None):
+    """
+    Sync counterpart of astream_sql: yields (columns, rows) batches read with
+    fetchmany from a named (server-side) cursor, so memory stays bounded by
+    batch_size whatever the result size. `max_rows` overrides the per-question
+    cap (0 for no cap). The cost gate runs first; rejected statements raise
+    QueryRejected. `info` gets the cursor `description` before the first
+    batch, and `truncated` / `total_rows_estimate` at the end.
+    """
+    batch_size = batch_size or settings.STREAM_BATCH_SIZE
+    row_cap = _row_limit(user_query) if max_rows is None else (max_rows or None)
+    sent = 0
+    truncated = False
+
+    conn = None
+    try:
+        conn = get_connection(ANALYTICS_POOL)
+        plan = cost_gate.check(conn, sql, params, row_cap, streaming=True)
+        row_cap = _run_cap(plan, streaming=True)
+        cur = conn.cursor(name=f"stream_{uuid.uuid4().hex}")
+        cur.itersize = batch_size
+        try:
+            cur.execute(*pyformat(_limited_sql(sql, row_cap), params))
+            columns = None
+            while True:
+                size = batch_size if row_cap is None else min(batch_size, row_cap - sent)
+                if size <= 0:
+                    truncated = bool(cur.fetchmany(1))
+                    break
+                rows = cur.fetchmany(size)
+                if columns is None:
+                    # named cursors only expose a description after the first fetch
+                    columns = [d[0] for d in cur.description]
+                    if info is not None:
+                        info["description"] = cur.description
+                if not rows:
+                    break
+                sent += len(rows)
+                yield columns, rows
+
+            if sent == 0:
+                yield columns, []
+        finally:
+            cur.close()
+        # the named cursor's transaction is over; EXPLAIN runs on its own
+        conn.rollback()
+
+        estimate = _estimate_rows(conn, sql, params, plan) if truncated else sent
+        logger.info(f"Query streamed successfully, returned {sent} rows")
+        if info is not None:
+            info["truncated"] = truncated
+            info["total_rows_estimate"] = estimate
+
+    except ProgrammingError as e:
+        logger.error(f"SQL syntax error: {e}")
+        raise ValueError(f"SQL query error: {str(e)}")
+    except OperationalError as e:
+        logger.error(f"Database operation error: {e}")
+        raise ConnectionError(f"Database error: {str(e)}")
     finally:
         if conn:
             conn.close()
+
+
+async def astream_sql(sql: str, user_query: str = "", batch_size: int = None, info: dict = None, params=None,
+                      plan=None):
+    """
+    Yield (columns, rows) batches straight off a server-side cursor so callers
+    can forward rows before the full result is fetched. Applies the same
+    MAX_ROWS limit as aexecute_sql and the same cost gate (unless its `plan` is
+    given); if `info` is given it is filled with `truncated` and
+    `total_rows_estimate` once the stream ends.
+    """
+    batch_size = batch_size or settings.STREAM_BATCH_SIZE
+    row_cap = _row_limit(user_query) if plan is None else _run_cap(plan, streaming=True)
+    params = tuple(params or ())
+    sent = 0
+    truncated = False
+
+    try:
+        async with acquire(ANALYTICS_POOL) as conn:
+            if plan is None:
+                plan = await cost_gate.acheck(conn, sql, params, row_cap, streaming=True)
+                row_cap = _run_cap(plan, streaming=True)
+            # asyncpg cursors only live inside a transaction
+            async with conn.transaction(readonly=True):
+                statement, args, shape = await aprepare(conn, _limited_sql(sql, row_cap), params)
+                start = time.perf_counter()
+                cursor = await conn.cursor(statement, *args)
+                columns = None
+                fetch_ms = 0.0
+
+                while True:
+                    size = batch_size if row_cap is None else min(batch_size, row_cap - sent)
+                    if size <= 0:
+                        # the limited statement returns one probe row past the cap
+                        truncated = bool(await cursor.fetch(1))
+                        break
+                    records = await cursor.fetch(size)
+                    # time spent in the database, not waiting on the consumer
+                    fetch_ms += (time.perf_counter() - start) * 1000
+                    if columns is None:
+                        columns = await acolumns(conn, statement, shape, records)
+                    if not records:
+                        break
+                    sent += len(records)
+                    yield columns, [tuple(r) for r in records]
+                    start = time.perf_counter()
+
+                if sent == 0:
+                    yield columns, []
+            statement_registry.record(shape, fetch_ms, sent)
+
+            estimate = await _aestimate_rows(conn, sql, params, plan) if truncated else sent
+
+        if truncated:
+            logger.warning(f"Streamed result limited to {row_cap} rows (planner estimate: {estimate})")
+        logger.info(f"Query streamed successfully, returned {sent} rows")
+        if info is not None:
+            info["truncated"] = truncated
+            info["total_rows_estimate"] = estimate
+
+    except asyncpg.SyntaxOrAccessError as e:
+        logger.error(f"SQL syntax error: {e}")
+        raise ValueError(f"SQL query error: {str(e)}")
+    except (asyncpg.PostgresError, asyncpg.InterfaceError, OSError) as e:
+        logger.error(f"Database operation error: {e}")
+        raise ConnectionError(f"Database error: {str(e)}")
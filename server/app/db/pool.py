@@ -0,0 +1,233 @@
+import threading
+import time
+from collections import deque
+
+import psycopg2
+from psycopg2 import extensions
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class PooledConnection:
+    """
+    Thin proxy around a psycopg2 connection checked out from a pool.
+    Calling close() hands the connection back to its pool instead of
+    tearing down the socket, so existing `conn.close()` call sites keep working.
+    """
+
+    def __init__(self, pool, conn, created_at):
+        self._pool = pool
+        self._conn = conn
+        self._created_at = created_at
+
+    @property
+    def raw(self):
+        return self._conn
+
+    def close(self):
+        if self._conn is None:
+            return
+        conn, self._conn = self._conn, None
+        self._pool.putconn(conn, self._created_at)
+
+    def __getattr__(self, name):
+        if self._conn is None:
+            raise psycopg2.InterfaceError("connection already returned to pool")
+        return getattr(self._conn, name)
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of psycopg2 connections.
+
+    - min/max sizes per pool; callers block up to `timeout` seconds when exhausted
+    - connections idle longer than `healthcheck_interval` are pinged on checkout
+    - connections older than `recycle` seconds, closed, or left in a broken
+      transaction state are discarded and replaced
+    """
+
+    def __init__(self, name, conn_kwargs, minconn=1, maxconn=5, timeout=5.0,
+                 healthcheck_interval=30.0, recycle=1800.0):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError(f"Invalid pool size for '{name}': min={minconn}, max={maxconn}")
+
+        self.name = name
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.healthcheck_interval = healthcheck_interval
+        self.recycle = recycle
+        self._conn_kwargs = conn_kwargs
+
+        self._cond = threading.Condition()
+        self._idle = deque()  # (conn, created_at, last_used)
+        self._size = 0  # open connections, idle + checked out
+        self._closed = False
+
+        self._checkouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._timeouts = 0
+        self._discarded = 0
+        self._failed_checks = 0
+
+    # ------------------------------------------------------------
+    # Connection lifecycle
+    # ------------------------------------------------------------
+
+    def _connect(self):
+        conn = psycopg2.connect(**self._conn_kwargs)
+        return conn, time.monotonic()
+
+    def _discard(self, conn):
+        with self._cond:
+            self._discarded += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _is_healthy(self, conn):
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1")
+            cur.fetchone()
+            cur.close()
+            conn.rollback()
+            return True
+        except Exception as e:
+            logger.warning(f"Pool '{self.name}' health check failed: {e}")
+            with self._cond:
+                self._failed_checks += 1
+            return False
+
+    def warm(self):
+        """Open connections until the pool holds at least `minconn`."""
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.minconn:
+                    return
+                self._size += 1
+            try:
+                conn, created_at = self._connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._idle.append((conn, created_at, created_at))
+                self._cond.notify()
+
+    def getconn(self):
+        """Check out a connection, waiting for a free slot if necessary."""
+        start = time.monotonic()
+        deadline = start + self.timeout
+        entry = None
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise ConnectionError(f"Connection pool '{self.name}' is closed")
+                if self._idle:
+                    entry = self._idle.pop()
+                    break
+                if self._size < self.maxconn:
+                    self._size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    logger.error(f"Timed out waiting for a connection from pool '{self.name}'")
+                    raise ConnectionError(
+                        f"No database connection available in pool '{self.name}' "
+                        f"after {self.timeout}s"
+                    )
+                self._cond.wait(remaining)
+
+            waited = time.monotonic() - start
+            self._checkouts += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+
+        # Validation and reconnects happen outside the lock; the slot is
+        # already reserved for this caller.
+        if entry is not None:
+            conn, created_at, last_used = entry
+            now = time.monotonic()
+            usable = not conn.closed and now - created_at < self.recycle
+            if usable and now - last_used >= self.healthcheck_interval:
+                usable = self._is_healthy(conn)
+            if usable:
+                return PooledConnection(self, conn, created_at)
+            self._discard(conn)
+
+        try:
+            conn, created_at = self._connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        return PooledConnection(self, conn, created_at)
+
+    def putconn(self, conn, created_at):
+        """Return a connection to the pool, resetting or discarding it as needed."""
+        reusable = not conn.closed
+        if reusable:
+            status = conn.get_transaction_status()
+            if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                reusable = False
+            elif status != extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except Exception:
+                    reusable = False
+
+        with self._cond:
+            keep = reusable and not self._closed
+            if keep:
+                self._idle.append((conn, created_at, time.monotonic()))
+            else:
+                self._size -= 1
+            self._cond.notify()
+        if not keep:
+            self._discard(conn)
+
+    def closeall(self):
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _, _ = self._idle.pop()
+                self._size -= 1
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            self._cond.notify_all()
+
+    # ------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------
+
+    def stats(self):
+        with self._cond:
+            idle = len(self._idle)
+            in_use = self._size - idle
+            return {
+                "pool": self.name,
+                "min_size": self.minconn,
+                "max_size": self.maxconn,
+                "open": self._size,
+                "idle": idle,
+                "in_use": in_use,
+                "utilization": round(in_use / self.maxconn, 3),
+                "checkouts": self._checkouts,
+                "wait_avg_ms": round(self._wait_total / self._checkouts * 1000, 3) if self._checkouts else 0.0,
+                "wait_max_ms": round(self._wait_max * 1000, 3),
+                "timeouts": self._timeouts,
+                "failed_health_checks": self._failed_checks,
+                "discarded": self._discarded,
+            }
+
@@ -0,0 +1,177 @@
+import threading
+import time
+from collections import OrderedDict
+
+from app.config.settings import settings
+from app.security.sql_analyzer import analyze
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+def _parse_table_ttls(spec: str) -> dict:
+    """Parse "table=seconds,table2=seconds" into a dict."""
+    ttls = {}
+    for item in (spec or "").split(","):
+        if "=" not in item:
+            continue
+        table, seconds = item.split("=", 1)
+        try:
+            ttls[table.strip().lower()] = float(seconds)
+        except ValueError:
+            logger.warning(f"Ignoring invalid RESULT_CACHE_TABLE_TTLS entry: {item}")
+    return ttls
+
+
+class _Entry:
+    __slots__ = ("df", "tables", "size", "expires_at")
+
+    def __init__(self, df, tables, size, expires_at):
+        self.df = df
+        self.tables = tables
+        self.size = size
+        self.expires_at = expires_at
+
+
+class ResultCache:
+    """
+    LRU cache of query results keyed on canonicalized SQL text
+    (SQLAnalysis.canonical: comments, whitespace and case do not matter).
+
+    - bounded by total estimated DataFrame size in bytes
+    - each entry expires after the smallest TTL of the tables it reads
+    - `invalidate_tables` drops only entries that read the given tables
+    """
+
+    def __init__(self, max_bytes, default_ttl, table_ttls=None):
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.table_ttls = table_ttls or {}
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # canonical sql -> _Entry
+        self._by_table = {}  # table -> set of canonical sql
+        self._bytes = 0
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidated = 0
+        self._skipped = 0
+
+    def _ttl_for(self, tables):
+        ttls = [self.table_ttls.get(t, self.default_ttl) for t in tables]
+        return min(ttls) if ttls else self.default_ttl
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+        for table in entry.tables:
+            keys = self._by_table.get(table)
+            if keys:
+                keys.discard(key)
+                if not keys:
+                    del self._by_table[table]
+
+    @staticmethod
+    def _key(sql, params=None):
+        key = analyze(sql).canonical
+        # bound parameters ($1, ...) are part of the identity of the result
+        return f"{key}\0{params!r}" if params else key
+
+    def get(self, sql, params=None):
+        """Return a copy of the cached DataFrame for this SQL (and bind params), or None."""
+        key = self._key(sql, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            if time.monotonic() >= entry.expires_at:
+                self._remove(key)
+                self._expirations += 1
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            df = entry.df
+        return df.copy()
+
+    def contains(self, sql, params=None) -> bool:
+        """Whether get() would hit, without counting a lookup or touching the LRU order."""
+        key = self._key(sql, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and time.monotonic() < entry.expires_at
+
+    def put(self, sql, df, params=None):
+        key = self._key(sql, params)
+        tables = analyze(sql).tables
+        ttl = self._ttl_for(tables)
+        if ttl <= 0:
+            return
+
+        size = int(df.memory_usage(index=True, deep=True).sum())
+        # a single huge result would flush everything else
+        if size > self.max_bytes // 4:
+            with self._lock:
+                self._skipped += 1
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            while self._entries and self._bytes + size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+
+            self._entries[key] = _Entry(df.copy(), tables, size, time.monotonic() + ttl)
+            self._bytes += size
+            for table in tables:
+                self._by_table.setdefault(table, set()).add(key)
+
+    def invalidate_tables(self, tables):
+        """Drop cached results reading any of the given tables; returns the count dropped."""
+        names = {t.lower().split(".")[-1] for t in tables}
+        with self._lock:
+            keys = set()
+            for table in names:
+                keys |= self._by_table.get(table, set())
+            for key in keys:
+                self._remove(key)
+            self._invalidated += len(keys)
+        if keys:
+            logger.info(f"Invalidated {len(keys)} cached results for tables: {', '.join(sorted(names))}")
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+            self._by_table.clear()
+            self._bytes = 0
+            self._invalidated += count
+        return count
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "invalidated": self._invalidated,
+                "skipped_too_large": self._skipped,
+            }
+
+
+result_cache = ResultCache(
+    max_bytes=settings.RESULT_CACHE_MAX_BYTES,
+    default_ttl=settings.RESULT_CACHE_TTL,
+    table_ttls=_parse_table_ttls(settings.RESULT_CACHE_TABLE_TTLS),
+)
@@ -0,0 +1,315 @@
+import re
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+import asyncpg
+
+from app.config.settings import settings
+from app.security.sql_analyzer import analyze, canonical_text
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+# ============================================================
+# LITERAL PARAMETERIZATION
+# ============================================================
+#
+# Generated SQL that differs only in literal values ("... WHERE state_name =
+# 'Odisha' LIMIT 501" vs "... = 'Bihar' LIMIT 501") is reduced to one
+# statement shape with $n placeholders, so each pooled connection parses it
+# once and afterwards only binds values: the shape runs through asyncpg's
+# conn.fetch / conn.cursor, which keep a per-connection LRU of server-side
+# prepared statements (PREPARED_STATEMENT_CACHE_SIZE).
+#
+# Literals are left in place where a parameter would change the meaning:
+# positional ORDER BY / GROUP BY references, type modifiers (numeric(12,2))
+# and typed literals (DATE '2024-01-01', INTERVAL '1 day'). The parameter
+# types Postgres infers for a shape are checked against each literal; if a
+# value would not convert exactly (2.5 for an integer column, a date that is
+# not ISO formatted) the original SQL text runs instead.
+
+_CLAUSES = {
+    "select", "from", "where", "group", "order", "having", "limit", "offset",
+    "on", "join", "union", "intersect", "except", "window", "values", "fetch",
+}
+# a string right after one of these is a typed literal (DATE '...', E'...')
+_TYPED_PREFIXES = {
+    "date", "time", "timestamp", "timestamptz", "interval", "e", "b", "x", "n", "u",
+    "bit", "varbit", "json", "jsonb", "uuid", "inet", "cidr", "money",
+}
+# numbers inside these parentheses are type modifiers
+_MODIFIED_TYPES = {
+    "numeric", "decimal", "varchar", "char", "character", "varying", "bit", "varbit",
+    "time", "timestamp", "timestamptz", "interval", "float",
+}
+
+
+def parameterize(sql: str, start: int = 1):
+    """
+    Replace literals with $start, $start+1, ... Returns (shape, literals)
+    where literals is a list of ("str" | "num", text as written). `shape`
+    is canonicalized (see SQLAnalysis.canonical) so that statements
+    differing only in whitespace, case or comments share one prepared
+    statement. Returns (sql, []) when nothing can be parameterized.
+    """
+    parts = []
+    literals = []
+    clause = None
+    stack = []  # (clause, type_modifier_paren) per open parenthesis
+    prev = None  # last significant token, lowercased
+
+    for kind, token in analyze(sql).tokens:
+        if kind in ("dollar", "dstr"):
+            # dollar-quoted strings: leave the statement alone
+            return sql, []
+        if kind == "space":
+            parts.append((kind, token))
+            continue
+
+        if kind == "str" and prev not in _TYPED_PREFIXES and prev != "&":
+            literals.append(("str", token[1:-1].replace("''", "'")))
+            parts.append(("param", f"${start + len(literals) - 1}"))
+        elif kind == "num" and clause not in ("group", "order") and not (stack and stack[-1][1]):
+            literals.append(("num", token))
+            parts.append(("param", f"${start + len(literals) - 1}"))
+        else:
+            parts.append((kind, token))
+            if kind == "word":
+                lowered = token.lower()
+                if lowered in _CLAUSES:
+                    clause = lowered
+            elif token == "(":
+                stack.append((clause, prev in _MODIFIED_TYPES))
+            elif token == ")" and stack:
+                clause = stack.pop()[0]
+
+        prev = token.lower() if kind in ("word", "op", "cast") else kind
+
+    if not literals:
+        return sql, []
+    return canonical_text(parts), literals
+
+
+_TYPE_ALIASES = {
+    "integer": "int4", "int": "int4", "bigint": "int8", "smallint": "int2",
+    "double precision": "float8", "real": "float4", "decimal": "numeric",
+    "character varying": "varchar", "character": "bpchar", "boolean": "bool",
+    "timestamp without time zone": "timestamp", "timestamp with time zone": "timestamptz",
+}
+_INTEGER = re.compile(r"^\s*[+-]?\d+\s*$")
+_BOOLEANS = {"t": True, "true": True, "yes": True, "on": True, "1": True,
+             "f": False, "false": False, "no": False, "off": False, "0": False}
+
+
+def coerce(type_name: str, literal):
+    """
+    The Python value for a literal bound to a parameter of `type_name`.
+    Raises ValueError when the value would not mean exactly what the literal
+    meant in the original statement.
+    """
+    kind, text = literal
+    type_name = _TYPE_ALIASES.get(type_name, type_name)
+
+    if type_name in ("int2", "int4", "int8"):
+        if _INTEGER.match(text):
+            return int(text)
+    elif type_name == "numeric":
+        try:
+            return Decimal(text.strip())
+        except InvalidOperation:
+            pass
+    elif type_name in ("float4", "float8"):
+        return float(text)
+    elif type_name in ("text", "varchar", "bpchar", "name"):
+        if kind == "str":
+            return text
+    elif type_name == "date":
+        if kind == "str":
+            return date.fromisoformat(text.strip())
+    elif type_name == "timestamp":
+        if kind == "str":
+            value = datetime.fromisoformat(text.strip())
+            if value.tzinfo is None:
+                return value
+    elif type_name == "bool":
+        if kind == "str" and text.strip().lower() in _BOOLEANS:
+            return _BOOLEANS[text.strip().lower()]
+    raise ValueError(f"cannot bind {text!r} as {type_name}")
+
+
+# ============================================================
+# STATEMENT SHAPES
+# ============================================================
+
+class _Shape:
+    __slots__ = ("sql", "param_types", "columns", "parameterizable",
+                 "calls", "total_ms", "max_ms", "rows", "fallbacks")
+
+    def __init__(self, sql):
+        self.sql = sql
+        self.param_types = None  # learned on first prepare
+        self.columns = None
+        self.parameterizable = True
+        self.calls = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.fallbacks = 0
+
+
+class StatementRegistry:
+    """
+    Per statement shape: the parameter types Postgres inferred for it and
+    execution counts / latency. Bounded LRU over shapes.
+    """
+
+    def __init__(self, max_shapes=500):
+        self.max_shapes = max_shapes
+        self._shapes = OrderedDict()
+        self._lock = threading.Lock()
+        self._evicted = 0
+        self._described = 0
+        self._fallbacks = 0
+
+    def shape(self, sql) -> _Shape:
+        with self._lock:
+            entry = self._shapes.get(sql)
+            if entry is None:
+                entry = self._shapes[sql] = _Shape(sql)
+                while len(self._shapes) > self.max_shapes:
+                    self._shapes.popitem(last=False)
+                    self._evicted += 1
+            else:
+                self._shapes.move_to_end(sql)
+            return entry
+
+    def described(self, entry, param_types, columns=None):
+        with self._lock:
+            entry.param_types = [_TYPE_ALIASES.get(t, t) for t in param_types]
+            if columns is not None:
+                entry.columns = columns
+            self._described += 1
+
+    def fallback(self, entry, reason, permanent=False):
+        with self._lock:
+            entry.fallbacks += 1
+            self._fallbacks += 1
+            if permanent:
+                entry.parameterizable = False
+        logger.debug(f"Running statement as plain text ({reason}): {entry.sql[:200]}")
+
+    def record(self, entry, ms, rows):
+        with self._lock:
+            entry.calls += 1
+            entry.total_ms += ms
+            entry.max_ms = max(entry.max_ms, ms)
+            entry.rows += rows
+
+    def stats(self, top=20):
+        """Totals plus the `top` shapes by total execution time."""
+        with self._lock:
+            shapes = sorted(self._shapes.values(), key=lambda e: e.total_ms, reverse=True)[:top]
+            calls = sum(e.calls for e in self._shapes.values())
+            return {
+                "shapes": len(self._shapes),
+                "max_shapes": self.max_shapes,
+                "evicted": self._evicted,
+                "executions": calls,
+                "described": self._described,
+                "fallbacks": self._fallbacks,
+                "top": [
+                    {
+                        "sql": e.sql,
+                        "calls": e.calls,
+                        "total_ms": round(e.total_ms, 2),
+                        "avg_ms": round(e.total_ms / e.calls, 2) if e.calls else 0.0,
+                        "max_ms": round(e.max_ms, 2),
+                        "rows": e.rows,
+                        "fallbacks": e.fallbacks,
+                        "parameterized": e.parameterizable and e.sql.find("$") >= 0,
+                    }
+                    for e in shapes
+                ],
+            }
+
+
+statement_registry = StatementRegistry(max_shapes=settings.STATEMENT_STATS_MAX_SHAPES)
+
+
+def _split(sql: str, params):
+    """(shape, literals) for sql that may already carry `params` as $1..$n."""
+    if not settings.PREPARED_STATEMENTS_ENABLED:
+        return sql, []
+    return parameterize(sql, start=len(params) + 1)
+
+
+def _bind(entry, params, literals):
+    """Template params followed by the coerced literals; raises ValueError."""
+    types = entry.param_types[len(params):]
+    if len(types) != len(literals):
+        raise ValueError("parameter count changed")
+    return tuple(params) + tuple(coerce(t, lit) for t, lit in zip(types, literals))
+
+
+# ============================================================
+# ASYNC (asyncpg)
+# ============================================================
+
+async def aprepare(conn, sql: str, params=()):
+    """
+    Returns (statement, args, shape) to run with conn.fetch(statement, *args)
+    or conn.cursor(statement, *args). asyncpg keeps the prepared statement
+    in the connection's statement cache, so repeated shapes are only bound.
+    """
+    params = tuple(params or ())
+    shape_sql, literals = _split(sql, params)
+    entry = statement_registry.shape(shape_sql if literals else analyze(sql).canonical)
+    if not literals or not entry.parameterizable:
+        return sql, params, entry
+
+    if entry.param_types is None:
+        try:
+            stmt = await conn.prepare(shape_sql)
+        except asyncpg.PostgresError as e:
+            # e.g. "could not determine data type of parameter"; a genuine
+            # error in the statement resurfaces when the original text runs
+            statement_registry.fallback(entry, e, permanent=True)
+            return sql, params, entry
+        statement_registry.described(
+            entry, [t.name for t in stmt.get_parameters()], [a.name for a in stmt.get_attributes()]
+        )
+
+    try:
+        return shape_sql, _bind(entry, params, literals), entry
+    except ValueError as e:
+        statement_registry.fallback(entry, e)
+        return sql, params, entry
+
+
+async def acolumns(conn, statement: str, entry, records):
+    """Column names of a result; empty results take them from the shape (described once)."""
+    if records:
+        return list(records[0].keys())
+    if entry.columns is None or entry.sql != analyze(statement).canonical:
+        stmt = await conn.prepare(statement)
+        return [a.name for a in stmt.get_attributes()]
+    return entry.columns
+
+
+def pyformat(sql: str, params):
+    """
+    Convert $n placeholders (asyncpg style, used by SQL templates) to
+    psycopg2's %(pn)s style; returns (sql, params) ready for psycopg2.
+    Only placeholder tokens are rewritten: "$1" inside a string, quoted
+    identifier or dollar-quoted body stays as written.
+    """
+    if not params:
+        return sql, None
+    converted = "".join(
+        f"%(p{token[1:]})s" if kind == "param" else token.replace("%", "%%")
+        for kind, token in analyze(sql).tokens
+    )
+    return converted, {f"p{i}": value for i, value in enumerate(params, start=1)}
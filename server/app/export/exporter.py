@@ -0,0 +1,400 @@
+import csv
+import datetime
+import decimal
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from app.config.settings import settings
+from app.db.executor import stream_sql
+from app.security.sql_analyzer import analyze
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_EXPORT_DIR = Path(__file__).resolve().parents[3] / "tmp"
+
+EXPORT_FORMATS = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# <export_id>.<format>, or the same name with .part while it is being written
+_ARTIFACT_NAME = re.compile(r"^[0-9a-f]{32}\.(?:%s)(?:\.part)?$" % "|".join(EXPORT_FORMATS))
+
+EXCEL_MAX_ROWS = 1_048_575  # sheet limit minus the header row
+
+
+# ============================================================
+# STREAMING WRITERS
+# ============================================================
+# Each writer takes an iterator of (columns, rows) batches from
+# stream_sql and writes them out without holding the full result. `info`
+# is stream_sql's info dict; its cursor `description` is set before the
+# first batch.
+
+def _write_csv(path, batches, info):
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        header_written = False
+        for columns, rows in batches:
+            if not header_written:
+                writer.writerow(columns)
+                header_written = True
+            writer.writerows(rows)
+            count += len(rows)
+    return count
+
+
+def _excel_value(value):
+    # Excel has no timezone-aware datetimes; anything exotic becomes text
+    if isinstance(value, datetime.datetime) and value.tzinfo is not None:
+        return value.replace(tzinfo=None)
+    if value is None or isinstance(value, (str, int, float, decimal.Decimal, bool,
+                                           datetime.date, datetime.time)):
+        return value
+    return str(value)
+
+
+def _write_xlsx(path, batches, info):
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Sheet1")
+    count = 0
+    header_written = False
+    for columns, rows in batches:
+        if not header_written:
+            sheet.append(columns)
+            header_written = True
+        for row in rows:
+            if count >= EXCEL_MAX_ROWS:
+                logger.warning(f"Excel export stopped at the sheet limit of {EXCEL_MAX_ROWS} rows")
+                workbook.save(path)
+                return count
+            sheet.append([_excel_value(v) for v in row])
+            count += 1
+    workbook.save(path)
+    return count
+
+
+# Postgres type OIDs -> Arrow types for Parquet columns; anything else is written as text
+_ARROW_TYPES = {
+    16: "bool",
+    20: "int64", 21: "int16", 23: "int32",
+    700: "float32", 701: "float64",
+    1082: "date32",
+    1114: "timestamp",
+    1184: "timestamptz",
+    1083: "time64",
+    17: "binary",
+}
+_NUMERIC_OID = 1700
+
+
+def _arrow_type(pa, column):
+    """Arrow type for a cursor description entry, fixed for the whole file."""
+    if column.type_code == _NUMERIC_OID:
+        # numeric(p, s) keeps its exact decimal type; unconstrained numeric is written as double
+        if column.precision and 0 < column.precision <= 38 and column.scale is not None:
+            return pa.decimal128(column.precision, column.scale)
+        return pa.float64()
+    name = _ARROW_TYPES.get(column.type_code)
+    if name == "timestamp":
+        return pa.timestamp("us")
+    if name == "timestamptz":
+        return pa.timestamp("us", tz="UTC")
+    if name == "time64":
+        return pa.time64("us")
+    return getattr(pa, name)() if name else pa.string()
+
+
+def _text(value):
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)  # json / jsonb
+    return str(value)
+
+
+def _arrow_array(pa, values, type):
+    if pa.types.is_string(type):
+        return pa.array([_text(v) for v in values], type=type)
+    if pa.types.is_floating(type):
+        return pa.array([None if v is None else float(v) for v in values], type=type)
+    return pa.array(values, type=type)
+
+
+def _write_parquet(path, batches, info):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    schema = None
+    columns = None
+    pending = []
+    count = 0
+
+    def flush():
+        nonlocal writer, schema
+        if schema is None:
+            # from the cursor's column types, not the first batch's values, so
+            # every row group has the same schema whatever values it holds
+            description = info.get("description")
+            if description:
+                schema = pa.schema([pa.field(c, _arrow_type(pa, d)) for c, d in zip(columns, description)])
+            else:
+                schema = pa.schema([pa.field(c, pa.string()) for c in columns or ()])
+            writer = pq.ParquetWriter(path, schema)
+        arrays = [_arrow_array(pa, [row[i] for row in pending], f.type) for i, f in enumerate(schema)]
+        writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+        pending.clear()
+
+    try:
+        for batch_columns, rows in batches:
+            columns = columns or batch_columns
+            pending.extend(rows)
+            count += len(rows)
+            if len(pending) >= settings.EXPORT_PARQUET_ROW_GROUP:
+                flush()
+        if pending or writer is None:
+            flush()
+    finally:
+        if writer is not None:
+            writer.close()
+    return count
+
+
+_WRITERS = {
+    "xlsx": _write_xlsx,
+    "csv": _write_csv,
+    "parquet": _write_parquet,
+}
+
+
+# ============================================================
+# QUERY LOG
+# ============================================================
+
+class QueryLog:
+    """
+    Statements /query has run, by an opaque query id returned with the
+    result. /export takes that id, so only SQL the server generated (and
+    validated) is ever exported; clients never send SQL. Entries expire
+    after `ttl` seconds and the oldest are dropped past `max_entries`.
+    Ids are only known to the process that answered the query.
+    """
+
+    def __init__(self, ttl=3600.0, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._queries = OrderedDict()  # query_id -> (sql, params, recorded_at)
+
+    def record(self, sql, params=()) -> str:
+        query_id = uuid.uuid4().hex
+        with self._lock:
+            self._queries[query_id] = (sql, tuple(params or ()), time.monotonic())
+            while len(self._queries) > self.max_entries:
+                self._queries.popitem(last=False)
+        return query_id
+
+    def get(self, query_id):
+        """(sql, params) recorded for a query id, or None if unknown or expired."""
+        with self._lock:
+            entry = self._queries.get(query_id)
+            if entry is None:
+                return None
+            sql, params, recorded_at = entry
+            if time.monotonic() - recorded_at > self.ttl:
+                del self._queries[query_id]
+                return None
+            return sql, params
+
+    def __len__(self):
+        with self._lock:
+            return len(self._queries)
+
+
+# ============================================================
+# EXPORT MANAGER
+# ============================================================
+
+def export_id(sql: str, params, fmt: str) -> str:
+    """Content address of an export: same SQL text (canonicalized), parameters and format, same file."""
+    key = f"{fmt}\0{analyze(sql).canonical}\0{params!r}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+
+def _is_artifact(path: Path) -> bool:
+    """Only files this manager wrote; anything else in the directory is left alone."""
+    return bool(_ARTIFACT_NAME.match(path.name)) and path.is_file()
+
+
+class ExportManager:
+    """
+    Runs exports on a small worker pool and keeps the finished files in
+    `directory` as <export_id>.<format>. A fresh artifact is served again
+    without touching the database; old files are reaped by age and total size.
+    """
+
+    def __init__(self, directory, workers=2, reuse_ttl=300.0, max_age=86400.0, max_bytes=1024 ** 3):
+        self.directory = Path(directory)
+        self.reuse_ttl = reuse_ttl
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="export")
+        self._lock = threading.Lock()
+        self._jobs = {}  # export_id -> Future
+        self._reaped_at = 0.0
+
+        self._reused = 0
+        self._completed = 0
+        self._failed = 0
+        self._reaped = 0
+
+    def path_for(self, eid, fmt):
+        return self.directory / f"{eid}.{fmt}"
+
+    def find(self, eid):
+        """Finished, still-fresh artifact for an export id, or None."""
+        for fmt in EXPORT_FORMATS:
+            path = self.path_for(eid, fmt)
+            try:
+                if time.time() - path.stat().st_mtime < self.reuse_ttl:
+                    return path
+            except OSError:
+                continue
+        return None
+
+    def submit(self, sql, fmt, params=()):
+        """Return (export_id, future-or-None); None means a fresh artifact already exists."""
+        if fmt not in _WRITERS:
+            raise ValueError(f"Unsupported export format: {fmt}")
+        params = tuple(params or ())
+        eid = export_id(sql, params, fmt)
+        with self._lock:
+            if self.find(eid):
+                self._reused += 1
+                return eid, None
+            future = self._jobs.get(eid)
+            if future is None or future.done():
+                future = self._executor.submit(self._run, eid, sql, params, fmt)
+                self._jobs[eid] = future
+            return eid, future
+
+    def job(self, eid):
+        with self._lock:
+            return self._jobs.get(eid)
+
+    def _run(self, eid, sql, params, fmt):
+        path = self.path_for(eid, fmt)
+        part = path.with_name(path.name + ".part")
+        start = time.perf_counter()
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            info = {}
+            batches = stream_sql(sql, batch_size=settings.EXPORT_BATCH_SIZE, max_rows=settings.EXPORT_MAX_ROWS,
+                                 info=info, params=params)
+            rows = _WRITERS[fmt](part, batches, info)
+            os.replace(part, path)
+            with self._lock:
+                self._completed += 1
+            logger.info(
+                f"Exported {rows} rows to {path.name} "
+                f"({path.stat().st_size} bytes) in {time.perf_counter() - start:.2f}s"
+            )
+            return path
+        except Exception as e:
+            with self._lock:
+                self._failed += 1
+            logger.error(f"Export {eid} failed: {e}")
+            part.unlink(missing_ok=True)
+            raise
+        finally:
+            self.reap()
+
+    def reap(self, force=False):
+        """Delete artifacts older than max_age, then the oldest until under max_bytes."""
+        now = time.time()
+        with self._lock:
+            if not force and now - self._reaped_at < 60:
+                return 0
+            self._reaped_at = now
+            running = {eid for eid, f in self._jobs.items() if not f.done()}
+            self._jobs = {eid: f for eid, f in self._jobs.items() if eid in running}
+
+        try:
+            files = []
+            for path in self.directory.iterdir():
+                if not _is_artifact(path) or path.name.split(".", 1)[0] in running:
+                    continue
+                stat = path.stat()
+                files.append((stat.st_mtime, stat.st_size, path))
+        except FileNotFoundError:
+            return 0
+
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for mtime, size, path in files:
+            if now - mtime < self.max_age and total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+                total -= size
+                removed += 1
+            except OSError as e:
+                logger.warning(f"Could not remove export {path.name}: {e}")
+        if removed:
+            with self._lock:
+                self._reaped += removed
+            logger.info(f"Reaped {removed} export files from {self.directory}")
+        return removed
+
+    def stats(self):
+        with self._lock:
+            running = sum(1 for f in self._jobs.values() if not f.done())
+            counters = {
+                "completed": self._completed,
+                "reused": self._reused,
+                "failed": self._failed,
+                "reaped": self._reaped,
+            }
+        try:
+            files = [p for p in self.directory.iterdir() if _is_artifact(p)]
+            total = sum(p.stat().st_size for p in files)
+        except FileNotFoundError:
+            files, total = [], 0
+        return {
+            "files": len(files),
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+            "running": running,
+            **counters,
+            "queries": len(query_log),
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+query_log = QueryLog(ttl=settings.EXPORT_QUERY_TTL, max_entries=settings.EXPORT_QUERY_MAX_ENTRIES)
+
+export_manager = ExportManager(
+    directory=settings.EXPORT_DIR or DEFAULT_EXPORT_DIR,
+    workers=settings.EXPORT_WORKERS,
+    reuse_ttl=settings.EXPORT_REUSE_TTL,
+    max_age=settings.EXPORT_MAX_AGE,
+    max_bytes=settings.EXPORT_MAX_BYTES,
+)
@@ -1,6 +1,51 @@
+import asyncio
+import math
+import random
 from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+from app.config.settings import settings
+from app.llm.http import aclose_http_clients
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class RateLimitError(ConnectionError):
+    """Provider asked us to slow down; `retry_after` is its hint in seconds, if any."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value):
+    """
+    Seconds to wait from a Retry-After header, which is either a number of
+    seconds or an HTTP date; None when missing or unparseable.
+    """
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        try:
+            when = parsedate_to_datetime(value)
+        except (TypeError, ValueError, IndexError):
+            return None
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        seconds = (when - datetime.now(timezone.utc)).total_seconds()
+    return max(0.0, seconds) if math.isfinite(seconds) else None
+
 
 class BaseLLM(ABC):
+    # Most inputs a provider accepts in one embedding request, and a rough
+    # character budget per request (providers cap tokens, ~4 chars each)
+    MAX_EMBED_BATCH = 1
+    MAX_EMBED_BATCH_CHARS = 400_000
+
     @abstractmethod
     def chat(self, messages, temperature=0):
         pass
@@ -8,3 +53,84 @@ class BaseLLM(ABC):
     @abstractmethod
     def embed(self, text):
         pass
+
+    # Async variants. Providers with a native async client override these;
+    # the defaults run the blocking call on a worker thread.
+    async def achat(self, messages, temperature=0):
+        return await asyncio.to_thread(self.chat, messages, temperature)
+
+    async def aembed(self, text):
+        return await asyncio.to_thread(self.embed, text)
+
+    async def astream_chat(self, messages, temperature=0):
+        """Yield the reply as text chunks; providers without streaming yield it whole."""
+        yield await self.achat(messages, temperature)
+
+    async def awarmup(self):
+        """Open provider connections ahead of the first question (no-op by default)."""
+        return None
+
+    # Batched embeddings. Providers with a native batch endpoint raise
+    # MAX_EMBED_BATCH and override _aembed_chunk; the default embeds the
+    # chunk one text at a time.
+    async def _aembed_chunk(self, texts):
+        return [await self.aembed(text) for text in texts]
+
+    def _chunks(self, texts, batch_size):
+        size = max(1, min(batch_size, self.MAX_EMBED_BATCH))
+        chunk, chars = [], 0
+        for index, text in enumerate(texts):
+            if chunk and (len(chunk) >= size or chars + len(text) > self.MAX_EMBED_BATCH_CHARS):
+                yield chunk
+                chunk, chars = [], 0
+            chunk.append(index)
+            chars += len(text)
+        if chunk:
+            yield chunk
+
+    async def _aembed_with_retries(self, texts, max_retries):
+        for attempt in range(max_retries + 1):
+            try:
+                return await self._aembed_chunk(texts)
+            except ConnectionError as e:
+                if attempt == max_retries:
+                    raise
+                # exponential backoff with jitter, or the provider's own hint
+                delay = min(60.0, 2 ** attempt) * (0.5 + random.random() / 2)
+                if isinstance(e, RateLimitError) and e.retry_after:
+                    delay = max(delay, e.retry_after)
+                logger.warning(f"Embedding batch of {len(texts)} failed ({e}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def aembed_batch(self, texts, batch_size=None, concurrency=None, max_retries=None):
+        """
+        Embed many texts, returning vectors in input order. Texts are split
+        into provider-sized chunks, at most `concurrency` chunks are in flight,
+        and rate-limited or failed chunks are retried with backoff.
+        """
+        texts = list(texts)
+        batch_size = batch_size or settings.EMBED_BATCH_SIZE
+        concurrency = concurrency or settings.EMBED_CONCURRENCY
+        max_retries = settings.EMBED_MAX_RETRIES if max_retries is None else max_retries
+
+        vectors = [None] * len(texts)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run(indexes):
+            async with semaphore:
+                result = await self._aembed_with_retries([texts[i] for i in indexes], max_retries)
+            for i, vector in zip(indexes, result):
+                vectors[i] = vector
+
+        await asyncio.gather(*(run(indexes) for indexes in self._chunks(texts, batch_size)))
+        return vectors
+
+    def embed_batch(self, texts, batch_size=None, concurrency=None, max_retries=None):
+        """Sync wrapper around aembed_batch (not for use inside a running event loop)."""
+        async def run():
+            try:
+                return await self.aembed_batch(texts, batch_size, concurrency, max_retries)
+            finally:
+                await aclose_http_clients()
+
+        return asyncio.run(run())
@@ -1,4 +1,7 @@
+import threading
+
 from app.config.settings import settings
+from app.llm.http import aclose_http_clients, close_http_client
 from app.llm.providers.openai_llm import OpenAILLM
 from app.llm.providers.gemini_llm import GeminiLLM
 from app.llm.providers.grok_llm import GrokLLM
@@ -6,16 +9,51 @@ from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+PROVIDERS = {
+    "openai": OpenAILLM,
+    "gemini": GeminiLLM,
+    "grok": GrokLLM,
+}
+
+# Provider instances are created once per process and reused, so clients,
+# their connection pools and Gemini's genai.configure are set up only once.
+_registry = {}
+_registry_lock = threading.Lock()
+
+
 def get_llm():
-    """Get LLM instance based on configured provider."""
+    """Get the shared LLM instance for the configured provider."""
     provider = settings.LLM_PROVIDER.lower()
-    
-    if provider == "openai":
-        return OpenAILLM()
-    elif provider == "gemini":
-        return GeminiLLM()
-    elif provider == "grok":
-        return GrokLLM()
-    else:
+
+    llm = _registry.get(provider)
+    if llm is not None:
+        return llm
+
+    if provider not in PROVIDERS:
         logger.error(f"Invalid LLM_PROVIDER: {settings.LLM_PROVIDER}")
         raise ValueError(f"Invalid LLM_PROVIDER: {settings.LLM_PROVIDER}. Must be one of: openai, gemini, grok")
+
+    with _registry_lock:
+        llm = _registry.get(provider)
+        if llm is None:
+            llm = PROVIDERS[provider]()
+            _registry[provider] = llm
+            logger.info(f"Initialized {provider} LLM client")
+    return llm
+
+
+async def warmup_llm():
+    """Create the provider and open its connections before the first question."""
+    try:
+        await get_llm().awarmup()
+        logger.info(f"Warmed up {settings.LLM_PROVIDER} LLM connections")
+    except Exception as e:
+        logger.warning(f"LLM warmup failed (continuing): {e}")
+
+
+async def close_llms():
+    """Drop provider instances and close the shared HTTP pools."""
+    with _registry_lock:
+        _registry.clear()
+    await aclose_http_clients()
+    close_http_client()
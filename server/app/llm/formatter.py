@@ -1,4 +1,5 @@
 from app.llm.factory import get_llm
+from app.llm.summarizer import record_llm, summarize
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -70,30 +71,24 @@ You can download this data as an Excel file for reporting or sharing.
 # MAIN RESULT FORMATTER
 # ============================================================
 
-def format_result(df, question: str = "") -> str:
-    """
-    Format SQL query results into a CSR-friendly explanation.
-    The data table display is handled by the client (CLI, web UI, etc.).
-    """
+EMPTY_RESULT_TEXT = (
+    "INSIGHTS:\n"
+    "No data was found for the selected criteria.\n\n"
+    "DOWNLOAD:\n"
+    "There is no data available to download."
+)
 
-    if df.empty:
-        return (
-            "INSIGHTS:\n"
-            "No data was found for the selected criteria.\n\n"
-            "DOWNLOAD:\n"
-            "There is no data available to download."
-        )
-
-    llm = get_llm()
 
+def _build_format_messages(df, question: str, total_rows: int = None):
     # -----------------------------
     # DATA SUMMARY FOR LLM CONTEXT
     # -----------------------------
-    row_count = len(df)
+    # df may be a preview of a streamed result; total_rows is then the full count
+    row_count = total_rows if total_rows is not None else len(df)
     col_count = len(df.columns)
     column_names = list(df.columns)
 
-    sample_size = min(20, row_count)
+    sample_size = min(20, len(df))
     sample_df = df.head(sample_size)
 
     table_preview = sample_df.to_string(index=False)
@@ -120,7 +115,9 @@ Sample data (first {sample_size} records):
         question=question or "Not provided"
     )
 
-    messages = [
+    logger.debug("CSR result formatting prompt:\n%s", prompt)
+
+    return [
         {
             "role": "system",
             "content": "You are a locked CSR data presentation assistant. Follow instructions strictly."
@@ -131,12 +128,51 @@ Sample data (first {sample_size} records):
         }
     ]
 
-    logger.debug("CSR result formatting prompt:\n%s", prompt)
 
-    result = llm.chat(
-        messages=messages,
-        temperature=0.3  # Slight flexibility in wording only
+async def aformat_result(df, question: str = "", total_rows: int = None) -> str:
+    """
+    Format SQL query results into a CSR-friendly explanation.
+    The data table display is handled by the client (CLI, web UI, etc.).
+    """
+
+    if df.empty:
+        return EMPTY_RESULT_TEXT
+
+    summary = summarize(df, total_rows)
+    if summary is not None:
+        return summary
+
+    record_llm()
+    llm = get_llm()
+
+    result = await llm.achat(
+        messages=_build_format_messages(df, question, total_rows),
+        temperature=0.3
     )
 
     logger.info("CSR result explanation generated successfully")
     return result
+
+
+async def astream_format_result(df, question: str = "", total_rows: int = None):
+    """Yield the CSR explanation token by token as the LLM produces it."""
+
+    if df.empty:
+        yield EMPTY_RESULT_TEXT
+        return
+
+    summary = summarize(df, total_rows)
+    if summary is not None:
+        yield summary
+        return
+
+    record_llm()
+    llm = get_llm()
+
+    async for chunk in llm.astream_chat(
+        messages=_build_format_messages(df, question, total_rows),
+        temperature=0.3
+    ):
+        yield chunk
+
+    logger.info("CSR result explanation streamed successfully")
@@ -0,0 +1,87 @@
+import asyncio
+import threading
+
+import httpx
+
+from app.config.settings import settings
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# ============================================================
+# SHARED HTTP CLIENTS FOR LLM PROVIDERS
+# ============================================================
+# One connection pool per process (per event loop for async clients), so
+# TCP/TLS handshakes are paid once and connections are kept alive between
+# questions instead of being rebuilt by every provider call.
+
+_lock = threading.Lock()
+_sync_client = None
+_async_clients = {}  # id(loop) -> (loop, httpx.AsyncClient)
+_h2_missing = False  # set once the 'h2' import has failed; settings stay as configured
+
+
+def _http2_enabled() -> bool:
+    global _h2_missing
+    if not settings.LLM_HTTP2 or _h2_missing:
+        return False
+    try:
+        import h2  # noqa: F401  (httpx needs it for HTTP/2)
+        return True
+    except ImportError:
+        logger.warning("LLM_HTTP2 is enabled but the 'h2' package is missing; using HTTP/1.1")
+        _h2_missing = True
+        return False
+
+
+def _client_options() -> dict:
+    return {
+        "http2": _http2_enabled(),
+        "timeout": httpx.Timeout(settings.LLM_HTTP_TIMEOUT, connect=10.0),
+        "limits": httpx.Limits(
+            max_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.LLM_HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=settings.LLM_HTTP_KEEPALIVE_EXPIRY,
+        ),
+    }
+
+
+def get_http_client() -> httpx.Client:
+    """Process-wide sync client."""
+    global _sync_client
+    with _lock:
+        if _sync_client is None or _sync_client.is_closed:
+            _sync_client = httpx.Client(**_client_options())
+        return _sync_client
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """Async client for the running event loop (pooled connections are loop-bound)."""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        entry = _async_clients.get(id(loop))
+        if entry is None or entry[0] is not loop or entry[1].is_closed:
+            # drop clients of loops that have since been closed
+            for key, (other_loop, _) in list(_async_clients.items()):
+                if other_loop.is_closed():
+                    del _async_clients[key]
+            entry = (loop, httpx.AsyncClient(**_client_options()))
+            _async_clients[id(loop)] = entry
+        return entry[1]
+
+
+def close_http_client():
+    global _sync_client
+    with _lock:
+        if _sync_client is not None:
+            _sync_client.close()
+            _sync_client = None
+
+
+async def aclose_http_clients():
+    """Close the async client of the running loop."""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        entry = _async_clients.pop(id(loop), None)
+    if entry is not None:
+        await entry[1].aclose()
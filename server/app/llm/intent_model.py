@@ -0,0 +1,119 @@
+import re
+import threading
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+from app.config.settings import settings
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DATA_DIR = Path(__file__).resolve().parents[2] / "data"
+MODEL_VERSION = 1
+
+_WORD = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+
+def features(message: str, n_features: int) -> np.ndarray:
+    """
+    Hashed feature indexes: word unigrams and bigrams plus character
+    trigrams of each word. crc32 keeps the hashing stable across processes.
+    """
+    words = _WORD.findall(message.lower())
+    grams = [f"w:{w}" for w in words]
+    grams += [f"b:{a} {b}" for a, b in zip(words, words[1:])]
+    for w in words:
+        padded = f"<{w}>"
+        grams += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+    if len(words) <= 3:
+        grams.append("len:short")
+    return np.fromiter(
+        (zlib.crc32(g.encode("utf-8")) % n_features for g in grams), dtype=np.int64, count=len(grams)
+    )
+
+
+class IntentModel:
+    """
+    Logistic regression over hashed n-grams; predict() returns P(database).
+    Stored as an .npz with float16 weights (n_features values plus bias).
+    """
+
+    def __init__(self, weights, bias=0.0):
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.bias = float(bias)
+        self.n_features = len(self.weights)
+
+    def predict(self, message: str) -> float:
+        idx = features(message, self.n_features)
+        if not len(idx):
+            return 0.5
+        # scaled by 1/sqrt(n) so long messages do not saturate
+        z = self.bias + float(self.weights[idx].sum()) / np.sqrt(len(idx))
+        return float(1.0 / (1.0 + np.exp(-z)))
+
+    @classmethod
+    def train(cls, texts, labels, n_features=2 ** 16, epochs=300, lr=0.5, l2=1e-4):
+        """Full-batch gradient descent; labels are 1 for database, 0 for conversation."""
+        rows = [features(t, n_features) for t in texts]
+        y = np.asarray(labels, dtype=np.float32)
+        lengths = np.array([max(len(r), 1) for r in rows], dtype=np.float32)
+        scale = 1.0 / np.sqrt(lengths)
+        row_ids = np.repeat(np.arange(len(rows)), [len(r) for r in rows])
+        cols = np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+
+        w = np.zeros(n_features, dtype=np.float32)
+        b = 0.0
+        for _ in range(epochs):
+            z = b + np.bincount(row_ids, weights=w[cols], minlength=len(rows)) * scale
+            p = 1.0 / (1.0 + np.exp(-z))
+            err = (p - y) / len(rows)
+            grad = np.zeros(n_features, dtype=np.float32)
+            np.add.at(grad, cols, (err * scale)[row_ids])
+            w -= lr * (grad + l2 * w)
+            b -= lr * float(err.sum())
+        return cls(w, b)
+
+    def save(self, path):
+        path = Path(path)
+        tmp = path.with_name(path.name + ".tmp.npz")
+        np.savez_compressed(
+            tmp, version=MODEL_VERSION, weights=self.weights.astype(np.float16), bias=np.float32(self.bias)
+        )
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            if int(data["version"]) != MODEL_VERSION:
+                raise ValueError(f"Unsupported intent model version: {int(data['version'])}")
+            return cls(data["weights"], float(data["bias"]))
+
+
+_model = None
+_model_loaded = False
+_model_lock = threading.Lock()
+
+
+def model_path() -> Path:
+    return DATA_DIR / settings.INTENT_MODEL_FILE
+
+
+def get_intent_model():
+    """The trained model from data/, or None if it has not been trained yet."""
+    global _model, _model_loaded
+    if _model_loaded:
+        return _model
+    with _model_lock:
+        if not _model_loaded:
+            path = model_path()
+            try:
+                _model = IntentModel.load(path)
+                logger.info(f"Loaded intent model from {path} ({_model.n_features} features)")
+            except FileNotFoundError:
+                logger.info(f"No intent model at {path}; using keywords and the LLM")
+            except Exception as e:
+                logger.warning(f"Could not load intent model from {path}: {e}")
+            _model_loaded = True
+    return _model
@@ -1,18 +1,47 @@
+import asyncio
 import google.generativeai as genai
 from google.api_core import exceptions as google_exceptions
-from app.llm.base import BaseLLM
+from app.llm.base import BaseLLM, RateLimitError
 from app.config.settings import settings
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
 class GeminiLLM(BaseLLM):
+    # batchEmbedContents accepts up to 100 inputs per request
+    MAX_EMBED_BATCH = 100
+    MAX_EMBED_BATCH_CHARS = 400_000
+
     def __init__(self):
         if not settings.GEMINI_API_KEY:
             raise ValueError("GEMINI_API_KEY must be set")
         genai.configure(api_key=settings.GEMINI_API_KEY)
         self.model = genai.GenerativeModel(settings.GEMINI_MODEL)
 
+    @staticmethod
+    def _extract_text(response):
+        # Check if response was blocked or empty
+        if not response.candidates:
+            logger.error("Gemini response blocked: No candidates returned")
+            raise ValueError("Response was blocked by safety filters. Please try rephrasing your query.")
+
+        candidate = response.candidates[0]
+        if candidate.finish_reason == 1:  # SAFETY
+            logger.warning("Gemini response blocked by safety filters")
+            raise ValueError("Response was blocked by safety filters. Please try rephrasing your query.")
+
+        # Check if response has text
+        if not hasattr(response, 'text') or not response.text:
+            # Try to get text from parts
+            if candidate.content and candidate.content.parts:
+                text = candidate.content.parts[0].text
+                if text:
+                    return text
+            logger.error("Gemini response is empty")
+            raise ValueError("Empty response from Gemini API. Please try again.")
+
+        return response.text
+
     def chat(self, messages, temperature=0):
         try:
             # Convert messages to prompt format
@@ -21,28 +50,7 @@ class GeminiLLM(BaseLLM):
                 prompt,
                 generation_config=genai.types.GenerationConfig(temperature=temperature)
             )
-            
-            # Check if response was blocked or empty
-            if not response.candidates:
-                logger.error("Gemini response blocked: No candidates returned")
-                raise ValueError("Response was blocked by safety filters. Please try rephrasing your query.")
-            
-            candidate = response.candidates[0]
-            if candidate.finish_reason == 1:  # SAFETY
-                logger.warning("Gemini response blocked by safety filters")
-                raise ValueError("Response was blocked by safety filters. Please try rephrasing your query.")
-            
-            # Check if response has text
-            if not hasattr(response, 'text') or not response.text:
-                # Try to get text from parts
-                if candidate.content and candidate.content.parts:
-                    text = candidate.content.parts[0].text
-                    if text:
-                        return text
-                logger.error("Gemini response is empty")
-                raise ValueError("Empty response from Gemini API. Please try again.")
-            
-            return response.text
+            return self._extract_text(response)
         except ValueError:
             # Re-raise ValueError as-is (our custom errors)
             raise
@@ -69,3 +77,85 @@ class GeminiLLM(BaseLLM):
         except Exception as e:
             logger.error(f"Unexpected error with Gemini embeddings: {e}")
             raise
+
+    async def achat(self, messages, temperature=0):
+        try:
+            prompt = "\n".join(m["content"] for m in messages)
+            response = await self.model.generate_content_async(
+                prompt,
+                generation_config=genai.types.GenerationConfig(temperature=temperature)
+            )
+            return self._extract_text(response)
+        except ValueError:
+            raise
+        except google_exceptions.GoogleAPIError as e:
+            logger.error(f"Gemini API error: {e}")
+            raise ConnectionError(f"Gemini API error: {e}")
+        except AttributeError as e:
+            logger.error(f"Gemini response structure error: {e}")
+            raise ValueError(f"Unexpected response format from Gemini: {e}")
+        except Exception as e:
+            logger.error(f"Unexpected error with Gemini: {e}")
+            raise ValueError(f"Error generating response: {str(e)}")
+
+    async def astream_chat(self, messages, temperature=0):
+        try:
+            prompt = "\n".join(m["content"] for m in messages)
+            response = await self.model.generate_content_async(
+                prompt,
+                generation_config=genai.types.GenerationConfig(temperature=temperature),
+                stream=True
+            )
+            async for chunk in response:
+                if not chunk.candidates:
+                    continue
+                candidate = chunk.candidates[0]
+                if candidate.finish_reason == 1:  # SAFETY
+                    logger.warning("Gemini response blocked by safety filters")
+                    raise ValueError("Response was blocked by safety filters. Please try rephrasing your query.")
+                if candidate.content and candidate.content.parts:
+                    for part in candidate.content.parts:
+                        if part.text:
+                            yield part.text
+        except ValueError:
+            raise
+        except google_exceptions.GoogleAPIError as e:
+            logger.error(f"Gemini API error: {e}")
+            raise ConnectionError(f"Gemini API error: {e}")
+        except Exception as e:
+            logger.error(f"Unexpected error with Gemini: {e}")
+            raise ValueError(f"Error generating response: {str(e)}")
+
+    async def aembed(self, text):
+        try:
+            result = await genai.embed_content_async(
+                model=settings.GEMINI_EMBED_MODEL,
+                content=text
+            )
+            return result["embedding"]
+        except google_exceptions.GoogleAPIError as e:
+            logger.error(f"Gemini embedding error: {e}")
+            raise ConnectionError(f"Gemini embedding error: {e}")
+        except Exception as e:
+            logger.error(f"Unexpected error with Gemini embeddings: {e}")
+            raise
+
+    async def _aembed_chunk(self, texts):
+        try:
+            result = await genai.embed_content_async(
+                model=settings.GEMINI_EMBED_MODEL,
+                content=texts
+            )
+            return result["embedding"]
+        except google_exceptions.ResourceExhausted as e:
+            raise RateLimitError(f"Gemini rate limit: {e}")
+        except (google_exceptions.ServiceUnavailable, google_exceptions.DeadlineExceeded,
+                google_exceptions.InternalServerError) as e:
+            raise ConnectionError(f"Gemini embedding error: {e}")
+        except google_exceptions.GoogleAPIError as e:
+            logger.error(f"Gemini embedding error: {e}")
+            raise ValueError(f"Gemini embedding error: {e}")
+
+    async def awarmup(self):
+        # metadata lookup opens the gRPC channel used by later calls
+        await asyncio.to_thread(genai.get_model, settings.GEMINI_MODEL)
@@ -1,5 +1,7 @@
-import requests
+import json
+import httpx
 from app.llm.base import BaseLLM
+from app.llm.http import get_http_client, get_async_http_client
 from app.config.settings import settings
 from app.utils.logger import get_logger
 
@@ -9,10 +11,10 @@ class GrokLLM(BaseLLM):
     def __init__(self):
         if not settings.GROK_API_KEY or not settings.GROK_API_URL:
             raise ValueError("GROK_API_KEY and GROK_API_URL must be set")
-    
+
     def chat(self, messages, temperature=0):
         try:
-            res = requests.post(
+            res = get_http_client().post(
                 settings.GROK_API_URL,
                 headers={"Authorization": f"Bearer {settings.GROK_API_KEY}"},
                 json={"model": settings.GROK_MODEL, "messages": messages, "temperature": temperature},
@@ -20,7 +22,7 @@ class GrokLLM(BaseLLM):
             )
             res.raise_for_status()
             return res.json()["choices"][0]["message"]["content"]
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"Grok API request failed: {e}")
             raise ConnectionError(f"Failed to connect to Grok API: {e}")
         except KeyError as e:
@@ -29,3 +31,54 @@ class GrokLLM(BaseLLM):
 
     def embed(self, text):
         raise NotImplementedError("Grok embeddings not supported yet")
+
+    async def achat(self, messages, temperature=0):
+        try:
+            res = await get_async_http_client().post(
+                settings.GROK_API_URL,
+                headers={"Authorization": f"Bearer {settings.GROK_API_KEY}"},
+                json={"model": settings.GROK_MODEL, "messages": messages, "temperature": temperature},
+                timeout=30
+            )
+            res.raise_for_status()
+            return res.json()["choices"][0]["message"]["content"]
+        except httpx.HTTPError as e:
+            logger.error(f"Grok API request failed: {e}")
+            raise ConnectionError(f"Failed to connect to Grok API: {e}")
+        except KeyError as e:
+            logger.error(f"Unexpected response format from Grok API: {e}")
+            raise ValueError(f"Invalid response from Grok API: {e}")
+
+    async def astream_chat(self, messages, temperature=0):
+        try:
+            async with get_async_http_client().stream(
+                "POST",
+                settings.GROK_API_URL,
+                headers={"Authorization": f"Bearer {settings.GROK_API_KEY}"},
+                json={"model": settings.GROK_MODEL, "messages": messages, "temperature": temperature, "stream": True},
+                timeout=30,
+            ) as res:
+                res.raise_for_status()
+                # OpenAI-compatible server-sent events: "data: {...}" lines, then "data: [DONE]"
+                async for line in res.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    payload = line[len("data:"):].strip()
+                    if payload == "[DONE]":
+                        break
+                    delta = json.loads(payload)["choices"][0].get("delta", {}).get("content")
+                    if delta:
+                        yield delta
+        except httpx.HTTPError as e:
+            logger.error(f"Grok API request failed: {e}")
+            raise ConnectionError(f"Failed to connect to Grok API: {e}")
+        except (KeyError, IndexError, json.JSONDecodeError) as e:
+            logger.error(f"Unexpected response format from Grok API: {e}")
+            raise ValueError(f"Invalid response from Grok API: {e}")
+
+    async def aembed(self, text):
+        raise NotImplementedError("Grok embeddings not supported yet")
+
+    async def awarmup(self):
+        # any response will do; this only opens the pooled connection
+        await get_async_http_client().head(settings.GROK_API_URL, timeout=10)
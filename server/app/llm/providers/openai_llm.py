@@ -1,16 +1,41 @@
-from openai import OpenAI
-from openai import OpenAIError
-from app.llm.base import BaseLLM
+from openai import OpenAI, AsyncOpenAI
+from openai import OpenAIError, APIConnectionError, APIStatusError
+from openai import RateLimitError as OpenAIRateLimitError
+from app.llm.base import BaseLLM, RateLimitError, parse_retry_after
+from app.llm.http import get_http_client, get_async_http_client
 from app.config.settings import settings
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
 class OpenAILLM(BaseLLM):
+    # embeddings API: up to 2048 inputs and 300k tokens per request
+    MAX_EMBED_BATCH = 2048
+    MAX_EMBED_BATCH_CHARS = 800_000
+
     def __init__(self):
         if not settings.OPENAI_API_KEY:
             raise ValueError("OPENAI_API_KEY must be set")
-        self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+        self.client = OpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            base_url=settings.OPENAI_BASE_URL,
+            http_client=get_http_client(),
+        )
+        self._async_client = None
+        self._async_http = None
+
+    @property
+    def async_client(self):
+        # AsyncOpenAI wraps the shared async pool of the running event loop
+        http_client = get_async_http_client()
+        if self._async_http is not http_client:
+            self._async_client = AsyncOpenAI(
+                api_key=settings.OPENAI_API_KEY,
+                base_url=settings.OPENAI_BASE_URL,
+                http_client=http_client,
+            )
+            self._async_http = http_client
+        return self._async_client
 
     def chat(self, messages, temperature=0):
         try:
@@ -34,3 +59,63 @@ class OpenAILLM(BaseLLM):
         except OpenAIError as e:
             logger.error(f"OpenAI embedding error: {e}")
             raise ConnectionError(f"OpenAI embedding error: {e}")
+
+    async def achat(self, messages, temperature=0):
+        try:
+            res = await self.async_client.chat.completions.create(
+                model=settings.OPENAI_MODEL,
+                messages=messages,
+                temperature=temperature
+            )
+            return res.choices[0].message.content
+        except OpenAIError as e:
+            logger.error(f"OpenAI API error: {e}")
+            raise ConnectionError(f"OpenAI API error: {e}")
+
+    async def astream_chat(self, messages, temperature=0):
+        try:
+            stream = await self.async_client.chat.completions.create(
+                model=settings.OPENAI_MODEL,
+                messages=messages,
+                temperature=temperature,
+                stream=True
+            )
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except OpenAIError as e:
+            logger.error(f"OpenAI API error: {e}")
+            raise ConnectionError(f"OpenAI API error: {e}")
+
+    async def aembed(self, text):
+        try:
+            res = await self.async_client.embeddings.create(
+                model=settings.OPENAI_EMBED_MODEL,
+                input=text
+            )
+            return res.data[0].embedding
+        except OpenAIError as e:
+            logger.error(f"OpenAI embedding error: {e}")
+            raise ConnectionError(f"OpenAI embedding error: {e}")
+
+    async def _aembed_chunk(self, texts):
+        try:
+            # retries are handled by aembed_batch, which also honours Retry-After
+            res = await self.async_client.with_options(max_retries=0).embeddings.create(
+                model=settings.OPENAI_EMBED_MODEL,
+                input=texts
+            )
+            return [item.embedding for item in sorted(res.data, key=lambda item: item.index)]
+        except OpenAIRateLimitError as e:
+            retry_after = parse_retry_after(e.response.headers.get("retry-after"))
+            raise RateLimitError(f"OpenAI rate limit: {e}", retry_after)
+        except APIConnectionError as e:
+            raise ConnectionError(f"OpenAI embedding error: {e}")
+        except APIStatusError as e:
+            logger.error(f"OpenAI embedding error: {e}")
+            if e.status_code >= 500:
+                raise ConnectionError(f"OpenAI embedding error: {e}")
+            raise ValueError(f"OpenAI embedding error: {e}")
+
+    async def awarmup(self):
+        await self.async_client.models.list()
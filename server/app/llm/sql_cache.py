@@ -0,0 +1,257 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+from app.config.settings import settings
+from app.db.dimensions import dimension_cache
+from app.schema.registry import SCHEMA_REGISTRY
+from app.utils.logger import get_logger
+from app.utils.text import normalize_question, question_literals, refers_to_context
+
+logger = get_logger(__name__)
+
+DATA_DIR = Path(__file__).resolve().parents[2] / "data"
+
+# Files rewritten whenever the schema registry is re-synced or re-embedded
+REGISTRY_FILES = [
+    DATA_DIR / "schema_snapshot.json",
+    DATA_DIR / "schema_embeddings.pkl",
+]
+
+def cache_scope(question: str, schema: str, context: list | None) -> str:
+    """
+    Entries are only shared between questions asked against the same schema
+    text. Questions that refer back to the conversation are further scoped to
+    that conversation, since the generated SQL depends on it.
+    """
+    uses_context = bool(context) and refers_to_context(normalize_question(question))
+    h = hashlib.sha1(schema.encode("utf-8"))
+    if uses_context:
+        for msg in context[-5:]:
+            h.update(f"\0{msg['role']}\0{msg['content']}".encode("utf-8"))
+    return f"{'ctx' if uses_context else 'noctx'}:{h.hexdigest()}"
+
+
+def _registry_fingerprint() -> str:
+    h = hashlib.sha1(repr(sorted(SCHEMA_REGISTRY.items())).encode("utf-8"))
+    for path in REGISTRY_FILES:
+        try:
+            stat = path.stat()
+            h.update(f"{path.name}:{stat.st_mtime_ns}:{stat.st_size}".encode("utf-8"))
+        except OSError:
+            h.update(f"{path.name}:missing".encode("utf-8"))
+    return h.hexdigest()
+
+
+def _values(question: str, normalized: str) -> frozenset:
+    """
+    The literals and dimension values (states, years, projects) a question
+    names. "budget of Odisha" and "budget of Bihar" embed almost identically,
+    so a semantic hit also needs these to be the same.
+    """
+    values = {("literal", v) for v in question_literals(question)}
+    for entity, names in dimension_cache.current().find(normalized).items():
+        values.update((entity, name) for name in names)
+    return frozenset(values)
+
+
+class _Entry:
+    __slots__ = ("scope", "normalized", "values", "vector", "sql", "created_at")
+
+    def __init__(self, scope, normalized, values, vector, sql, created_at):
+        self.scope = scope
+        self.normalized = normalized
+        self.values = values
+        self.vector = vector
+        self.sql = sql
+        self.created_at = created_at
+
+
+class SemanticSQLCache:
+    """
+    Cache of generated SQL looked up by exact normalized question first,
+    then by cosine similarity of the question embedding within the same scope;
+    a similar question only counts when it names the same literals and
+    dimension values (see _values).
+
+    - LRU eviction once `max_entries` is reached, TTL expiry on lookup
+    - whole cache is flushed when the schema registry fingerprint changes
+    """
+
+    def __init__(self, threshold=0.95, max_entries=1000, ttl=3600.0, registry_check_interval=10.0):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.registry_check_interval = registry_check_interval
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # id -> _Entry, least recently used first
+        self._exact = {}  # (scope, normalized) -> id
+        self._scopes = {}  # scope -> {"ids": [...], "matrix": np.ndarray | None, "matrix_ids": [...]}
+        self._next_id = 0
+
+        self._fingerprint = _registry_fingerprint()
+        self._fingerprint_checked = time.monotonic()
+
+        self._hits = 0
+        self._semantic_hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+
+    # ------------------------------------------------------------
+    # Internal helpers (call with the lock held)
+    # ------------------------------------------------------------
+
+    def _check_registry(self):
+        now = time.monotonic()
+        if now - self._fingerprint_checked < self.registry_check_interval:
+            return
+        self._fingerprint_checked = now
+        fingerprint = _registry_fingerprint()
+        if fingerprint != self._fingerprint:
+            logger.info("Schema registry changed, invalidating SQL cache")
+            self._fingerprint = fingerprint
+            self._clear()
+
+    def _clear(self):
+        self._entries.clear()
+        self._exact.clear()
+        self._scopes.clear()
+        self._invalidations += 1
+
+    def _remove(self, entry_id):
+        entry = self._entries.pop(entry_id)
+        self._exact.pop((entry.scope, entry.normalized), None)
+        scope = self._scopes.get(entry.scope)
+        if scope:
+            scope["ids"].remove(entry_id)
+            scope["matrix"] = None
+            if not scope["ids"]:
+                del self._scopes[entry.scope]
+
+    def _touch(self, entry_id):
+        entry = self._entries[entry_id]
+        if time.time() - entry.created_at > self.ttl:
+            self._remove(entry_id)
+            self._expirations += 1
+            return None
+        self._entries.move_to_end(entry_id)
+        return entry
+
+    @staticmethod
+    def _unit(embedding):
+        if embedding is None:
+            return None
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def _candidates(self, scope_key, vector):
+        """(id, score) of the entries at or above the threshold, most similar first."""
+        scope = self._scopes.get(scope_key)
+        if not scope:
+            return []
+
+        # The stacked matrix is rebuilt lazily after the scope changes
+        matrix = scope["matrix"]
+        if matrix is None or matrix.shape[1] != vector.shape[0]:
+            ids = [i for i in scope["ids"]
+                   if self._entries[i].vector is not None and self._entries[i].vector.shape == vector.shape]
+            scope["matrix_ids"] = ids
+            matrix = scope["matrix"] = (
+                np.stack([self._entries[i].vector for i in ids]) if ids
+                else np.empty((0, vector.shape[0]), dtype=np.float32)
+            )
+        if not scope["matrix_ids"]:
+            return []
+
+        scores = matrix @ vector
+        ranked = np.flatnonzero(scores >= self.threshold)
+        ranked = ranked[np.argsort(-scores[ranked], kind="stable")]
+        ids = scope["matrix_ids"]
+        return [(ids[i], float(scores[i])) for i in ranked]
+
+    # ------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------
+
+    def lookup(self, question, scope, embedding=None):
+        """Return cached SQL for the question, or None on a miss."""
+        normalized = normalize_question(question)
+        vector = self._unit(embedding)
+
+        with self._lock:
+            self._check_registry()
+
+            entry_id = self._exact.get((scope, normalized))
+            if entry_id is not None and self._touch(entry_id):
+                self._hits += 1
+                return self._entries[entry_id].sql
+
+            if vector is not None:
+                values = _values(question, normalized)
+                # an expired entry is dropped and the next most similar one tried
+                for entry_id, score in self._candidates(scope, vector):
+                    if self._entries[entry_id].values == values and self._touch(entry_id):
+                        self._hits += 1
+                        self._semantic_hits += 1
+                        logger.info(f"SQL cache semantic hit (similarity {score:.3f})")
+                        return self._entries[entry_id].sql
+
+            self._misses += 1
+            return None
+
+    def store(self, question, scope, sql, embedding=None):
+        normalized = normalize_question(question)
+        vector = self._unit(embedding)
+        values = _values(question, normalized)
+
+        with self._lock:
+            existing = self._exact.get((scope, normalized))
+            if existing is not None:
+                self._remove(existing)
+
+            while len(self._entries) >= self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._evictions += 1
+
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = _Entry(scope, normalized, values, vector, sql, time.time())
+            self._exact[(scope, normalized)] = entry_id
+            scope_entry = self._scopes.setdefault(scope, {"ids": [], "matrix": None, "matrix_ids": []})
+            scope_entry["ids"].append(entry_id)
+            scope_entry["matrix"] = None
+
+    def invalidate(self):
+        with self._lock:
+            self._clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "semantic_hits": self._semantic_hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "invalidations": self._invalidations,
+            }
+
+
+sql_cache = SemanticSQLCache(
+    threshold=settings.SQL_CACHE_SIMILARITY,
+    max_entries=settings.SQL_CACHE_MAX_ENTRIES,
+    ttl=settings.SQL_CACHE_TTL,
+)
@@ -0,0 +1,302 @@
+import re
+import threading
+
+from app.config.settings import settings
+from app.db.dimensions import dimension_cache
+from app.schema.registry import SCHEMA_REGISTRY
+from app.utils.logger import get_logger
+from app.utils.text import normalize_question, refers_to_context
+
+logger = get_logger(__name__)
+
+
+# ============================================================
+# PARAMETERIZED SQL TEMPLATES
+# ============================================================
+#
+# The most common question shapes (totals by state, by year, for a named
+# project) are answered from these templates instead of an LLM call. State,
+# year and project names are resolved from the dimension cache and passed
+# as bind parameters ($1, $2, ...), so every question of one shape runs the
+# same statement text.
+#
+# A template matches when all of its `match` patterns are found in the
+# question (with the entity values removed), every entity mentioned in the
+# question is one of its `filters`, and every `requires` entity is present.
+# A filter value is bound as it is spelled in the column the filter compares
+# against (s.state_name -> states, unqualified -> the template's `object`);
+# if that column has no such value the template does not apply.
+# Questions with anything the templates cannot express (rankings, other
+# columns, comparisons, references to earlier turns, unrecognized numbers)
+# go to the LLM.
+
+_EXPENDITURE = r"\b(?:expenditure|expenditures|expense|expenses|spend|spent|spending)\b"
+_BUDGET = r"\b(?:budget|budgets|allocation|allocated)\b"
+_PROJECT_COUNT = r"\b(?:how many|number of|count of|total)\s+projects?\b|\bprojects?\s+count\b"
+_TOTAL = r"\b(?:total|how much|overall|sum)\b"
+_BY_STATE = r"\b(?:by|per|each|every|across|all)\s+states?\b|\bstate\s*-?\s*wise\b"
+_BY_YEAR = (
+    r"\b(?:by|per|each|every|across|all|over)\s+(?:the\s+)?(?:financial\s+|fiscal\s+)?years?\b"
+    r"|\byear\s*-?\s*wise\b|\byearly\b|\bannual(?:ly)?\b|\btrend\b"
+)
+
+_BUDGET_FROM = """FROM budgets b
+JOIN projects p ON p.project_id = b.project_id
+LEFT JOIN states s ON s.state_id = p.state_id
+LEFT JOIN years y ON y.year_id = p.year_id"""
+
+_PROJECT_FROM = """FROM projects p
+LEFT JOIN states s ON s.state_id = p.state_id
+LEFT JOIN years y ON y.year_id = p.year_id"""
+
+SQL_TEMPLATES = [
+
+    # =========================
+    # CSR EXPENDITURE
+    # =========================
+
+    {
+        "name": "expenditure_by_state",
+        "object": "csr_expenditure_view",
+        "match": (_EXPENDITURE, _BY_STATE),
+        "filters": {"year": "financial_year"},
+        "sql": """SELECT state_name, SUM(expenditure_amount) AS total_expenditure
+FROM csr_expenditure_view{where}
+GROUP BY state_name
+ORDER BY total_expenditure DESC""",
+    },
+
+    {
+        "name": "expenditure_by_year",
+        "object": "csr_expenditure_view",
+        "match": (_EXPENDITURE, _BY_YEAR),
+        "filters": {"state": "state_name"},
+        "sql": """SELECT financial_year, SUM(expenditure_amount) AS total_expenditure
+FROM csr_expenditure_view{where}
+GROUP BY financial_year
+ORDER BY financial_year""",
+    },
+
+    {
+        "name": "total_expenditure",
+        "object": "csr_expenditure_view",
+        "match": (_EXPENDITURE, _TOTAL),
+        "filters": {"state": "state_name", "year": "financial_year"},
+        "sql": """SELECT SUM(expenditure_amount) AS total_expenditure
+FROM csr_expenditure_view{where}""",
+    },
+
+    # =========================
+    # BUDGETS
+    # =========================
+
+    {
+        "name": "project_budget",
+        "object": "budgets",
+        "match": (_BUDGET,),
+        "requires": ("project",),
+        "filters": {"project": "p.project_name"},
+        "sql": """SELECT p.project_name, SUM(b.amount) AS total_budget
+FROM projects p
+JOIN budgets b ON b.project_id = p.project_id{where}
+GROUP BY p.project_name""",
+    },
+
+    {
+        "name": "budget_by_state",
+        "object": "budgets",
+        "match": (_BUDGET, _BY_STATE),
+        "filters": {"year": "y.year_name"},
+        "sql": f"""SELECT s.state_name, SUM(b.amount) AS total_budget
+{_BUDGET_FROM}{{where}}
+GROUP BY s.state_name
+ORDER BY total_budget DESC""",
+    },
+
+    {
+        "name": "budget_by_year",
+        "object": "budgets",
+        "match": (_BUDGET, _BY_YEAR),
+        "filters": {"state": "s.state_name"},
+        "sql": f"""SELECT y.year_name, SUM(b.amount) AS total_budget
+{_BUDGET_FROM}{{where}}
+GROUP BY y.year_name
+ORDER BY y.year_name""",
+    },
+
+    {
+        "name": "total_budget",
+        "object": "budgets",
+        "match": (_BUDGET, _TOTAL),
+        "filters": {"state": "s.state_name", "year": "y.year_name"},
+        "sql": f"""SELECT SUM(b.amount) AS total_budget
+{_BUDGET_FROM}{{where}}""",
+    },
+
+    # =========================
+    # PROJECTS
+    # =========================
+
+    {
+        "name": "projects_by_state",
+        "object": "projects",
+        "match": (_PROJECT_COUNT, _BY_STATE),
+        "filters": {"year": "y.year_name"},
+        "sql": f"""SELECT s.state_name, COUNT(*) AS project_count
+{_PROJECT_FROM}{{where}}
+GROUP BY s.state_name
+ORDER BY project_count DESC""",
+    },
+
+    {
+        "name": "projects_by_year",
+        "object": "projects",
+        "match": (_PROJECT_COUNT, _BY_YEAR),
+        "filters": {"state": "s.state_name"},
+        "sql": f"""SELECT y.year_name, COUNT(*) AS project_count
+{_PROJECT_FROM}{{where}}
+GROUP BY y.year_name
+ORDER BY y.year_name""",
+    },
+
+    {
+        "name": "project_count",
+        "object": "projects",
+        "match": (_PROJECT_COUNT,),
+        "filters": {"state": "s.state_name", "year": "y.year_name"},
+        "sql": f"""SELECT COUNT(*) AS project_count
+{_PROJECT_FROM}{{where}}""",
+    },
+]
+
+# Anything the templates cannot express sends the question to the LLM
+_UNSUPPORTED = re.compile(
+    r"\b(?:top|bottom|first|last|average|avg|mean|median|compare|comparison|versus|vs|"
+    r"except|excluding|without|not|no|more|less|greater|fewer|above|below|between|"
+    r"highest|lowest|most|least|max|maximum|min|minimum|rank|ranking|percent|percentage|"
+    r"share|growth|district|districts|beneficiary|beneficiaries|women|men|sector|sectors|"
+    r"program|programs|programme|programmes|month|months|monthly|quarter|quarters|date|"
+    r"started|start|ending|end|ended|active|completed|ongoing|list|names|where|which|who)\b"
+    r"|\d"
+)
+
+class TemplateMatch:
+    """
+    A question resolved to a template. `sql` holds $n placeholders and runs
+    with `params`; `rendered_sql` has the values inlined and is what users see
+    (and what /export runs).
+    """
+
+    __slots__ = ("name", "sql", "params", "rendered_sql")
+
+    def __init__(self, name, sql, params):
+        self.name = name
+        self.sql = sql
+        self.params = tuple(params)
+        self.rendered_sql = _render(sql, self.params)
+
+
+def _literal(value) -> str:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _render(sql: str, params) -> str:
+    return re.sub(r"\$(\d+)", lambda m: _literal(params[int(m.group(1)) - 1]), sql)
+
+
+# table aliases used in the template SQL above
+_TABLE_ALIASES = {"b": "budgets", "p": "projects", "s": "states", "y": "years"}
+
+
+def _source(template, column):
+    """The (table, column) a template filter column reads its values from."""
+    alias, _, name = column.rpartition(".")
+    return (_TABLE_ALIASES[alias] if alias else template["object"], name)
+
+
+def _compile_templates():
+    compiled = []
+    for template in SQL_TEMPLATES:
+        if template["object"] not in SCHEMA_REGISTRY:
+            logger.warning(f"SQL template '{template['name']}' skipped: {template['object']} is not in SCHEMA_REGISTRY")
+            continue
+        compiled.append({
+            **template,
+            "patterns": [re.compile(p) for p in template["match"]],
+            "requires": set(template.get("requires", ())),
+            "sources": {entity: _source(template, column) for entity, column in template["filters"].items()},
+        })
+    return compiled
+
+
+_TEMPLATES = _compile_templates()
+
+_stats_lock = threading.Lock()
+_stats = {"matched": 0, "missed": 0, "templates": {}}
+
+
+def _record(name):
+    with _stats_lock:
+        if name is None:
+            _stats["missed"] += 1
+        else:
+            _stats["matched"] += 1
+            _stats["templates"][name] = _stats["templates"].get(name, 0) + 1
+
+
+def template_stats():
+    """How many questions were answered from templates, per template, vs sent to the LLM."""
+    with _stats_lock:
+        stats = {"matched": _stats["matched"], "missed": _stats["missed"], "templates": dict(_stats["templates"])}
+    total = stats["matched"] + stats["missed"]
+    stats["hit_rate"] = round(stats["matched"] / total, 3) if total else 0.0
+    stats["dimensions"] = dimension_cache.stats()
+    return stats
+
+
+def _match(question: str, index, context=None):
+    normalized = normalize_question(question)
+    if context and refers_to_context(normalized):
+        return None
+
+    entities = index.find(normalized)
+    # one value per entity; several states or years is a comparison
+    if any(len(values) > 1 for values in entities.values()):
+        return None
+    rest = index.strip(normalized)
+    if _UNSUPPORTED.search(rest):
+        return None
+
+    for template in _TEMPLATES:
+        if not template["requires"] <= entities.keys():
+            continue
+        if not entities.keys() <= template["filters"].keys():
+            continue
+        if not all(p.search(rest) for p in template["patterns"]):
+            continue
+
+        clauses, params = [], []
+        for entity, column in template["filters"].items():
+            if entity in entities:
+                value = index.spelling(entity, entities[entity][0], template["sources"][entity])
+                if value is None:
+                    break
+                params.append(value)
+                clauses.append(f"{column} = ${len(params)}")
+        else:
+            where = ("\nWHERE " + " AND ".join(clauses)) if clauses else ""
+            return TemplateMatch(template["name"], template["sql"].format(where=where), params)
+    return None
+
+
+async def amatch_template(question: str, context: list | None = None):
+    """Resolve the question to a TemplateMatch, or None when the LLM should write the SQL."""
+    if not settings.SQL_TEMPLATES_ENABLED:
+        return None
+    match = _match(question, await dimension_cache.aget(), context)
+    _record(match and match.name)
+    if match:
+        logger.info(f"SQL template '{match.name}' matched with params {match.params}")
+    return match
@@ -0,0 +1,290 @@
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+
+from app.config.settings import settings
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+# ============================================================
+# LOCAL INSIGHTS FOR SIMPLE RESULT SHAPES
+# ============================================================
+#
+# Results whose shape is easy to describe are summarized here with pandas
+# instead of an LLM call. The text follows the INSIGHTS/DOWNLOAD template
+# of RESULT_SYSTEM_PROMPT in formatter.py.
+#
+#   scalar       one row, one to a few numeric values
+#   breakdown    one label column + numeric measures (group-by results)
+#   time_series  one period column (date, year, "2022-23") + numeric measures
+#   wide         many columns; described by size and key measure ranges
+#
+# Anything else (several label columns, no measures, partial previews of
+# larger results) returns None and goes to the LLM, as does a shape whose
+# summary would only restate the row count (no measure values at all).
+
+DOWNLOAD_TEXT = "You can download this data as an Excel file for reporting or sharing."
+
+_TIME_NAME = re.compile(r"(^|_)(year|yr|fy|month|quarter|qtr|date|day|week|period)(_|$)", re.I)
+_FY_VALUE = re.compile(r"^(?:fy\s*)?\d{4}\s*[-/]\s*\d{2,4}$", re.I)
+_ID_NAME = re.compile(r"(^|_)(id|code|pincode|pin|phone|mobile)$", re.I)
+
+SHAPES = ("scalar", "breakdown", "time_series", "wide")
+
+_stats_lock = threading.Lock()
+_stats = {shape: 0 for shape in SHAPES}
+_stats["llm"] = 0
+
+
+def record_llm():
+    """Count a result that had to be explained by the LLM."""
+    with _stats_lock:
+        _stats["llm"] += 1
+
+
+def _record(shape):
+    with _stats_lock:
+        _stats[shape] += 1
+
+
+def summarizer_stats():
+    """How many results were explained locally (per shape) vs by the LLM."""
+    with _stats_lock:
+        stats = dict(_stats)
+    local = sum(stats[s] for s in SHAPES)
+    total = local + stats["llm"]
+    stats["local"] = local
+    stats["total"] = total
+    stats["skip_rate"] = round(local / total, 3) if total else 0.0
+    return stats
+
+
+# -----------------------------
+# COLUMN CLASSIFICATION
+# -----------------------------
+
+def _label(column) -> str:
+    return str(column).replace("_", " ").strip().lower()
+
+
+def _as_numeric(series: pd.Series):
+    """The column as floats, or None if it is not numeric (Decimal columns count)."""
+    if pd.api.types.is_bool_dtype(series):
+        return None
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype("float64")
+    if series.dtype == object:
+        values = pd.to_numeric(series, errors="coerce")
+        if values.notna().sum() == series.notna().sum() and values.notna().any():
+            return values.astype("float64")
+    return None
+
+
+def _is_time(column, series: pd.Series) -> bool:
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return True
+    if _TIME_NAME.search(str(column)):
+        return True
+    if series.dtype == object:
+        sample = series.dropna().astype(str).head(20)
+        return len(sample) > 0 and bool(sample.str.match(_FY_VALUE).all())
+    return False
+
+
+def _split_columns(df: pd.DataFrame):
+    """(time columns, label columns, {measure: float series})."""
+    time_cols, label_cols, measures = [], [], {}
+    for column in df.columns:
+        series = df[column]
+        if _is_time(column, series):
+            time_cols.append(column)
+            continue
+        values = _as_numeric(series)
+        if values is None or _ID_NAME.search(str(column)):
+            label_cols.append(column)
+        else:
+            measures[column] = values
+    return time_cols, label_cols, measures
+
+
+# -----------------------------
+# NUMBER FORMATTING
+# -----------------------------
+
+def _fmt(value) -> str:
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return "not available"
+    value = float(value)
+    if value.is_integer():
+        return f"{int(value):,}"
+    return f"{value:,.2f}"
+
+
+def _pct(part, whole) -> str:
+    if not whole:
+        return "n/a"
+    return f"{part / whole * 100:.1f}%"
+
+
+def _is_additive(column) -> bool:
+    # averages, rates and percentages do not add up to a meaningful total
+    return not re.search(r"(avg|average|mean|rate|ratio|pct|percent|share|median)", str(column), re.I)
+
+
+# -----------------------------
+# SHAPE SUMMARIES
+# -----------------------------
+
+def _scalar(df, measures):
+    row = df.iloc[0]
+    parts = [f"the {_label(c)} is {_fmt(values.iloc[0])}" for c, values in measures.items()]
+    labels = [f"{_label(c)} {row[c]}" for c in df.columns if c not in measures and pd.notna(row[c])]
+    text = "For the selected criteria, " + "; ".join(parts) + "."
+    if labels:
+        text += " This figure relates to " + ", ".join(labels) + "."
+    return [text[0].upper() + text[1:]]
+
+
+def _breakdown(df, label_col, measures, k):
+    column, values = next(iter(measures.items()))
+    names = df[label_col].astype(str).to_numpy()
+    data = values.to_numpy()
+    valid = ~np.isnan(data)
+    n = len(df)
+    if not valid.any():
+        return None
+    sentences = [f"The data shows {_label(column)} for {n:,} {_label(label_col)} entries."]
+
+    order = np.argsort(-np.where(valid, data, -np.inf), kind="stable")
+    top = [i for i in order[:k] if valid[i]]
+    if _is_additive(column) and (data[valid] >= 0).all():
+        total = data[valid].sum()
+        sentences.append(f"Overall, {_label(column)} adds up to {_fmt(total)}.")
+        leaders = ", ".join(f"{names[i]} ({_fmt(data[i])}, {_pct(data[i], total)})" for i in top)
+        sentences.append(f"The largest contributions come from {leaders}.")
+        if len(top) > 1 and valid.sum() > len(top):
+            sentences.append(f"Together the top {len(top)} account for {_pct(data[top].sum(), total)} of the total.")
+    else:
+        leaders = ", ".join(f"{names[i]} ({_fmt(data[i])})" for i in top)
+        sentences.append(f"The highest values are for {leaders}.")
+
+    low = [i for i in order if valid[i]][-1]
+    if low not in top:
+        sentences.append(f"The lowest is {names[low]} at {_fmt(data[low])}.")
+    if (~valid).any():
+        missing = int((~valid).sum())
+        sentences.append(f"{missing} {'entry has' if missing == 1 else 'entries have'} no recorded value.")
+    return sentences
+
+
+def _time_series(df, time_col, measures):
+    column, values = next(iter(measures.items()))
+    frame = pd.DataFrame({"period": df[time_col], "value": values}).dropna()
+    if frame.empty:
+        return [f"No {_label(column)} values were recorded for the periods shown."]
+    frame = frame.sort_values("period", kind="stable")
+    periods = frame["period"].astype(str).to_numpy()
+    data = frame["value"].to_numpy()
+
+    first, last = data[0], data[-1]
+    sentences = [
+        f"The data tracks {_label(column)} over {len(frame):,} periods, "
+        f"from {periods[0]} to {periods[-1]}."
+    ]
+    if len(frame) > 1:
+        if first:
+            change = (last - first) / abs(first) * 100
+            direction = "increased" if last > first else "decreased" if last < first else "remained unchanged"
+            sentences.append(
+                f"It {direction} from {_fmt(first)} to {_fmt(last)}"
+                + (f" ({change:+.1f}%)." if last != first else ".")
+            )
+        else:
+            sentences.append(f"It moved from {_fmt(first)} to {_fmt(last)}.")
+        peak, trough = int(np.argmax(data)), int(np.argmin(data))
+        sentences.append(
+            f"The highest value was {_fmt(data[peak])} in {periods[peak]} "
+            f"and the lowest {_fmt(data[trough])} in {periods[trough]}."
+        )
+    if _is_additive(column) and (data >= 0).all():
+        sentences.append(f"Across all periods the total is {_fmt(data.sum())}.")
+    return sentences[:4]
+
+
+def _wide(df, measures):
+    sentences = [f"The data contains {len(df):,} records with {len(df.columns)} fields."]
+    described = []
+    for column, values in list(measures.items())[:2]:
+        data = values.to_numpy()
+        data = data[~np.isnan(data)]
+        if not len(data):
+            continue
+        text = f"{_label(column)} ranges from {_fmt(data.min())} to {_fmt(data.max())}"
+        if _is_additive(column) and (data >= 0).all():
+            text += f" with a total of {_fmt(data.sum())}"
+        described.append(text)
+    if not described:
+        return None
+    sentences.append("; ".join(described).capitalize() + ".")
+    return sentences
+
+
+def _render(sentences) -> str:
+    return "INSIGHTS:\n" + " ".join(sentences) + "\n\nDOWNLOAD:\n" + DOWNLOAD_TEXT
+
+
+def classify_shape(df: pd.DataFrame):
+    """Return (shape, time_cols, label_cols, measures); shape is None if not handled."""
+    time_cols, label_cols, measures = _split_columns(df)
+    n_rows, n_cols = df.shape
+
+    if n_rows == 1:
+        shape = "scalar" if measures and len(measures) <= 3 else None
+        return shape, time_cols, label_cols, measures
+    if not measures:
+        return None, time_cols, label_cols, measures
+    if n_cols >= settings.FAST_INSIGHTS_WIDE_COLUMNS:
+        return "wide", time_cols, label_cols, measures
+    if len(time_cols) == 1 and not label_cols and df[time_cols[0]].is_unique:
+        return "time_series", time_cols, label_cols, measures
+    if len(label_cols) == 1 and not time_cols and n_rows <= settings.FAST_INSIGHTS_MAX_GROUPS:
+        return "breakdown", time_cols, label_cols, measures
+    return None, time_cols, label_cols, measures
+
+
+def summarize(df: pd.DataFrame, total_rows: int = None):
+    """
+    Explain the result locally in the INSIGHTS/DOWNLOAD format, or return
+    None when the LLM should do it. Partial results (previews of a larger
+    or truncated result) always go to the LLM, since totals would be wrong.
+    """
+    if not settings.FAST_INSIGHTS_ENABLED or df.empty:
+        return None
+    if df.attrs.get("truncated") or (total_rows is not None and total_rows > len(df)):
+        return None
+
+    try:
+        shape, time_cols, label_cols, measures = classify_shape(df)
+        if shape is None:
+            return None
+        if shape == "scalar":
+            sentences = _scalar(df, measures)
+        elif shape == "breakdown":
+            sentences = _breakdown(df, label_cols[0], measures, settings.FAST_INSIGHTS_TOP_K)
+        elif shape == "time_series":
+            sentences = _time_series(df, time_cols[0], measures)
+        else:
+            sentences = _wide(df, measures)
+    except Exception as e:
+        logger.warning(f"Local summary failed, falling back to the LLM: {e}")
+        return None
+    if not sentences:
+        return None
+
+    _record(shape)
+    logger.info(f"Result explained locally ({shape}, {len(df)} rows)")
+    return _render(sentences)
@@ -1,4 +1,7 @@
+from app.config.settings import settings
 from app.llm.factory import get_llm
+from app.llm.sql_cache import sql_cache, cache_scope
+from app.security.sql_guard import validate_sql
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -87,44 +90,11 @@ def _is_prompt_injection(text: str) -> bool:
     return any(p in text for p in BLOCKED_PHRASES)
 
 
-# ============================================================
-# SQL SAFETY VALIDATION
-# ============================================================
-
-FORBIDDEN_SQL = [
-    "update ",
-    "delete ",
-    "insert ",
-    "drop ",
-    "alter ",
-    "truncate "
-]
-
-
-def _is_safe_sql(sql: str) -> bool:
-    sql_lower = sql.lower().strip()
-    return (
-        sql_lower.startswith("select")
-        and not any(word in sql_lower for word in FORBIDDEN_SQL)
-    )
-
-
 # ============================================================
 # MAIN SQL GENERATION FUNCTION
 # ============================================================
 
-def generate_sql(question: str, schema: str, context: list | None = None) -> str:
-    """
-    Generate a safe, deterministic PostgreSQL SELECT query
-    from a natural language question.
-    """
-
-    if _is_prompt_injection(question):
-        logger.warning("Prompt injection attempt detected")
-        raise ValueError("Prompt injection attempt blocked")
-
-    llm = get_llm()
-
+def _build_sql_messages(question: str, schema: str, context: list | None):
     # Limit context to last 5 messages only
     context_text = "\n".join(
         f"{msg['role'].upper()}: {msg['content']}"
@@ -138,7 +108,9 @@ def generate_sql(question: str, schema: str, context: list | None = None) -> str
         question=question
     )
 
-    messages = [
+    logger.debug("SQL Generation Prompt:\n%s", prompt)
+
+    return [
         {
             "role": "system",
             "content": "You are a locked SQL generation engine. Follow instructions strictly."
@@ -149,15 +121,8 @@ def generate_sql(question: str, schema: str, context: list | None = None) -> str
         }
     ]
 
-    # print("SQL Generation Prompt:\n------------------------------------------?", prompt)
-
-    logger.debug("SQL Generation Prompt:\n%s", prompt)
-
-    sql = llm.chat(
-        messages=messages,
-        temperature=0  # Deterministic, no creativity
-    )
 
+def _clean_sql(sql: str) -> str:
     if not sql:
         raise ValueError("Empty SQL generated")
 
@@ -167,9 +132,53 @@ def generate_sql(question: str, schema: str, context: list | None = None) -> str
     if sql == "CANNOT_GENERATE_SQL_NEED_CLARIFICATION":
         return sql
 
-    if not _is_safe_sql(sql):
-        logger.error("Unsafe SQL generated: %s", sql)
+    try:
+        validate_sql(sql)
+    except ValueError as e:
+        logger.error("Unsafe SQL generated (%s): %s", e, sql)
         raise ValueError("Unsafe SQL generated")
 
     logger.info("Generated SQL: %s", sql)
     return sql
+
+
+def _remember_sql(question, scope, sql, embedding):
+    if scope and sql != "CANNOT_GENERATE_SQL_NEED_CLARIFICATION":
+        sql_cache.store(question, scope, sql, embedding)
+    return sql
+
+
+async def agenerate_sql(question: str, schema: str, context: list | None = None, embedding=None,
+                        info: dict = None) -> str:
+    """
+    Generate a safe, deterministic PostgreSQL SELECT query
+    from a natural language question.
+
+    Previously generated SQL is reused for the same (or, when `embedding` of
+    the normalized question is given, a semantically similar) question.
+    If `info` is given, info["source"] is set to "cache" or "llm".
+    """
+
+    if _is_prompt_injection(question):
+        logger.warning("Prompt injection attempt detected")
+        raise ValueError("Prompt injection attempt blocked")
+
+    scope = cache_scope(question, schema, context) if settings.SQL_CACHE_ENABLED else None
+    if scope:
+        cached = sql_cache.lookup(question, scope, embedding)
+        if cached:
+            logger.info("Using cached SQL: %s", cached)
+            if info is not None:
+                info["source"] = "cache"
+            return cached
+
+    if info is not None:
+        info["source"] = "llm"
+    llm = get_llm()
+
+    sql = await llm.achat(
+        messages=_build_sql_messages(question, schema, context),
+        temperature=0
+    )
+
+    return _remember_sql(question, scope, _clean_sql(sql), embedding)
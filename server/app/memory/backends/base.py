@@ -0,0 +1,90 @@
+import asyncio
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+
+TITLE_LENGTH = 80
+
+
+def utc_now():
+    """
+    Message timestamp: naive UTC from the app clock. Messages are stamped
+    when saved and stored with that time, so queued and written messages
+    (and chat_sessions.last_activity) are ordered by the same clock.
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def session_title(content):
+    """Sidebar title for a session: the start of its first question on one line."""
+    title = " ".join(str(content).split())
+    return title if len(title) <= TITLE_LENGTH else title[:TITLE_LENGTH - 3].rstrip() + "..."
+
+
+def session_rows(messages):
+    """
+    (session_id, started_at, last_activity, message count, title or None)
+    per session of the messages, in session order.
+    """
+    sessions = {}
+    for session_id, role, content, created_at in messages:
+        entry = sessions.setdefault(session_id, [session_id, created_at, created_at, 0, None])
+        entry[1] = min(entry[1], created_at)
+        entry[2] = max(entry[2], created_at)
+        entry[3] += 1
+        if entry[4] is None and role == "user":
+            entry[4] = session_title(content)
+    # a fixed order keeps concurrent upserts from deadlocking
+    return [tuple(sessions[sid]) for sid in sorted(sessions)]
+
+
+class BaseChatStore(ABC):
+    """
+    Storage for chat_history and chat_sessions. Methods raise on failure;
+    app/memory/chat_store.py logs and degrades.
+
+    Rows returned:
+      history        (role, content, created_at), oldest first
+      history_page   (id, role, content), newest first
+      sessions       (session_id, started_at, last_activity, message_count, title)
+    """
+
+    # True when writes must all come from one thread (history_writer's)
+    single_writer = False
+
+    @abstractmethod
+    def init(self):
+        """Create the tables and indexes if needed (and backfill chat_sessions)."""
+
+    @abstractmethod
+    def write(self, messages):
+        """
+        Insert (session_id, role, content, created_at) messages and update
+        their sessions in one transaction; created_at comes from utc_now().
+        """
+
+    @abstractmethod
+    def history(self, session_id, limit=None):
+        """A session's messages; with `limit`, the most recent `limit`."""
+
+    @abstractmethod
+    def history_page(self, session_id, limit, before=None):
+        """Up to `limit` messages of a session with id < before."""
+
+    @abstractmethod
+    def sessions(self, limit, after=None):
+        """Up to `limit` sessions by last activity, descending, after the (last_activity, session_id) key."""
+
+    @abstractmethod
+    def sessions_by_id(self, session_ids):
+        """Rows for the given sessions (those that exist)."""
+
+    # Async variants. Stores with a native async driver override these;
+    # the defaults run the blocking call on a worker thread.
+    async def awrite(self, messages):
+        return await asyncio.to_thread(self.write, messages)
+
+    async def ahistory(self, session_id, limit=None):
+        return await asyncio.to_thread(self.history, session_id, limit)
+
+    def close(self):
+        pass
@@ -0,0 +1,212 @@
+from psycopg2.extras import execute_values
+
+from app.db.connection import get_connection, acquire, CHAT_POOL
+from app.memory.backends.base import BaseChatStore, TITLE_LENGTH, session_rows
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# chat_sessions is kept up to date in the same transaction as the messages
+SESSION_UPSERT = """
+    INSERT INTO chat_sessions (session_id, started_at, last_activity, message_count, title)
+    VALUES %s
+    ON CONFLICT (session_id) DO UPDATE SET
+        last_activity = GREATEST(chat_sessions.last_activity, EXCLUDED.last_activity),
+        message_count = chat_sessions.message_count + EXCLUDED.message_count,
+        title = COALESCE(chat_sessions.title, EXCLUDED.title)
+"""
+_ASYNC_SESSION_UPSERT = SESSION_UPSERT.replace("%s", "($1, $2, $3, $4, $5)")
+
+_SESSION_COLUMNS = "session_id, started_at, last_activity, message_count, title"
+
+
+class PostgresChatStore(BaseChatStore):
+    """Chat history in the network Postgres, on the CHAT_POOL connections."""
+
+    def init(self):
+        conn = get_connection(CHAT_POOL)
+        try:
+            cur = conn.cursor()
+
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS chat_history (
+                    id BIGSERIAL PRIMARY KEY,
+                    session_id VARCHAR(36) NOT NULL,
+                    role VARCHAR(20) NOT NULL CHECK (role IN ('user', 'assistant')),
+                    content TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+
+            # Create index for faster queries
+            cur.execute("""
+                CREATE INDEX IF NOT EXISTS idx_chat_history_session_id
+                ON chat_history(session_id, created_at)
+            """)
+            # Keyset pages of a session's history (id < before ORDER BY id DESC)
+            cur.execute("""
+                CREATE INDEX IF NOT EXISTS idx_chat_history_session_message
+                ON chat_history(session_id, id)
+            """)
+
+            # One row per session for the sidebar, updated with every saved message
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS chat_sessions (
+                    session_id VARCHAR(36) PRIMARY KEY,
+                    started_at TIMESTAMP NOT NULL,
+                    last_activity TIMESTAMP NOT NULL,
+                    message_count INTEGER NOT NULL DEFAULT 0,
+                    title TEXT
+                )
+            """)
+            cur.execute("""
+                CREATE INDEX IF NOT EXISTS idx_chat_sessions_last_activity
+                ON chat_sessions(last_activity DESC, session_id DESC)
+            """)
+
+            # Backfill once from existing history
+            cur.execute("""
+                INSERT INTO chat_sessions (session_id, started_at, last_activity, message_count, title)
+                SELECT session_id, MIN(created_at), MAX(created_at), COUNT(*),
+                       LEFT((ARRAY_AGG(content ORDER BY created_at, id) FILTER (WHERE role = 'user'))[1], %s)
+                FROM chat_history
+                WHERE NOT EXISTS (SELECT 1 FROM chat_sessions)
+                GROUP BY session_id
+            """, (TITLE_LENGTH,))
+            if cur.rowcount > 0:
+                logger.info(f"Backfilled chat_sessions with {cur.rowcount} sessions")
+
+            conn.commit()
+        finally:
+            conn.close()
+
+    def write(self, messages):
+        conn = get_connection(CHAT_POOL)
+        try:
+            cur = conn.cursor()
+            # timestamps come from the app (utc_now), the same clock as queued messages
+            execute_values(cur, "INSERT INTO chat_history (session_id, role, content, created_at) VALUES %s",
+                           messages, page_size=max(len(messages), 1))
+            execute_values(cur, SESSION_UPSERT, session_rows(messages))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    async def awrite(self, messages):
+        async with acquire(CHAT_POOL) as conn:
+            async with conn.transaction():
+                await conn.executemany("""
+                    INSERT INTO chat_history (session_id, role, content, created_at)
+                    VALUES ($1, $2, $3, $4)
+                """, messages)
+                await conn.executemany(_ASYNC_SESSION_UPSERT, session_rows(messages))
+
+    def history(self, session_id, limit=None):
+        conn = get_connection(CHAT_POOL)
+        try:
+            cur = conn.cursor()
+            if limit:
+                cur.execute("""
+                    SELECT role, content, created_at
+                    FROM chat_history
+                    WHERE session_id = %s
+                    ORDER BY created_at DESC, id DESC
+                    LIMIT %s
+                """, (str(session_id), limit))
+            else:
+                cur.execute("""
+                    SELECT role, content, created_at
+                    FROM chat_history
+                    WHERE session_id = %s
+                    ORDER BY created_at ASC, id ASC
+                """, (str(session_id),))
+
+            rows = cur.fetchall()
+            if limit:
+                rows.reverse()  # newest first from the query, oldest first for callers
+            return rows
+        finally:
+            conn.close()
+
+    async def ahistory(self, session_id, limit=None):
+        async with acquire(CHAT_POOL) as conn:
+            if limit:
+                records = await conn.fetch("""
+                    SELECT role, content, created_at
+                    FROM chat_history
+                    WHERE session_id = $1
+                    ORDER BY created_at DESC, id DESC
+                    LIMIT $2
+                """, str(session_id), limit)
+            else:
+                records = await conn.fetch("""
+                    SELECT role, content, created_at
+                    FROM chat_history
+                    WHERE session_id = $1
+                    ORDER BY created_at ASC, id ASC
+                """, str(session_id))
+
+        rows = [tuple(r) for r in records]
+        if limit:
+            rows.reverse()
+        return rows
+
+    def history_page(self, session_id, limit, before=None):
+        conn = get_connection(CHAT_POOL)
+        try:
+            cur = conn.cursor()
+            if before:
+                cur.execute("""
+                    SELECT id, role, content
+                    FROM chat_history
+                    WHERE session_id = %s AND id < %s
+                    ORDER BY id DESC
+                    LIMIT %s
+                """, (str(session_id), before, limit))
+            else:
+                cur.execute("""
+                    SELECT id, role, content
+                    FROM chat_history
+                    WHERE session_id = %s
+                    ORDER BY id DESC
+                    LIMIT %s
+                """, (str(session_id), limit))
+            return cur.fetchall()
+        finally:
+            conn.close()
+
+    def sessions(self, limit, after=None):
+        conn = get_connection(CHAT_POOL)
+        try:
+            cur = conn.cursor()
+            if after:
+                cur.execute(f"""
+                    SELECT {_SESSION_COLUMNS}
+                    FROM chat_sessions
+                    WHERE (last_activity, session_id) < (%s, %s)
+                    ORDER BY last_activity DESC, session_id DESC
+                    LIMIT %s
+                """, (*after, limit))
+            else:
+                cur.execute(f"""
+                    SELECT {_SESSION_COLUMNS}
+                    FROM chat_sessions
+                    ORDER BY last_activity DESC, session_id DESC
+                    LIMIT %s
+                """, (limit,))
+            return cur.fetchall()
+        finally:
+            conn.close()
+
+    def sessions_by_id(self, session_ids):
+        conn = get_connection(CHAT_POOL)
+        try:
+            cur = conn.cursor()
+            cur.execute(f"SELECT {_SESSION_COLUMNS} FROM chat_sessions WHERE session_id = ANY(%s)",
+                        (list(session_ids),))
+            return cur.fetchall()
+        finally:
+            conn.close()
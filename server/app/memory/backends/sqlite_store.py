@@ -0,0 +1,221 @@
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from app.config.settings import settings
+from app.memory.backends.base import BaseChatStore, TITLE_LENGTH, session_rows
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DATA_DIR = Path(__file__).resolve().parents[3] / "data"
+
+# SQL is kept constant so sqlite3's per-connection statement cache
+# (CHAT_SQLITE_STATEMENT_CACHE entries) compiles each statement only once
+_INSERT_MESSAGE = "INSERT INTO chat_history (session_id, role, content, created_at) VALUES (?, ?, ?, ?)"
+_SESSION_UPSERT = """
+    INSERT INTO chat_sessions (session_id, started_at, last_activity, message_count, title)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (session_id) DO UPDATE SET
+        last_activity = MAX(chat_sessions.last_activity, excluded.last_activity),
+        message_count = chat_sessions.message_count + excluded.message_count,
+        title = COALESCE(chat_sessions.title, excluded.title)
+"""
+_RECENT_HISTORY = """
+    SELECT role, content, created_at FROM chat_history
+    WHERE session_id = ? ORDER BY id DESC LIMIT ?
+"""
+_FULL_HISTORY = """
+    SELECT role, content, created_at FROM chat_history
+    WHERE session_id = ? ORDER BY id ASC
+"""
+_PAGE = "SELECT id, role, content FROM chat_history WHERE session_id = ? ORDER BY id DESC LIMIT ?"
+_PAGE_BEFORE = """
+    SELECT id, role, content FROM chat_history
+    WHERE session_id = ? AND id < ? ORDER BY id DESC LIMIT ?
+"""
+_SESSION_COLUMNS = "session_id, started_at, last_activity, message_count, title"
+_SESSIONS = f"""
+    SELECT {_SESSION_COLUMNS} FROM chat_sessions
+    ORDER BY last_activity DESC, session_id DESC LIMIT ?
+"""
+_SESSIONS_AFTER = f"""
+    SELECT {_SESSION_COLUMNS} FROM chat_sessions
+    WHERE (last_activity, session_id) < (?, ?)
+    ORDER BY last_activity DESC, session_id DESC LIMIT ?
+"""
+_SESSIONS_BY_ID = f"""
+    SELECT {_SESSION_COLUMNS} FROM chat_sessions
+    WHERE session_id IN (SELECT value FROM json_each(?))
+"""
+
+
+def _timestamp(value):
+    """Timestamps are stored as ISO text: 'YYYY-MM-DD HH:MM:SS[.ffffff]'."""
+    return value.isoformat(sep=" ")
+
+
+def _datetime(value):
+    return datetime.fromisoformat(value) if value else None
+
+
+class SQLiteChatStore(BaseChatStore):
+    """
+    Chat history in a local SQLite file in WAL mode, for single-node
+    deployments: no network round trip and no load on the Postgres pools.
+
+    All writes go through one connection used by history_writer's thread
+    (single_writer); readers get a connection per thread and, with WAL,
+    never wait for the writer.
+    """
+
+    single_writer = True
+
+    def __init__(self, path=None):
+        self.path = DATA_DIR / (path or settings.CHAT_SQLITE_PATH)
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._writer = None
+        self._connections = []
+        self._connections_lock = threading.Lock()
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.path,
+            timeout=settings.CHAT_SQLITE_BUSY_TIMEOUT,
+            isolation_level=None,  # transactions are explicit (BEGIN IMMEDIATE ... COMMIT)
+            check_same_thread=False,
+            cached_statements=settings.CHAT_SQLITE_STATEMENT_CACHE,
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")  # durable at checkpoints; safe against corruption in WAL mode
+        with self._connections_lock:
+            self._connections.append(conn)
+        return conn
+
+    def _reader(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def _write_conn(self):
+        if self._writer is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._writer = self._connect()
+        return self._writer
+
+    def _transaction(self, statements):
+        with self._write_lock:
+            conn = self._write_conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for sql, params in statements:
+                    if isinstance(params, list):
+                        conn.executemany(sql, params)
+                    else:
+                        conn.execute(sql, params)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def init(self):
+        self._transaction([
+            ("""
+                CREATE TABLE IF NOT EXISTS chat_history (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_id TEXT NOT NULL,
+                    role TEXT NOT NULL CHECK (role IN ('user', 'assistant')),
+                    content TEXT NOT NULL,
+                    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+                )
+            """, ()),
+            ("""
+                CREATE INDEX IF NOT EXISTS idx_chat_history_session_message
+                ON chat_history(session_id, id)
+            """, ()),
+            ("""
+                CREATE TABLE IF NOT EXISTS chat_sessions (
+                    session_id TEXT PRIMARY KEY,
+                    started_at TEXT NOT NULL,
+                    last_activity TEXT NOT NULL,
+                    message_count INTEGER NOT NULL DEFAULT 0,
+                    title TEXT
+                )
+            """, ()),
+            ("""
+                CREATE INDEX IF NOT EXISTS idx_chat_sessions_last_activity
+                ON chat_sessions(last_activity DESC, session_id DESC)
+            """, ()),
+            # Backfill once from existing history
+            ("""
+                INSERT INTO chat_sessions (session_id, started_at, last_activity, message_count, title)
+                SELECT session_id, MIN(created_at), MAX(created_at), COUNT(*),
+                       (SELECT substr(first.content, 1, ?) FROM chat_history AS first
+                        WHERE first.session_id = h.session_id AND first.role = 'user'
+                        ORDER BY first.id LIMIT 1)
+                FROM chat_history AS h
+                WHERE session_id IS NOT NULL AND NOT EXISTS (SELECT 1 FROM chat_sessions)
+                GROUP BY session_id
+            """, (TITLE_LENGTH,)),
+        ])
+        logger.info(f"SQLite chat store ready at {self.path}")
+
+    def write(self, messages):
+        self._transaction([
+            (_INSERT_MESSAGE, [(sid, role, content, _timestamp(at)) for sid, role, content, at in messages]),
+            (_SESSION_UPSERT, [
+                (sid, _timestamp(started_at), _timestamp(last_activity), count, title)
+                for sid, started_at, last_activity, count, title in session_rows(messages)
+            ]),
+        ])
+
+    def history(self, session_id, limit=None):
+        if limit:
+            rows = self._reader().execute(_RECENT_HISTORY, (str(session_id), limit)).fetchall()
+            rows.reverse()
+        else:
+            rows = self._reader().execute(_FULL_HISTORY, (str(session_id),)).fetchall()
+        return [(role, content, _datetime(created_at)) for role, content, created_at in rows]
+
+    async def ahistory(self, session_id, limit=None):
+        # an indexed read of a few rows from the page cache is faster than a thread hop
+        return self.history(session_id, limit)
+
+    def history_page(self, session_id, limit, before=None):
+        if before:
+            return self._reader().execute(_PAGE_BEFORE, (str(session_id), before, limit)).fetchall()
+        return self._reader().execute(_PAGE, (str(session_id), limit)).fetchall()
+
+    def _sessions(self, rows):
+        return [
+            (sid, _datetime(started_at), _datetime(last_activity), count, title)
+            for sid, started_at, last_activity, count, title in rows
+        ]
+
+    def sessions(self, limit, after=None):
+        if after:
+            rows = self._reader().execute(_SESSIONS_AFTER, (_timestamp(after[0]), after[1], limit))
+        else:
+            rows = self._reader().execute(_SESSIONS, (limit,))
+        return self._sessions(rows.fetchall())
+
+    def sessions_by_id(self, session_ids):
+        return self._sessions(self._reader().execute(_SESSIONS_BY_ID, (json.dumps(list(session_ids)),)).fetchall())
+
+    def close(self):
+        with self._write_lock:
+            if self._writer is not None:
+                try:
+                    self._writer.execute("PRAGMA optimize")
+                except sqlite3.Error as e:
+                    logger.warning(f"PRAGMA optimize failed: {e}")
+            self._writer = None
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
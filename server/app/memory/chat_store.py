@@ -1,48 +1,36 @@
+import asyncio
 import uuid
-from app.db.connection import get_connection
+from datetime import datetime
+from app.config.settings import settings
+from app.memory.backends.base import utc_now
+from app.memory.context_cache import context_cache
+from app.memory.history_writer import history_writer
+from app.memory.store_factory import get_chat_store
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Seconds save_message waits for its write when CHAT_WRITE_BEHIND is off
+# and the store has a single writer thread
+WRITE_WAIT_TIMEOUT = 5.0
+
 def init_db():
     """
-    Ensures the chat_history table exists.
-    Safe to call on app startup.
+    Ensures the chat_history and chat_sessions tables exist in the
+    configured chat store (CHAT_STORE_BACKEND). Safe to call on app startup.
     """
     try:
-        conn = get_connection()
-        cur = conn.cursor()
-
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS chat_history (
-                id BIGSERIAL PRIMARY KEY,
-                session_id VARCHAR(36) NOT NULL,
-                role VARCHAR(20) NOT NULL CHECK (role IN ('user', 'assistant')),
-                content TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Create index for faster queries
-        cur.execute("""
-            CREATE INDEX IF NOT EXISTS idx_chat_history_session_id 
-            ON chat_history(session_id, created_at)
-        """)
-
-        conn.commit()
-        conn.close()
+        get_chat_store().init()
         logger.info("Chat history table initialized successfully")
     except Exception as e:
         logger.error(f"Failed to initialize chat history table: {e}")
         # don't raise to allow app to start even if DB isn't configured
-        return
 
 
-def save_message(session_id, role, content):
-    """Save a message to chat history."""
+def _is_valid_message(session_id, role):
     if not session_id:
         logger.warning("Attempted to save message with None session_id")
-        return
+        return False
     
     # Validate UUID format
     try:
@@ -50,57 +38,137 @@ def save_message(session_id, role, content):
         uuid.UUID(session_id)
     except (ValueError, TypeError):
         logger.warning(f"Invalid session_id format: {session_id}")
-        return
+        return False
     
     if role not in ['user', 'assistant']:
         logger.warning(f"Invalid role: {role}")
+        return False
+
+    return True
+
+
+def save_message(session_id, role, content):
+    """
+    Save a message to chat history. With CHAT_WRITE_BEHIND the message is
+    queued and written in a batch by history_writer.
+    """
+    if not _is_valid_message(session_id, role):
         return
-    
+
+    context_cache.append(session_id, role, content)
+    store = get_chat_store()
+    if settings.CHAT_WRITE_BEHIND or store.single_writer:
+        queued = history_writer.enqueue(session_id, role, content)
+        if queued and not settings.CHAT_WRITE_BEHIND and not history_writer.flush(WRITE_WAIT_TIMEOUT):
+            logger.warning(f"Message for session {session_id} not written after {WRITE_WAIT_TIMEOUT}s")
+        return
+
+    try:
+        store.write([(str(session_id), role, content, utc_now())])
+        logger.debug(f"Saved {role} message for session {session_id}")
+    except Exception as e:
+        logger.error(f"Failed to save message: {e}")
+        # Don't raise - allow app to continue even if history save fails
+
+
+def _merge(rows, pending, limit):
+    """Committed rows followed by the session's messages still queued for writing."""
+    rows = list(rows) + pending
+    return rows[-limit:] if limit else rows
+
+
+def _fetch_page(session_id, limit, before=None):
+    """Up to `limit` (id, role, content) rows of a session, newest first, with id < before."""
     try:
-        conn = get_connection()
-        cur = conn.cursor()
+        return get_chat_store().history_page(session_id, limit, before)
+    except Exception as e:
+        logger.error(f"Failed to get chat history page: {e}")
+        return []
+
 
-        cur.execute("""
-            INSERT INTO chat_history (session_id, role, content)
-            VALUES (%s, %s, %s)
-        """, (str(session_id), role, content))
+def get_history_page(session_id, limit=None, before=None):
+    """
+    One page of a session's history, walking back from the newest message.
+
+    Returns {"messages": [(role, content)] oldest first, "next_before": id to
+    pass as `before` for the previous page (None at the start of the
+    session), "etag": validator for the page}. Messages still queued for
+    writing are the newest, so the first page (no `before`) takes the
+    newest `limit` of them and the committed rows together. The etag is
+    built from the newest message id on the page (the session's last
+    message id on the first page), so it only changes when the page does.
+    """
+    limit = max(1, min(limit or settings.HISTORY_PAGE_SIZE, settings.HISTORY_MAX_PAGE_SIZE))
+
+    def fetch():
+        return _fetch_page(session_id, limit + 1, before)
+
+    rows, pending = history_writer.read(session_id, fetch)
+    if before:
+        pending = []
+    elif len(pending) > limit and history_writer.flush(timeout=1.0):
+        # older queued messages would fall between this page and the next
+        # one; once written they have ids and page like the rest
+        rows, pending = history_writer.read(session_id, fetch)
+
+    # newest first: queued messages (no id yet), then committed rows
+    newest = [(None, role, content) for role, content, _ in reversed(pending)] + list(rows)
+    page = newest[:limit]
+    page_pending = pending[len(pending) - min(len(pending), limit):]
+    next_before = None
+    if len(newest) > limit:
+        oldest_id = page[-1][0]
+        # the oldest message shown is still queued: continue from the newest
+        # committed one (if the writer is stuck, older queued messages are
+        # left out until they are written)
+        next_before = oldest_id if oldest_id is not None else (rows[0][0] + 1 if rows else None)
+
+    newest_id = rows[0][0] if rows else 0
+    etag = f'"{newest_id}.{len(page)}'
+    if page_pending:
+        etag += f".{len(page_pending)}.{page_pending[-1][2].timestamp():.6f}"
+    etag += '"'
+
+    messages = [(role, content) for _, role, content in reversed(page)]
+    return {"messages": messages, "next_before": next_before, "etag": etag}
+
+
+async def asave_message(session_id, role, content):
+    """Async variant of save_message."""
+    if not _is_valid_message(session_id, role):
+        return
+
+    context_cache.append(session_id, role, content)
+    store = get_chat_store()
+    if settings.CHAT_WRITE_BEHIND or store.single_writer:
+        queued = history_writer.enqueue(session_id, role, content)
+        if queued and not settings.CHAT_WRITE_BEHIND:
+            if not await asyncio.to_thread(history_writer.flush, WRITE_WAIT_TIMEOUT):
+                logger.warning(f"Message for session {session_id} not written after {WRITE_WAIT_TIMEOUT}s")
+        return
 
-        conn.commit()
-        conn.close()
+    try:
+        await store.awrite([(str(session_id), role, content, utc_now())])
         logger.debug(f"Saved {role} message for session {session_id}")
     except Exception as e:
         logger.error(f"Failed to save message: {e}")
         # Don't raise - allow app to continue even if history save fails
 
 
-def get_history(session_id, limit=None):
-    """Get chat history for a session."""
+async def aget_history(session_id, limit=None):
+    """
+    Get chat history for a session, oldest first, including messages not
+    yet written. With `limit`, the most recent `limit` messages.
+    """
     if not session_id:
         return []
-    
+    rows, pending = await history_writer.aread(session_id, lambda: _afetch_history(session_id, limit))
+    return _merge(rows, pending, limit)
+
+
+async def _afetch_history(session_id, limit=None):
     try:
-        conn = get_connection()
-        cur = conn.cursor()
-
-        if limit:
-            cur.execute("""
-                SELECT role, content, created_at
-                FROM chat_history
-                WHERE session_id = %s
-                ORDER BY created_at ASC
-                LIMIT %s
-            """, (str(session_id), limit))
-        else:
-            cur.execute("""
-                SELECT role, content, created_at
-                FROM chat_history
-                WHERE session_id = %s
-                ORDER BY created_at ASC
-            """, (str(session_id),))
-
-        rows = cur.fetchall()
-        conn.close()
-        
+        rows = await get_chat_store().ahistory(session_id, limit)
         logger.debug(f"Retrieved {len(rows)} messages for session {session_id}")
         return rows
     except Exception as e:
@@ -108,29 +176,73 @@ def get_history(session_id, limit=None):
         return []
 
 
-def get_all_history(session_id):
-    """Get all chat history for a session (for display purposes)."""
-    return get_history(session_id, limit=None)
+def _encode_cursor(row):
+    return f"{row['last_activity'].isoformat()}_{row['session_id']}"
 
 
-def get_all_sessions():
-    """Get all unique sessions ordered by creation time."""
+def _decode_cursor(cursor):
     try:
-        conn = get_connection()
-        cur = conn.cursor()
-        
-        cur.execute("""
-            SELECT session_id, MIN(created_at) as started_at
-            FROM chat_history
-            GROUP BY session_id
-            ORDER BY started_at DESC
-        """)
-        
-        rows = cur.fetchall()
-        conn.close()
-        
-        return [{"session_id": r[0], "started_at": r[1].isoformat() if r[1] else None} for r in rows]
-    except Exception as e:
-        logger.error(f"Failed to get all sessions: {e}")
-        return []
+        last_activity, session_id = cursor.rsplit("_", 1)
+        return datetime.fromisoformat(last_activity), str(uuid.UUID(session_id))
+    except (AttributeError, ValueError):
+        raise ValueError(f"Invalid sessions cursor: {cursor}")
+
+
+def _session(row):
+    session_id, started_at, last_activity, message_count, title = row
+    return {
+        "session_id": session_id,
+        "started_at": started_at,
+        "last_activity": last_activity,
+        "message_count": message_count,
+        "title": title,
+    }
+
+
+def _with_pending(sessions, pending):
+    """Apply messages still queued for writing to the sessions they belong to."""
+    for session_id, (count, first_queued, last_queued, title) in pending.items():
+        session = sessions.setdefault(session_id, _session((session_id, first_queued, last_queued, 0, None)))
+        session["message_count"] += count
+        session["last_activity"] = max(session["last_activity"], last_queued)
+        session["title"] = session["title"] or title
 
+
+def get_sessions(limit=None, cursor=None):
+    """
+    One page of sessions, most recent activity first, from chat_sessions.
+    `cursor` is the `next_cursor` of the previous page (keyset pagination on
+    last_activity, session_id), so every page costs one index range scan.
+    Raises ValueError for a malformed cursor.
+    """
+    limit = max(1, min(limit or settings.SESSIONS_PAGE_SIZE, settings.SESSIONS_MAX_PAGE_SIZE))
+    after = _decode_cursor(cursor) if cursor else None
+    # sessions with queued messages are shown at the top of the first page
+    # (and skipped on later ones)
+    pending = history_writer.pending_sessions()
+
+    try:
+        store = get_chat_store()
+        rows = store.sessions(limit + 1, after)
+        sessions = {row[0]: _session(row) for row in rows}
+        missing = [sid for sid in pending if sid not in sessions]
+        if after:
+            for sid in pending:
+                sessions.pop(sid, None)
+            pending = {}
+        elif missing:
+            sessions.update((row[0], _session(row)) for row in store.sessions_by_id(missing))
+    except Exception as e:
+        logger.error(f"Failed to get sessions: {e}")
+        rows, sessions = [], {}
+
+    _with_pending(sessions, pending)
+    page = sorted(sessions.values(), key=lambda s: (s["last_activity"], s["session_id"]), reverse=True)
+    has_more = len(rows) > limit or len(page) > limit
+    page = page[:limit]
+    next_cursor = _encode_cursor(page[-1]) if has_more and page else None
+
+    for session in page:
+        session["started_at"] = session["started_at"].isoformat() if session["started_at"] else None
+        session["last_activity"] = session["last_activity"].isoformat() if session["last_activity"] else None
+    return {"sessions": page, "next_cursor": next_cursor}
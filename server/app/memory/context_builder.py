@@ -1,29 +1,19 @@
-from app.memory.chat_store import get_history
+from app.memory.chat_store import aget_history
+from app.memory.context_cache import context_cache
 
-def build_context(session_id, limit=10):
-    """Build context from chat history for LLM (limited to recent messages)."""
-    history = get_history(session_id, limit=limit)
-    # Handle both old format (2 values) and new format (3 values)
-    result = []
-    for row in history:
-        if len(row) == 3:
-            r, c, _ = row
-        else:
-            r, c = row
-        result.append({"role": r, "content": c})
-    return result
+async def abuild_context(session_id, limit=10):
+    """Build context from chat history for LLM (the most recent messages)."""
+    history = await context_cache.arecent(session_id, limit, lambda n: aget_history(session_id, limit=n))
+    return _to_context(history)
 
 
-def get_display_history(session_id):
-    """Get full chat history for display purposes."""
-    history = get_history(session_id, limit=None)
+def _to_context(history):
     # Handle both old format (2 values) and new format (3 values)
     result = []
     for row in history:
         if len(row) == 3:
-            r, c, ts = row
-            result.append({"role": r, "content": c, "created_at": ts})
+            r, c, _ = row
         else:
             r, c = row
-            result.append({"role": r, "content": c, "created_at": None})
+        result.append({"role": r, "content": c})
     return result
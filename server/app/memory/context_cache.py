@@ -0,0 +1,169 @@
+import threading
+from collections import OrderedDict, deque
+
+from app.config.settings import settings
+from app.memory.backends.base import utc_now
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# rough per-message overhead (tuple, deque slot, timestamp) on top of the text
+_ROW_OVERHEAD = 200
+
+
+def _row_size(row):
+    return len(row[1]) + _ROW_OVERHEAD
+
+
+class ContextCache:
+    """
+    Most recent `turns` messages per session, kept in process so building
+    the LLM context needs no query for active sessions.
+
+    - filled from a most-recent-N history read the first time a session is
+      asked for, then appended to on every saved message
+    - sessions are evicted least recently used first, once there are more
+      than `max_sessions` or their messages exceed `max_bytes`
+    """
+
+    def __init__(self, turns, max_sessions, max_bytes, enabled=True):
+        self.turns = turns
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()  # session_id -> deque of (role, content, created_at)
+        self._bytes = 0
+        self._filling = {}  # session_id -> [fills in progress, saves seen meanwhile]
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._stale_fills = 0
+
+    def _evict(self):
+        while self._sessions and (len(self._sessions) > self.max_sessions or self._bytes > self.max_bytes):
+            _, rows = self._sessions.popitem(last=False)
+            self._bytes -= sum(map(_row_size, rows))
+            self._evictions += 1
+
+    def _lookup(self, session_id, limit):
+        """The last `limit` cached messages, or None (and a fill registered) on a miss."""
+        with self._lock:
+            rows = self._sessions.get(session_id)
+            if rows is not None:
+                self._sessions.move_to_end(session_id)
+                self._hits += 1
+                return list(rows)[-limit:]
+            self._misses += 1
+            self._filling.setdefault(session_id, [0, 0])[0] += 1
+            return None
+
+    def _install(self, session_id, rows):
+        with self._lock:
+            filling = self._filling[session_id]
+            stale = filling[1] > 0
+            filling[0] -= 1
+            if filling[0] == 0:
+                del self._filling[session_id]
+            if stale:
+                # a message was saved while the history was read; it may be missing from `rows`
+                self._stale_fills += 1
+                return
+            if session_id in self._sessions:
+                return
+            rows = deque(rows[-self.turns:], maxlen=self.turns)
+            self._sessions[session_id] = rows
+            self._bytes += sum(map(_row_size, rows))
+            self._evict()
+
+    def _abandon(self, session_id):
+        with self._lock:
+            filling = self._filling[session_id]
+            filling[0] -= 1
+            if filling[0] == 0:
+                del self._filling[session_id]
+
+    def recent(self, session_id, limit, fetch):
+        """
+        The last `limit` messages of a session, oldest first. On a miss
+        `fetch(n)` reads the last n messages from the store.
+        """
+        session_id = str(session_id)
+        if not self.enabled or limit > self.turns:
+            return fetch(limit)
+        rows = self._lookup(session_id, limit)
+        if rows is not None:
+            return rows
+        try:
+            rows = fetch(self.turns)
+        except BaseException:
+            self._abandon(session_id)
+            raise
+        self._install(session_id, rows)
+        return rows[-limit:]
+
+    async def arecent(self, session_id, limit, fetch):
+        """Async variant of recent; `fetch` is a coroutine function."""
+        session_id = str(session_id)
+        if not self.enabled or limit > self.turns:
+            return await fetch(limit)
+        rows = self._lookup(session_id, limit)
+        if rows is not None:
+            return rows
+        try:
+            rows = await fetch(self.turns)
+        except BaseException:
+            self._abandon(session_id)
+            raise
+        self._install(session_id, rows)
+        return rows[-limit:]
+
+    def append(self, session_id, role, content):
+        """Record a saved message (sessions not in the cache are filled on their next read)."""
+        if not self.enabled:
+            return
+        session_id = str(session_id)
+        with self._lock:
+            filling = self._filling.get(session_id)
+            if filling:
+                filling[1] += 1
+            rows = self._sessions.get(session_id)
+            if rows is None:
+                return
+            if len(rows) == rows.maxlen:
+                self._bytes -= _row_size(rows[0])
+            row = (role, content, utc_now())
+            rows.append(row)
+            self._bytes += _row_size(row)
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "enabled": self.enabled,
+                "sessions": len(self._sessions),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "turns": self.turns,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+                "evictions": self._evictions,
+                "stale_fills": self._stale_fills,
+            }
+
+
+context_cache = ContextCache(
+    turns=settings.CONTEXT_CACHE_TURNS,
+    max_sessions=settings.CONTEXT_CACHE_MAX_SESSIONS,
+    max_bytes=settings.CONTEXT_CACHE_MAX_BYTES,
+    enabled=settings.CONTEXT_CACHE_ENABLED,
+)
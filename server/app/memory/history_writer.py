@@ -0,0 +1,278 @@
+import asyncio
+import threading
+import time
+from collections import deque
+
+from app.config.settings import settings
+from app.memory.backends.base import session_title, utc_now
+from app.memory.store_factory import get_chat_store
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+# ============================================================
+# WRITE-BEHIND CHAT HISTORY
+# ============================================================
+#
+# save_message / asave_message only queue the message; a background thread
+# hands queued messages to the chat store in batches (one transaction per
+# batch) once CHAT_WRITE_BATCH_SIZE are waiting or CHAT_WRITE_FLUSH_INTERVAL
+# seconds after the first one was queued, or right away when someone waits
+# in flush(). close() drains the queue on shutdown. The thread is also the
+# single writer of stores that need one (SQLite).
+#
+# Read-your-writes: a message stays visible in `pending` until the batch
+# holding it has committed, and history reads append the session's pending
+# messages to the rows read from the database. `generation` is bumped when
+# a batch starts committing and again once it is out of `pending`; a read
+# of a session in the committing batch waits for it, and a read that
+# overlapped a commit is repeated, so a message is never missed or
+# returned twice.
+
+
+class _Message:
+    __slots__ = ("seq", "session_id", "role", "content", "queued_at")
+
+    def __init__(self, seq, session_id, role, content):
+        self.seq = seq
+        self.session_id = session_id
+        self.role = role
+        self.content = content
+        self.queued_at = utc_now()  # stored as created_at, so pending and written rows share a clock
+
+    def row(self):
+        return self.role, self.content, self.queued_at
+
+
+class HistoryWriter:
+    """
+    Queue of chat messages flushed in batches by a background thread.
+    `write(messages)` stores a list of (session_id, role, content,
+    created_at) in one transaction.
+    """
+
+    def __init__(self, batch_size=100, flush_interval=0.05, max_pending=10000, retries=3,
+                 write=lambda messages: get_chat_store().write(messages)):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.retries = retries
+        self.write = write
+
+        self._cond = threading.Condition()
+        self._queue = deque()  # _Message, oldest first, not yet taken by the flusher
+        self._pending = {}  # session_id -> [_Message] queued or in flight
+        self._seq = 0
+        self._generation = 0
+        self._committing = set()  # session ids in the batch being written
+        self._thread = None
+        self._closing = False
+        self._waiters = 0  # threads in flush(): write without waiting for a full batch
+
+        self._queued = 0
+        self._written = 0
+        self._batches = 0
+        self._failures = 0
+        self._dropped = 0
+        self._flush_ms = 0.0
+
+    # ------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------
+
+    def _start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="chat-history-writer", daemon=True)
+            self._thread.start()
+
+    def enqueue(self, session_id, role, content) -> bool:
+        """Queue a message for writing; returns False if it was dropped (queue full or closed)."""
+        with self._cond:
+            if self._closing or sum(map(len, self._pending.values())) >= self.max_pending:
+                self._dropped += 1
+                logger.error(f"Chat history queue full or closed, dropping {role} message for session {session_id}")
+                return False
+            self._seq += 1
+            message = _Message(self._seq, str(session_id), role, content)
+            self._queue.append(message)
+            self._pending.setdefault(message.session_id, []).append(message)
+            self._queued += 1
+            self._start()
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify()
+        return True
+
+    def _take_batch(self):
+        """Wait for the size or time trigger and take up to batch_size messages (None once closed and empty)."""
+        with self._cond:
+            while not self._queue:
+                if self._closing:
+                    return None
+                self._cond.wait()
+            deadline = time.monotonic() + self.flush_interval
+            while len(self._queue) < self.batch_size and not self._closing and not self._waiters:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            return [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+
+    def _write(self, batch):
+        with self._cond:
+            self._generation += 1
+            self._committing = {m.session_id for m in batch}
+        self.write([(m.session_id, m.role, m.content, m.queued_at) for m in batch])
+
+    def _finish(self, batch, written):
+        with self._cond:
+            for m in batch:
+                messages = self._pending.get(m.session_id)
+                if messages:
+                    messages.remove(m)
+                    if not messages:
+                        del self._pending[m.session_id]
+            self._generation += 1
+            self._committing = set()
+            if written:
+                self._written += len(batch)
+                self._batches += 1
+            else:
+                self._dropped += len(batch)
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if batch is None:
+                return
+            written = False
+            for attempt in range(self.retries):
+                start = time.perf_counter()
+                try:
+                    self._write(batch)
+                    written = True
+                    break
+                except Exception as e:
+                    with self._cond:
+                        self._failures += 1
+                    logger.error(f"Failed to save {len(batch)} chat messages (attempt {attempt + 1}): {e}")
+                    if not self._closing:
+                        time.sleep(min(0.1 * 2 ** attempt, 2.0))
+                finally:
+                    with self._cond:
+                        self._flush_ms += (time.perf_counter() - start) * 1000
+            self._finish(batch, written)
+            if written:
+                logger.debug(f"Saved {len(batch)} chat messages")
+            else:
+                logger.error(f"Dropped {len(batch)} chat messages after {self.retries} attempts")
+
+    def flush(self, timeout=None) -> bool:
+        """Wait until every message queued so far is written (or dropped)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            target = self._seq
+            self._waiters += 1
+            self._cond.notify_all()
+            try:
+                while any(m.seq <= target for messages in self._pending.values() for m in messages):
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self._cond.wait(remaining)
+            finally:
+                self._waiters -= 1
+        return True
+
+    def close(self, timeout=10.0):
+        """Write out everything still queued and stop the flusher thread."""
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+            if thread.is_alive():
+                logger.error("Chat history writer did not drain before shutdown")
+        left = sum(map(len, self._pending.values()))
+        if left:
+            logger.error(f"{left} chat messages were not saved")
+        else:
+            logger.info(f"Chat history writer drained ({self._written} messages written)")
+
+    # ------------------------------------------------------------
+    # Read-your-writes
+    # ------------------------------------------------------------
+
+    def _snapshot(self, session_id):
+        """(generation, pending rows), or None while the session's messages are being committed."""
+        session_id = str(session_id)
+        with self._cond:
+            if session_id in self._committing:
+                return None
+            return self._generation, [m.row() for m in self._pending.get(session_id, ())]
+
+    def read(self, session_id, fetch, attempts=5):
+        """
+        (rows from `fetch()`, pending rows of the session not in them).
+        `fetch` reads the committed history from the database.
+        """
+        for _ in range(attempts):
+            snapshot = self._snapshot(session_id)
+            if snapshot is None:
+                with self._cond:
+                    self._cond.wait(0.05)
+                continue
+            rows = fetch()
+            if snapshot[0] == self._generation:
+                return rows, snapshot[1]
+        # commits kept overlapping the read: wait for this session's messages
+        self.flush(timeout=1.0)
+        return fetch(), []
+
+    async def aread(self, session_id, fetch, attempts=5):
+        """Async variant of read; `fetch` is a coroutine function."""
+        for attempt in range(attempts):
+            snapshot = self._snapshot(session_id)
+            if snapshot is None:
+                await asyncio.sleep(0.001 * 2 ** attempt)
+                continue
+            rows = await fetch()
+            if snapshot[0] == self._generation:
+                return rows, snapshot[1]
+        await asyncio.to_thread(self.flush, 1.0)
+        return await fetch(), []
+
+    def pending_sessions(self):
+        """
+        {session_id: (count, first queued_at, last queued_at, title or None)}
+        for sessions with unwritten messages.
+        """
+        with self._cond:
+            sessions = {}
+            for sid, messages in self._pending.items():
+                title = next((session_title(m.content) for m in messages if m.role == "user"), None)
+                sessions[sid] = (len(messages), messages[0].queued_at, messages[-1].queued_at, title)
+            return sessions
+
+    def stats(self):
+        with self._cond:
+            return {
+                "enabled": settings.CHAT_WRITE_BEHIND,
+                "pending": sum(map(len, self._pending.values())),
+                "queued": self._queued,
+                "written": self._written,
+                "batches": self._batches,
+                "avg_batch": round(self._written / self._batches, 1) if self._batches else 0.0,
+                "avg_flush_ms": round(self._flush_ms / self._batches, 2) if self._batches else 0.0,
+                "failures": self._failures,
+                "dropped": self._dropped,
+            }
+
+
+history_writer = HistoryWriter(
+    batch_size=settings.CHAT_WRITE_BATCH_SIZE,
+    flush_interval=settings.CHAT_WRITE_FLUSH_INTERVAL,
+    max_pending=settings.CHAT_WRITE_MAX_PENDING,
+)
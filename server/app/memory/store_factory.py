@@ -0,0 +1,43 @@
+import threading
+
+from app.config.settings import settings
+from app.memory.backends.postgres_store import PostgresChatStore
+from app.memory.backends.sqlite_store import SQLiteChatStore
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+STORES = {
+    "postgres": PostgresChatStore,
+    "sqlite": SQLiteChatStore,
+}
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_chat_store():
+    """Get the shared chat store for the configured CHAT_STORE_BACKEND."""
+    global _store
+    if _store is not None:
+        return _store
+
+    backend = settings.CHAT_STORE_BACKEND.lower()
+    if backend not in STORES:
+        logger.error(f"Invalid CHAT_STORE_BACKEND: {settings.CHAT_STORE_BACKEND}")
+        raise ValueError(f"Invalid CHAT_STORE_BACKEND: {settings.CHAT_STORE_BACKEND}. Must be one of: postgres, sqlite")
+
+    with _store_lock:
+        if _store is None:
+            _store = STORES[backend]()
+            logger.info(f"Using {backend} chat store")
+    return _store
+
+
+def close_chat_store():
+    """Close the chat store's own connections (the Postgres pools are closed separately)."""
+    global _store
+    with _store_lock:
+        store, _store = _store, None
+    if store is not None:
+        store.close()
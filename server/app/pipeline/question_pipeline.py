@@ -0,0 +1,235 @@
+import json
+from app.pipeline.stage_graph import StageGraph
+from app.schema.selector import aembed_question, aselect_schema
+from app.schema.builder import build_schema
+from app.llm.text_to_sql import agenerate_sql
+from app.llm.sql_templates import amatch_template
+from app.llm.formatter import aformat_result
+from app.llm.intent_detector import adetect_intent, aget_conversational_response
+from app.security.sql_guard import validate_sql
+from app.db.executor import aexecute_sql, aplan_sql
+from app.memory.chat_store import asave_message
+from app.memory.context_builder import abuild_context
+from app.utils.logger import get_logger
+from app.utils.serialization import rows_data
+from app.utils.text import normalize_question
+
+logger = get_logger(__name__)
+
+# ============================================================
+# STAGE GRAPH
+# ============================================================
+#
+#   save_question ─┐
+#   context ───────┼──────────────────────────► reply        (conversation)
+#   intent ────────┼─► template ─┐
+#   embedding ─────┴─────────────┴─► schema ─► sql ─► plan ─► result ─► answer   (database)
+#
+# The first four stages have no dependencies and run concurrently. When a
+# parameterized SQL template matches, schema selection and the LLM call are
+# skipped; `sql_source` records whether the SQL came from a template, the
+# SQL cache or the LLM. `plan` is the EXPLAIN cost gate: rejected queries
+# skip `result` and `answer`, and queries it marks "stream" are sent as a
+# stream by /query (pass "streaming": True in the inputs when the caller
+# streams rows itself).
+
+QUESTION_PIPELINE = StageGraph("question")
+
+
+def _is_conversation(results):
+    return results["intent"] == "conversation"
+
+
+def _is_database(results):
+    return results["intent"] != "conversation"
+
+
+@QUESTION_PIPELINE.stage("save_question")
+async def _save_question(results):
+    await asave_message(results["session_id"], "user", results["question"])
+
+
+@QUESTION_PIPELINE.stage("context")
+async def _context(results):
+    context = await abuild_context(results["session_id"])
+    # save_question runs concurrently, so the current question may not be
+    # in the fetched history yet; make sure it is always the last turn.
+    current = {"role": "user", "content": results["question"]}
+    if not context or context[-1] != current:
+        context.append(current)
+    return context
+
+
+@QUESTION_PIPELINE.stage("intent")
+async def _intent(results):
+    return await adetect_intent(results["question"])
+
+
+@QUESTION_PIPELINE.stage("embedding")
+async def _embedding(results):
+    # Speculative: started before the intent is known so the schema lookup
+    # does not wait on a second network round trip. The normalized text is
+    # embedded so the same vector can key the semantic SQL cache.
+    return await aembed_question(normalize_question(results["question"]))
+
+
+@QUESTION_PIPELINE.stage("reply", deps=("intent", "context"), when=_is_conversation)
+async def _reply(results):
+    return await aget_conversational_response(results["question"], results["context"])
+
+
+@QUESTION_PIPELINE.stage("template", deps=("intent", "context"), when=_is_database)
+async def _template(results):
+    return await amatch_template(results["question"], results["context"][:-1])
+
+
+@QUESTION_PIPELINE.stage("schema", deps=("template", "embedding"))
+async def _schema(results):
+    if results["template"]:
+        return None
+    schema_keys = await aselect_schema(results["question"], embedding=results["embedding"])
+    return build_schema(schema_keys)
+
+
+@QUESTION_PIPELINE.stage("sql", deps=("schema", "context"))
+async def _sql(results):
+    template = results["template"]
+    if template:
+        sql = template.rendered_sql
+        results["sql_source"] = "template"
+    else:
+        info = {}
+        sql = await agenerate_sql(
+            results["question"], results["schema"], results["context"], embedding=results["embedding"], info=info
+        )
+        results["sql_source"] = info.get("source", "llm")
+    validate_sql(sql)
+    return sql
+
+
+def executable_sql(results):
+    """(sql, params) to run: the template statement with bind parameters, or the generated SQL."""
+    template = results.get("template")
+    if template:
+        return template.sql, template.params
+    return results["sql"], ()
+
+
+def _is_runnable(results):
+    return results["plan"].action != "reject"
+
+
+@QUESTION_PIPELINE.stage("plan", deps=("sql",))
+async def _plan(results):
+    sql, params = executable_sql(results)
+    return await aplan_sql(sql, results["question"], params, streaming=results.get("streaming", False))
+
+
+@QUESTION_PIPELINE.stage("result", deps=("plan",), when=_is_runnable)
+async def _result(results):
+    sql, params = executable_sql(results)
+    return await aexecute_sql(sql, results["question"], params=params, plan=results["plan"])
+
+
+@QUESTION_PIPELINE.stage("answer", deps=("result",))
+async def _answer(results):
+    return await aformat_result(results["result"], results["question"])
+
+
+# ============================================================
+# ENTRY POINTS
+# ============================================================
+
+def split_answer(answer: str):
+    """Pull optional GRAPH_DATA / HINT markers out of the formatted answer text."""
+    hint = None
+    graph_data = None
+    # simple marker-based parsing
+    if "GRAPH_DATA:" in answer:
+        parts = answer.split("GRAPH_DATA:")
+        answer = parts[0].strip()
+        try:
+            graph_data = json.loads(parts[1].strip())
+        except Exception:
+            graph_data = None
+    if "HINT:" in answer:
+        parts = answer.split("HINT:")
+        answer = parts[0].strip()
+        hint = parts[1].strip()
+    return answer, hint, graph_data
+
+
+async def plan_question(question: str, session_id: str, streaming: bool = False):
+    """
+    Run the pipeline up to the cost gate (or the conversational reply).
+    The returned PipelineRun can be finished with run_question, or its rows
+    streamed when streams(run) is true.
+    """
+    return await QUESTION_PIPELINE.run(
+        {"question": question, "session_id": session_id, "streaming": streaming},
+        targets=("save_question", "reply", "plan"),
+    )
+
+
+def streams(run) -> bool:
+    """True when the cost gate expects too many rows to build the result in memory."""
+    plan = run.results.get("plan")
+    return plan is not None and plan.action == "stream"
+
+
+async def rejected_answer(results, session_id: str):
+    """Persist and return the QueryResponse fields for a query the cost gate rejected."""
+    plan = results["plan"]
+    await asave_message(session_id, "assistant", plan.message)
+    return {
+        "answer": plan.message,
+        "hint": plan.hint,
+        "sql": results["sql"],
+        "sql_source": results.get("sql_source"),
+    }
+
+
+async def run_question(question: str, session_id: str, run=None):
+    """
+    Run the full question pipeline (or finish a plan_question `run`) and
+    persist the assistant reply. Returns (payload, df): the QueryResponse
+    fields other than columns/data, and the result DataFrame (None for
+    conversational replies and rejected queries), so callers can encode the
+    rows in whichever wire format they need.
+    """
+    run = await QUESTION_PIPELINE.run(run.results if run else {"question": question, "session_id": session_id})
+    results = run.results
+
+    if "reply" in results:
+        reply = results["reply"]
+        await asave_message(session_id, "assistant", reply)
+        return {"answer": reply}, None
+
+    if results["plan"].action == "reject":
+        return await rejected_answer(results, session_id), None
+
+    answer, hint, graph_data = split_answer(results["answer"])
+    await asave_message(session_id, "assistant", answer)
+
+    df = results["result"]
+    payload = {
+        "answer": answer,
+        "sql": results["sql"],
+        "sql_source": results.get("sql_source"),
+        "truncated": df.attrs.get("truncated", False),
+        "total_rows_estimate": df.attrs.get("total_rows_estimate"),
+    }
+    if hint:
+        payload["hint"] = hint
+    if graph_data:
+        payload["graphData"] = graph_data
+    return payload, df
+
+
+async def answer_question(question: str, session_id: str) -> dict:
+    """run_question with the rows attached, as a payload in the QueryResponse shape."""
+    payload, df = await run_question(question, session_id)
+    if df is not None and not df.empty:
+        payload["columns"] = df.columns.tolist()
+        payload["data"] = rows_data(df)
+    return payload
@@ -0,0 +1,180 @@
+import asyncio
+import threading
+import time
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class Stage:
+    """
+    One step of a pipeline.
+
+    `func` is an async callable receiving the shared results dict (pipeline
+    inputs plus the output of every finished stage, keyed by stage name).
+    `when` is an optional predicate on that dict; a stage whose predicate is
+    false, or any of whose dependencies was skipped, is skipped as well.
+    """
+
+    def __init__(self, name, func, deps=(), when=None):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.when = when
+
+
+class PipelineRun:
+    """Outcome of a StageGraph run: stage outputs, skipped stages and timings (ms)."""
+
+    def __init__(self, results, skipped, timings):
+        self.results = results
+        self.skipped = skipped
+        self.timings = timings
+
+
+class StageGraph:
+    """
+    Small dependency-graph executor. Stages whose dependencies are satisfied
+    run concurrently on the event loop; each stage's wall time is recorded
+    per run and aggregated across runs.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._stages = {}
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+
+    def stage(self, name, deps=(), when=None):
+        """Decorator registering an async function as a stage."""
+        def decorator(func):
+            self.add(Stage(name, func, deps, when))
+            return func
+        return decorator
+
+    def add(self, stage):
+        if stage.name in self._stages:
+            raise ValueError(f"Stage '{stage.name}' already registered in pipeline '{self.name}'")
+        # Dependencies must be registered first, which also rules out cycles
+        missing = [d for d in stage.deps if d not in self._stages]
+        if missing:
+            raise ValueError(f"Stage '{stage.name}' depends on unknown stages: {', '.join(missing)}")
+        self._stages[stage.name] = stage
+
+    def _required(self, targets):
+        if not targets:
+            return list(self._stages.values())
+
+        needed = set()
+        pending = list(targets)
+        while pending:
+            name = pending.pop()
+            if name not in self._stages:
+                raise ValueError(f"Unknown stage '{name}' in pipeline '{self.name}'")
+            if name not in needed:
+                needed.add(name)
+                pending.extend(self._stages[name].deps)
+        # Registration order is a valid topological order
+        return [s for s in self._stages.values() if s.name in needed]
+
+    async def run(self, inputs, targets=None, on_stage=None):
+        """
+        Run the stages needed for `targets` (all stages by default).
+        `on_stage(name, value)` is called as each stage finishes. Stages
+        whose output is already in `inputs` are not run again, so passing an
+        earlier run's results resumes it with more targets.
+        """
+        results = dict(inputs)
+        skipped = set()
+        timings = {}
+        tasks = {}
+
+        async def run_stage(stage):
+            if stage.name in inputs:
+                return
+            if stage.deps:
+                await asyncio.gather(*(tasks[d] for d in stage.deps))
+            if any(d in skipped for d in stage.deps) or (stage.when and not stage.when(results)):
+                skipped.add(stage.name)
+                return
+
+            start = time.perf_counter()
+            value = await stage.func(results)
+            timings[stage.name] = round((time.perf_counter() - start) * 1000, 2)
+            results[stage.name] = value
+            if on_stage:
+                on_stage(stage.name, value)
+
+        started = time.perf_counter()
+        for stage in self._required(targets):
+            tasks[stage.name] = asyncio.ensure_future(run_stage(stage))
+
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+        finally:
+            self._record(timings)
+
+        total = round((time.perf_counter() - started) * 1000, 2)
+        logger.info(
+            f"Pipeline '{self.name}' finished in {total}ms: "
+            + ", ".join(f"{name}={ms}ms" for name, ms in timings.items())
+        )
+        return PipelineRun(results, skipped, timings)
+
+    async def iter_run(self, inputs, targets=None):
+        """
+        Run like `run`, yielding (stage_name, value) as each stage finishes,
+        then ("__run__", PipelineRun) once the whole graph is done.
+        """
+        queue = asyncio.Queue()
+        task = asyncio.ensure_future(
+            self.run(inputs, targets, on_stage=lambda name, value: queue.put_nowait((name, value)))
+        )
+
+        try:
+            while True:
+                getter = asyncio.ensure_future(queue.get())
+                done, _ = await asyncio.wait({getter, task}, return_when=asyncio.FIRST_COMPLETED)
+                if getter in done:
+                    yield getter.result()
+                    continue
+                getter.cancel()
+                break
+
+            while not queue.empty():
+                yield queue.get_nowait()
+            yield "__run__", task.result()
+        finally:
+            if not task.done():
+                task.cancel()
+
+    # ------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------
+
+    def _record(self, timings):
+        with self._stats_lock:
+            for name, ms in timings.items():
+                entry = self._stats.setdefault(name, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+                entry["count"] += 1
+                entry["total_ms"] += ms
+                entry["max_ms"] = max(entry["max_ms"], ms)
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "pipeline": self.name,
+                "stages": {
+                    name: {
+                        "count": e["count"],
+                        "avg_ms": round(e["total_ms"] / e["count"], 2),
+                        "max_ms": e["max_ms"],
+                    }
+                    for name, e in self._stats.items()
+                },
+            }
@@ -0,0 +1,132 @@
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+from app.config.settings import settings
+from app.utils.logger import get_logger
+from app.utils.text import normalize_question
+
+logger = get_logger(__name__)
+
+DATA_DIR = Path(__file__).resolve().parents[2] / "data"
+
+
+def embedding_model_key() -> str:
+    """Identifies the model that produced a vector; vectors never mix across models."""
+    provider = settings.LLM_PROVIDER.lower()
+    if provider == "openai":
+        return f"openai:{settings.OPENAI_EMBED_MODEL}"
+    if provider == "gemini":
+        return f"gemini:{settings.GEMINI_EMBED_MODEL}"
+    return provider
+
+
+class EmbeddingCache:
+    """
+    Bounded LRU cache of question embeddings, stored as float32 arrays and
+    keyed by (embedding model, normalized text). When `path` is set the cache
+    is loaded lazily from disk and written back every `save_every` new entries
+    and on shutdown.
+    """
+
+    def __init__(self, max_entries=5000, path=None, save_every=50):
+        self.max_entries = max_entries
+        self.path = Path(path) if path else None
+        self.save_every = save_every
+
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._entries = OrderedDict()  # (model, text) -> np.ndarray[float32]
+        self._loaded = self.path is None
+        self._dirty = 0
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def _load(self):
+        # called with self._lock held
+        self._loaded = True
+        if not self.path or not self.path.exists():
+            return
+        try:
+            with open(self.path, "rb") as f:
+                stored = pickle.load(f)
+            for key, vector in stored[-self.max_entries:]:
+                self._entries[key] = np.asarray(vector, dtype=np.float32)
+            logger.info(f"Loaded {len(self._entries)} cached question embeddings from {self.path}")
+        except Exception as e:
+            logger.warning(f"Could not load embedding cache from {self.path}: {e}")
+
+    def get(self, text):
+        key = (embedding_model_key(), normalize_question(text))
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            vector = self._entries.get(key)
+            if vector is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return vector
+
+    def put(self, text, embedding):
+        vector = np.asarray(embedding, dtype=np.float32)
+        key = (embedding_model_key(), normalize_question(text))
+        flush = False
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+            self._dirty += 1
+            flush = self.path is not None and self._dirty >= self.save_every
+        if flush:
+            threading.Thread(target=self.save, daemon=True).start()
+        return vector
+
+    def save(self):
+        """Write the cache to disk atomically (no-op without a path or changes)."""
+        if not self.path:
+            return
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                snapshot = list(self._entries.items())
+                self._dirty = 0
+            tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with open(tmp, "wb") as f:
+                    pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp, self.path)
+                logger.debug(f"Saved {len(snapshot)} question embeddings to {self.path}")
+            except Exception as e:
+                logger.warning(f"Could not save embedding cache to {self.path}: {e}")
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+                "evictions": self._evictions,
+            }
+
+
+question_embedding_cache = EmbeddingCache(
+    max_entries=settings.EMBED_CACHE_MAX_ENTRIES,
+    path=(DATA_DIR / settings.EMBED_CACHE_FILE) if settings.EMBED_CACHE_PERSIST else None,
+)
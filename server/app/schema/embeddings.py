@@ -1,8 +1,15 @@
+import os
 import pickle
+import time
+from pathlib import Path
+
 from app.schema.registry import SCHEMA_REGISTRY
 from app.llm.factory import get_llm
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
 
-EMBED_FILE = "data/schema_embeddings.pkl"
+EMBED_FILE = Path(__file__).resolve().parents[2] / "data" / "schema_embeddings.pkl"
 
 def build_schema_text(name, meta):
     return f"""
@@ -13,14 +20,26 @@ Columns:
 {meta['schema']}
 """
 
-def generate_embeddings():
+def generate_embeddings(registry=None):
+    """
+    Embed every registry object in batched, concurrent requests (see
+    BaseLLM.aembed_batch) and write them to EMBED_FILE.
+    """
+    registry = SCHEMA_REGISTRY if registry is None else registry
     llm = get_llm()
-    embeddings = []
 
-    for name, meta in SCHEMA_REGISTRY.items():
-        text = build_schema_text(name, meta)
-        emb = llm.embed(text)
-        embeddings.append({"name": name, "embedding": emb})
+    names = list(registry)
+    texts = [build_schema_text(name, registry[name]) for name in names]
+
+    start = time.perf_counter()
+    vectors = llm.embed_batch(texts)
+    logger.info(f"Embedded {len(names)} schema objects in {time.perf_counter() - start:.2f}s")
+
+    embeddings = [{"name": name, "embedding": emb} for name, emb in zip(names, vectors)]
 
-    with open(EMBED_FILE, "wb") as f:
+    # write-then-rename so readers never see a half-written file
+    tmp = EMBED_FILE.with_suffix(".pkl.tmp")
+    with open(tmp, "wb") as f:
         pickle.dump(embeddings, f)
+    os.replace(tmp, EMBED_FILE)
+    return embeddings
@@ -1,35 +1,44 @@
-import psycopg2
+from app.db.connection import acquire, VECTOR_POOL
 from app.llm.factory import get_llm
+from app.schema.embedding_cache import question_embedding_cache
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
-DB_CONFIG = {
-    "host": "localhost",
-    "database": "chat_boat",
-    "user": "postgres",
-    "password": "root"
-}
 
-def select_schema(question, top_k=5):
+async def aembed_question(question):
+    """Embed a question for schema lookup; returns None if the embedding call fails."""
+    vector = question_embedding_cache.get(question)
+    if vector is not None:
+        return vector
     try:
         llm = get_llm()
-        q_emb = llm.embed(question)
-        vector_str = "[" + ",".join(map(str, q_emb)) + "]"
-
-        conn = psycopg2.connect(**DB_CONFIG)
-        cur = conn.cursor()
+        return question_embedding_cache.put(question, await llm.aembed(question))
+    except Exception as e:
+        logger.error(f"Error embedding question: {e}")
+        return None
 
-        cur.execute("""
-            SELECT content
-            FROM semantic_schema_registry
-            ORDER BY embedding <-> %s::vector
-            LIMIT %s;
-        """, (vector_str, top_k))
 
-        rows = cur.fetchall()
-        cur.close()
-        conn.close()
+async def aselect_schema(question, top_k=5, embedding=None):
+    """
+    The `top_k` schema entries nearest the question, via the asyncpg vector pool.
+    Pass `embedding` when the question was already embedded concurrently.
+    """
+    try:
+        q_emb = embedding
+        if q_emb is None:
+            q_emb = await aembed_question(question)
+            if q_emb is None:
+                return []
+
+        # asyncpg sends real[] in binary; pgvector casts it to vector server-side
+        async with acquire(VECTOR_POOL) as conn:
+            rows = await conn.fetch("""
+                SELECT content
+                FROM semantic_schema_registry
+                ORDER BY embedding <-> $1::real[]::vector
+                LIMIT $2;
+            """, q_emb.tolist() if hasattr(q_emb, "tolist") else list(q_emb), top_k)
 
         if not rows:
             logger.warning("No schema found in database.")
@@ -39,4 +48,4 @@ def select_schema(question, top_k=5):
 
     except Exception as e:
         logger.error(f"Error selecting schema from database: {e}")
-        return []
\ No newline at end of file
+        return []
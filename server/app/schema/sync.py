@@ -0,0 +1,345 @@
+import datetime
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+from psycopg2.extras import execute_values
+
+from app.config.settings import settings
+from app.db.connection import get_connection, ANALYTICS_POOL, VECTOR_POOL
+from app.llm.factory import get_llm
+from app.schema.embedding_cache import embedding_model_key
+from app.schema.registry import SCHEMA_REGISTRY
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+SNAPSHOT_FILE = Path(__file__).resolve().parents[2] / "data" / "schema_snapshot.json"
+SNAPSHOT_VERSION = 1
+
+RELKINDS = {"r": "table", "p": "table", "f": "table", "v": "view", "m": "materialized view"}
+
+# ============================================================
+# INTROSPECTION
+# ============================================================
+# One query per catalog rather than per object, so thousands of objects
+# are read in a handful of round trips.
+
+_OBJECTS_SQL = """
+    SELECT c.oid, n.nspname, c.relname, c.relkind,
+           obj_description(c.oid, 'pg_class'),
+           CASE WHEN c.relkind IN ('v', 'm') THEN pg_get_viewdef(c.oid) END
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE c.relkind IN ('r', 'p', 'f', 'v', 'm')
+      AND NOT c.relispartition
+      AND n.nspname = ANY(%s)
+"""
+
+_COLUMNS_SQL = """
+    SELECT a.attrelid, a.attnum, a.attname, format_type(a.atttypid, a.atttypmod),
+           a.attnotnull, col_description(a.attrelid, a.attnum)
+    FROM pg_attribute a
+    JOIN pg_class c ON c.oid = a.attrelid
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE a.attnum > 0 AND NOT a.attisdropped
+      AND c.relkind IN ('r', 'p', 'f', 'v', 'm')
+      AND n.nspname = ANY(%s)
+    ORDER BY a.attrelid, a.attnum
+"""
+
+_CONSTRAINTS_SQL = """
+    SELECT con.conrelid, con.contype, con.conkey, fn.nspname, fc.relname
+    FROM pg_constraint con
+    JOIN pg_class c ON c.oid = con.conrelid
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    LEFT JOIN pg_class fc ON fc.oid = con.confrelid
+    LEFT JOIN pg_namespace fn ON fn.oid = fc.relnamespace
+    WHERE con.contype IN ('p', 'f') AND n.nspname = ANY(%s)
+"""
+
+
+def _split(spec: str) -> list:
+    return [item.strip() for item in (spec or "").split(",") if item.strip()]
+
+
+def introspect(conn, schemas) -> dict:
+    """Return {object_name: {"type", "description", "columns", "definition"}} for the given schemas."""
+    cur = conn.cursor()
+    try:
+        cur.execute(_OBJECTS_SQL, (list(schemas),))
+        objects = {}
+        names = {}
+        for oid, schema, name, relkind, comment, definition in cur.fetchall():
+            qualified = name if schema == "public" else f"{schema}.{name}"
+            names[oid] = qualified
+            objects[qualified] = {
+                "type": RELKINDS[relkind],
+                "description": comment,
+                "definition": " ".join(definition.split()) if definition else None,
+                "columns": [],
+                "_attnums": {},
+            }
+
+        cur.execute(_COLUMNS_SQL, (list(schemas),))
+        for oid, attnum, column, data_type, not_null, comment in cur.fetchall():
+            obj = objects.get(names.get(oid))
+            if obj is None:
+                continue
+            obj["_attnums"][attnum] = column
+            obj["columns"].append({"name": column, "type": data_type, "not_null": not_null,
+                                   "comment": comment, "notes": []})
+
+        cur.execute(_CONSTRAINTS_SQL, (list(schemas),))
+        for oid, contype, attnums, ref_schema, ref_table in cur.fetchall():
+            obj = objects.get(names.get(oid))
+            if obj is None:
+                continue
+            by_name = {c["name"]: c for c in obj["columns"]}
+            for attnum in attnums or []:
+                column = by_name.get(obj["_attnums"].get(attnum))
+                if column is None:
+                    continue
+                if contype == "p":
+                    column["notes"].append("primary key")
+                else:
+                    ref = ref_table if ref_schema == "public" else f"{ref_schema}.{ref_table}"
+                    column["notes"].append(f"FK to {ref}")
+    finally:
+        cur.close()
+
+    for obj in objects.values():
+        obj.pop("_attnums")
+    return objects
+
+
+# ============================================================
+# CONTENT AND HASHING
+# ============================================================
+
+def build_content(name: str, obj: dict) -> str:
+    """
+    Text stored in semantic_schema_registry.content and embedded. Uses the
+    hand-written description and grain from SCHEMA_REGISTRY when present.
+    """
+    meta = SCHEMA_REGISTRY.get(name, {})
+    description = meta.get("description") or obj["description"] or ""
+    lines = [f"Object: {name} ({obj['type']})"]
+    if description:
+        lines.append(f"Description: {description}")
+    if meta.get("grain"):
+        lines.append(f"Grain: {meta['grain']}")
+    lines.append(f"{name}(")
+    for i, column in enumerate(obj["columns"]):
+        details = [column["type"]] + column["notes"]
+        if not column["not_null"] and not column["notes"]:
+            details.append("nullable")
+        if column["comment"]:
+            details.append(column["comment"])
+        comma = "," if i < len(obj["columns"]) - 1 else ""
+        lines.append(f"    {column['name']}{comma}  -- {', '.join(details)}")
+    lines.append(")")
+    return "\n".join(lines)
+
+
+def content_hash(content: str, obj: dict) -> str:
+    # view bodies count too: a changed definition can change what columns mean
+    h = hashlib.sha256(content.encode("utf-8"))
+    if obj.get("definition"):
+        h.update(b"\0" + obj["definition"].encode("utf-8"))
+    return h.hexdigest()
+
+
+# ============================================================
+# SNAPSHOT
+# ============================================================
+
+def load_snapshot(path=SNAPSHOT_FILE) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+        if snapshot.get("version") == SNAPSHOT_VERSION:
+            return snapshot
+        logger.warning(f"Ignoring schema snapshot with unknown version: {snapshot.get('version')}")
+    except FileNotFoundError:
+        pass
+    except (json.JSONDecodeError, AttributeError):
+        logger.warning(f"Ignoring unreadable schema snapshot {path}")
+    return {}
+
+
+def save_snapshot(hashes: dict, model: str, path=SNAPSHOT_FILE):
+    snapshot = {
+        "version": SNAPSHOT_VERSION,
+        "embed_model": model,
+        "synced_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "objects": dict(sorted(hashes.items())),
+    }
+    tmp = Path(f"{path}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f, indent=2)
+    os.replace(tmp, path)
+
+
+# ============================================================
+# REGISTRY TABLE
+# ============================================================
+
+def ensure_registry_table(conn):
+    """Create semantic_schema_registry, or add the sync columns to an existing one."""
+    cur = conn.cursor()
+    try:
+        cur.execute("CREATE EXTENSION IF NOT EXISTS vector")
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS semantic_schema_registry (
+                object_name TEXT NOT NULL,
+                object_type TEXT,
+                content TEXT NOT NULL,
+                content_hash TEXT,
+                embedding vector,
+                updated_at TIMESTAMPTZ DEFAULT now()
+            )
+        """)
+        for column, ddl in (("object_name", "TEXT"), ("object_type", "TEXT"),
+                            ("content_hash", "TEXT"), ("updated_at", "TIMESTAMPTZ DEFAULT now()")):
+            cur.execute(f"ALTER TABLE semantic_schema_registry ADD COLUMN IF NOT EXISTS {column} {ddl}")
+        cur.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS semantic_schema_registry_object_name_idx
+            ON semantic_schema_registry (object_name)
+        """)
+        conn.commit()
+    finally:
+        cur.close()
+
+
+def registry_hashes(conn) -> dict:
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT object_name, content_hash FROM semantic_schema_registry WHERE object_name IS NOT NULL")
+        return dict(cur.fetchall())
+    finally:
+        cur.close()
+
+
+def _vector_literal(vector) -> str:
+    return "[" + ",".join(f"{float(v):.7g}" for v in vector) + "]"
+
+
+# ============================================================
+# SYNC
+# ============================================================
+
+def diff(current: dict, previous: dict):
+    """Return (added, changed, removed) object names."""
+    added = sorted(set(current) - set(previous))
+    changed = sorted(n for n in set(current) & set(previous) if current[n] != previous[n])
+    removed = sorted(set(previous) - set(current))
+    return added, changed, removed
+
+
+def sync_schema(full=False, dry_run=False, schemas=None, exclude=None) -> dict:
+    """
+    Introspect the analytics database, diff per-object content hashes against
+    the snapshot, embed only new/changed objects and upsert them into
+    semantic_schema_registry; rows of dropped objects are deleted.
+    With full=True every object is re-embedded.
+    """
+    start = time.perf_counter()
+    schemas = schemas or _split(settings.SCHEMA_SYNC_SCHEMAS)
+    exclude = set(_split(settings.SCHEMA_SYNC_EXCLUDE) if exclude is None else exclude)
+    model = embedding_model_key()
+
+    conn = get_connection(ANALYTICS_POOL)
+    try:
+        objects = introspect(conn, schemas)
+    finally:
+        conn.close()
+    objects = {name: obj for name, obj in objects.items() if name not in exclude}
+
+    contents = {name: build_content(name, obj) for name, obj in objects.items()}
+    hashes = {name: content_hash(contents[name], obj) for name, obj in objects.items()}
+
+    vconn = get_connection(VECTOR_POOL)
+    try:
+        if not dry_run:
+            ensure_registry_table(vconn)
+
+        snapshot = load_snapshot()
+        if full:
+            previous = {}
+        elif snapshot.get("embed_model") == model:
+            previous = snapshot.get("objects", {})
+        elif snapshot:
+            logger.info(f"Embedding model changed ({snapshot.get('embed_model')} -> {model}), re-embedding all objects")
+            previous = {}
+        else:
+            # no snapshot yet: trust what the registry table already holds
+            previous = registry_hashes(vconn) if not dry_run else {}
+
+        added, changed, removed = diff(hashes, previous)
+        if full:
+            removed = sorted(set(registry_hashes(vconn)) - set(hashes)) if not dry_run else []
+        to_embed = added + changed
+        summary = {
+            "objects": len(objects),
+            "added": len(added),
+            "changed": len(changed),
+            "removed": len(removed),
+            "unchanged": len(objects) - len(to_embed),
+            "embedded": 0,
+        }
+
+        if dry_run:
+            summary.update(added_names=added, changed_names=changed, removed_names=removed)
+            return summary
+
+        if to_embed:
+            vectors = get_llm().embed_batch([contents[name] for name in to_embed])
+            rows = [
+                (name, objects[name]["type"], contents[name], hashes[name], _vector_literal(vector))
+                for name, vector in zip(to_embed, vectors)
+            ]
+            summary["embedded"] = len(rows)
+        else:
+            rows = []
+
+        cur = vconn.cursor()
+        try:
+            if rows:
+                execute_values(cur, """
+                    INSERT INTO semantic_schema_registry (object_name, object_type, content, content_hash, embedding)
+                    VALUES %s
+                    ON CONFLICT (object_name) DO UPDATE
+                    SET object_type = EXCLUDED.object_type,
+                        content = EXCLUDED.content,
+                        content_hash = EXCLUDED.content_hash,
+                        embedding = EXCLUDED.embedding,
+                        updated_at = now()
+                """, rows, template="(%s, %s, %s, %s, %s::vector)", page_size=500)
+            if removed:
+                cur.execute("DELETE FROM semantic_schema_registry WHERE object_name = ANY(%s)", (removed,))
+            # rows loaded before the sync existed have no object_name and would
+            # duplicate the synced ones in similarity search
+            cur.execute("DELETE FROM semantic_schema_registry WHERE object_name IS NULL")
+            if cur.rowcount:
+                logger.info(f"Removed {cur.rowcount} unmanaged rows from semantic_schema_registry")
+            vconn.commit()
+        except Exception:
+            vconn.rollback()
+            raise
+        finally:
+            cur.close()
+    finally:
+        vconn.close()
+
+    # written only after the registry commit, so a failed run is retried next time
+    save_snapshot(hashes, model)
+    summary["seconds"] = round(time.perf_counter() - start, 2)
+    logger.info(
+        f"Schema sync: {summary['objects']} objects, {summary['added']} added, "
+        f"{summary['changed']} changed, {summary['removed']} removed, "
+        f"{summary['embedded']} embedded in {summary['seconds']}s"
+    )
+    return summary
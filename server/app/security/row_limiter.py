@@ -1,4 +1,21 @@
+from app.security.sql_analyzer import analyze
+
+
 def apply_limit(sql: str, limit: int):
-    if "limit" not in sql.lower():
-        return f"{sql} LIMIT {limit}"
-    return sql
+    """
+    Make the database stop after `limit` rows, whatever LIMIT (if any) the
+    statement itself carries:
+
+    - an outer LIMIT of at most `limit` rows is kept as is
+    - a query without LIMIT / OFFSET / FETCH gets `LIMIT limit` appended
+    - anything else is wrapped in an outer SELECT
+    """
+    analysis = analyze(sql)
+    limit = int(limit)
+    inner = analysis.body
+    if not (analysis.has_offset or analysis.has_fetch):
+        if analysis.limit is not None and analysis.limit <= limit:
+            return inner
+        if not analysis.has_limit and analysis.statement_type in ("select", "values"):
+            return f"{inner}\nLIMIT {limit}"
+    return f"SELECT * FROM (\n{inner}\n) AS limited_result LIMIT {limit}"
@@ -0,0 +1,289 @@
+import hashlib
+import re
+from functools import lru_cache
+
+# ============================================================
+# SINGLE-PASS SQL ANALYSIS
+# ============================================================
+#
+# Every statement is tokenized and walked once; the guard (sql_guard), the
+# row limiter, the result / export cache keys and the statement
+# parameterizer all read the same SQLAnalysis. Analyses are memoized on the
+# exact SQL text, so validating, limiting and caching one generated query
+# costs a single parse.
+#
+# Keywords are recognized as whole tokens, never as substrings: columns such
+# as updated_at or is_deleted and strings like 'drop-off' are ordinary
+# identifiers and literals.
+
+TOKEN = re.compile(
+    r"(?P<space>\s+)"
+    r"|(?P<word>[A-Za-z_][\w$]*)"
+    r"|(?P<num>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)"
+    r"|(?P<str>'(?:[^']|'')*')"
+    r'|(?P<ident>"(?:[^"]|"")*")'
+    r"|(?P<comment>--[^\n]*|/\*.*?\*/)"
+    r"|(?P<param>\$\d+)"
+    r"|(?P<dstr>\$(?P<tag>(?:[A-Za-z_]\w*)?)\$.*?\$(?P=tag)\$)"
+    r"|(?P<dollar>\$)"
+    r"|(?P<cast>::)"
+    r"|(?P<op>.)",
+    re.S,
+)
+
+STATEMENT_WORDS = {"select", "insert", "update", "delete", "merge", "values", "table"}
+
+# clause keywords; a new one replaces the current clause at the same depth
+_CLAUSES = {
+    "select", "from", "join", "where", "group", "order", "having", "limit", "offset",
+    "on", "using", "union", "intersect", "except", "window", "values", "fetch",
+    "partition", "returning", "set", "into",
+}
+# identifiers in these clauses are column references
+_COLUMN_CLAUSES = {"select", "where", "group", "order", "having", "on", "using", "partition"}
+
+KEYWORDS = _CLAUSES | STATEMENT_WORDS | {
+    "all", "and", "any", "array", "as", "asc", "between", "both", "by", "case", "cast",
+    "collate", "cross", "current_date", "current_time", "current_timestamp", "date",
+    "day", "default", "desc", "distinct", "else", "end", "escape", "exists", "extract",
+    "false", "filter", "first", "following", "for", "full", "hour", "ilike", "in",
+    "inner", "interval", "is", "isnull", "last", "lateral", "leading", "left", "like",
+    "materialized", "minute", "month", "natural", "next", "no", "not", "notnull", "null",
+    "nulls", "only", "or", "outer", "over", "overlay", "position", "preceding", "range",
+    "recursive", "right", "row", "rows", "second", "similar", "some", "substring", "symmetric",
+    "then", "ties", "time", "timestamp", "to", "trailing", "trim", "true", "unbounded",
+    "unknown", "when", "with", "within", "without", "year", "zone", "current",
+    "coalesce", "nullif", "greatest", "least",
+}
+# keywords that are called like functions: "from" inside them is not a FROM clause
+_CALL_KEYWORDS = {
+    "extract", "substring", "trim", "overlay", "position", "cast",
+    "coalesce", "nullif", "greatest", "least", "array",
+}
+# words after which an identifier is an alias, not a column
+_EXPRESSION_END = {"end", "null", "true", "false"}
+_LOCKING = {"update", "share", "no", "key"}
+_LITERALS = {"str", "num", "dstr"}
+_NONE = (None, None, None)
+
+
+class SQLAnalysis:
+    """
+    The structure of one SQL text.
+
+    tokens          [(kind, text)] for the whole text; comments are "space"
+    statement_type  first statement keyword, lowercased ("select", "insert",
+                    ...); for WITH queries the main statement after the CTEs
+    statements      number of non-empty statements separated by ";"
+    cte_types       statement keyword of each WITH body, in order
+    tables          tables and views read after FROM / JOIN (no schema
+                    prefix, CTE names excluded)
+    columns         identifiers used as columns (best effort)
+    functions       names of the functions called
+    limit           top-level LIMIT as an int, None if absent or not a number
+    has_limit / has_offset / has_fetch
+                    whether the outermost query has these clauses
+    select_into     SELECT ... INTO (creates a table)
+    locking         FOR UPDATE / FOR SHARE clause
+    unterminated    unbalanced quote or parenthesis
+    body            the text without a trailing ";" or trailing comments
+    canonical       comments dropped, whitespace collapsed and everything
+                    outside quotes lowercased; the result cache key
+    fingerprint     hash of the canonical text with literals masked; equal
+                    for statements that differ only in values
+    """
+
+    __slots__ = (
+        "sql", "tokens", "statement_type", "statements", "cte_types", "tables", "columns",
+        "functions", "limit", "has_limit", "has_offset", "has_fetch", "select_into",
+        "locking", "unterminated", "body", "canonical", "fingerprint",
+    )
+
+
+def canonical_text(tokens) -> str:
+    """Canonical form of a token list (see SQLAnalysis.canonical)."""
+    parts = []
+    for kind, text in tokens:
+        if kind in ("space", "comment"):
+            if parts and parts[-1] != " ":
+                parts.append(" ")
+        elif kind in ("str", "ident", "dstr"):
+            parts.append(text)
+        else:
+            parts.append(text.lower())
+    while parts and parts[-1] in (" ", ";"):
+        parts.pop()
+    return "".join(parts).lstrip()
+
+
+def _unquote(kind, text):
+    if kind == "ident":
+        return text[1:-1].replace('""', '"')
+    return text.lower()
+
+
+def _analyze(sql: str) -> SQLAnalysis:
+    tokens = []
+    sig = []  # (kind, text, lowered) of significant tokens
+    body_end = 0
+    for match in TOKEN.finditer(sql):
+        kind = match.lastgroup
+        text = match.group(0)
+        if kind == "comment":
+            kind = "space"
+        tokens.append((kind, text))
+        if kind != "space":
+            sig.append((kind, text, text.lower()))
+            if text != ";":
+                body_end = match.end()
+
+    a = SQLAnalysis()
+    a.sql = sql
+    a.tokens = tokens
+    a.body = sql[:body_end].strip()
+    a.statement_type = None
+    a.statements = 0
+    a.cte_types = []
+    a.limit = None
+    a.has_limit = a.has_offset = a.has_fetch = False
+    a.select_into = a.locking = False
+    a.unterminated = False
+    tables, ctes, columns, functions = set(), set(), set(), set()
+
+    # one frame per open parenthesis: [clause, is_call, is_cte_body, seen_word]
+    frames = [[None, False, False, False]]
+    with_head = False
+    expect_table = False
+    new_statement = True
+    skip = 0
+    n = len(sig)
+    for i in range(n):
+        if skip:
+            skip -= 1
+            continue
+        kind, text, low = sig[i]
+        prev = sig[i - 1] if i else _NONE
+        nxt = sig[i + 1] if i + 1 < n else _NONE
+        frame = frames[-1]
+        depth = len(frames) - 1
+
+        if text == ";" and kind == "op":
+            new_statement = True
+            continue
+        if new_statement:
+            a.statements += 1
+            new_statement = False
+
+        if kind == "op":
+            if text in ("'", '"'):
+                a.unterminated = True
+            elif text == "(":
+                is_call = (
+                    prev[0] in ("word", "ident")
+                    and (prev[2] not in KEYWORDS or prev[2] in _CALL_KEYWORDS)
+                    and not (with_head and depth == 0)  # CTE column list
+                    and not (i > 1 and sig[i - 2][0] == "cast")  # ::numeric(12, 2)
+                )
+                is_cte_body = with_head and depth == 0 and prev[2] in ("as", "materialized")
+                if is_call and prev[2] not in KEYWORDS:
+                    functions.add(_unquote(prev[0], prev[1]))
+                frames.append([frame[0] if is_call else None, is_call, is_cte_body, False])
+                expect_table = False
+            elif text == ")":
+                if len(frames) > 1:
+                    frames.pop()
+                else:
+                    a.unterminated = True
+            elif text == "," and frame[0] == "from" and not frame[1]:
+                expect_table = True
+            continue
+
+        if kind not in ("word", "ident"):
+            continue
+
+        name = _unquote(kind, text)
+        is_keyword = kind == "word" and low in KEYWORDS
+
+        if frame[2] and not frame[3] and kind == "word":
+            # first word of a WITH body is that CTE's statement type
+            a.cte_types.append(low)
+        frame[3] = True
+
+        if a.statement_type is None and kind == "word":
+            if low == "with" and not with_head:
+                with_head = True
+                continue
+            if not with_head:
+                a.statement_type = low
+        if with_head and depth == 0:
+            if low in STATEMENT_WORDS and kind == "word":
+                a.statement_type = low
+                with_head = False
+            elif prev[2] in ("with", "recursive", ",") and low != "recursive":
+                ctes.add(name)
+                continue
+            else:
+                continue
+
+        if expect_table:
+            if kind == "word" and low in ("lateral", "only"):
+                continue
+            expect_table = False
+            if nxt[1] == "(":
+                # set-returning function in FROM; the "(" registers it
+                continue
+            if nxt[1] == "." and i + 2 < n and sig[i + 2][0] in ("word", "ident"):
+                name = _unquote(sig[i + 2][0], sig[i + 2][1])
+                skip = 2
+            if name not in ctes:
+                tables.add(name)
+            continue
+
+        if is_keyword:
+            if low in _CLAUSES and not frame[1]:
+                frame[0] = low
+                if low in ("from", "join"):
+                    expect_table = True
+            if depth == 0:
+                if low == "limit":
+                    a.has_limit = True
+                    if nxt[0] == "num" and nxt[1].isdigit():
+                        a.limit = int(nxt[1])
+                elif low == "offset":
+                    a.has_offset = True
+                elif low == "fetch":
+                    a.has_fetch = True
+            if low == "into" and a.statement_type == "select":
+                a.select_into = True
+            if low == "for" and nxt[2] in _LOCKING:
+                a.locking = True
+            continue
+
+        if nxt[1] == "." or nxt[1] == "(" or prev[0] == "cast" or prev[2] == "as":
+            # table qualifier, function name, type name or alias
+            continue
+        if frame[0] in _COLUMN_CLAUSES:
+            ends_expression = (
+                prev[0] in ("ident", "num", "str", "param", "dstr")
+                or prev[1] == ")"
+                or (prev[0] == "word" and (prev[2] not in KEYWORDS or prev[2] in _EXPRESSION_END))
+            )
+            if not ends_expression:
+                columns.add(name)
+
+    if len(frames) > 1:
+        a.unterminated = True
+    a.tables = frozenset(tables)
+    a.columns = frozenset(columns)
+    a.functions = frozenset(functions)
+    a.cte_types = tuple(a.cte_types)
+    a.canonical = canonical_text(tokens)
+    masked = " ".join("?" if kind in _LITERALS else low if kind != "ident" else text for kind, text, low in sig)
+    a.fingerprint = hashlib.sha1(masked.encode("utf-8")).hexdigest()[:16]
+    return a
+
+
+@lru_cache(maxsize=1024)
+def analyze(sql: str) -> SQLAnalysis:
+    """The memoized SQLAnalysis of `sql`; treat the result as read-only."""
+    return _analyze(sql)
@@ -1,14 +1,44 @@
-FORBIDDEN = [
-    "drop", "delete", "update", "insert",
-    "truncate", "alter", "grant", "revoke"
-]
+from app.security.sql_analyzer import analyze
 
-def validate_sql(sql: str):
-    sql_lower = sql.lower()
+READ_ONLY_STATEMENTS = {"select", "values", "table"}
+
+# Functions with side effects outside the query result (sleeping, file and
+# session access, sequences, running SQL given as text)
+FORBIDDEN_FUNCTIONS = {
+    "pg_sleep", "pg_sleep_for", "pg_sleep_until",
+    "pg_read_file", "pg_read_binary_file", "pg_ls_dir", "pg_stat_file",
+    "lo_import", "lo_export", "lo_unlink",
+    "dblink", "dblink_exec", "dblink_connect",
+    "pg_terminate_backend", "pg_cancel_backend", "pg_reload_conf", "pg_rotate_logfile",
+    "set_config", "pg_advisory_lock", "pg_advisory_xact_lock", "pg_notify",
+    "nextval", "setval",
+    "query_to_xml", "query_to_xml_and_xmlschema", "cursor_to_xml",
+}
 
-    for word in FORBIDDEN:
-        if word in sql_lower:
-            raise ValueError(f"Forbidden SQL keyword: {word}")
 
-    if ";" in sql_lower[:-1]:
+def validate_sql(sql: str):
+    """
+    Reject anything but a single read-only query. Returns the SQLAnalysis so
+    callers can reuse it.
+    """
+    analysis = analyze(sql)
+
+    if analysis.unterminated:
+        raise ValueError("Unterminated quote or parenthesis in SQL")
+    if analysis.statements == 0:
+        raise ValueError("Empty SQL statement")
+    if analysis.statements > 1:
         raise ValueError("Multiple SQL statements not allowed")
+    if analysis.statement_type not in READ_ONLY_STATEMENTS:
+        raise ValueError(f"Forbidden SQL statement: {(analysis.statement_type or '').upper()}")
+    for cte_type in analysis.cte_types:
+        if cte_type not in READ_ONLY_STATEMENTS:
+            raise ValueError(f"Forbidden SQL statement in WITH: {cte_type.upper()}")
+    if analysis.select_into:
+        raise ValueError("SELECT ... INTO is not allowed")
+    if analysis.locking:
+        raise ValueError("Row locking clauses (FOR UPDATE / FOR SHARE) are not allowed")
+    forbidden = analysis.functions & FORBIDDEN_FUNCTIONS
+    if forbidden:
+        raise ValueError(f"Forbidden SQL function: {sorted(forbidden)[0]}")
+    return analysis
@@ -0,0 +1,123 @@
+import datetime
+import decimal
+import uuid
+
+import numpy as np
+import orjson
+import pandas as pd
+
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# ============================================================
+# WIRE FORMATS FOR QUERY RESULTS
+# ============================================================
+#
+#   application/json                      rows: "data": [{"col": value, ...}, ...]  (default)
+#   application/vnd.columnar+json         columns: "data": {"col": [values...], ...}
+#   application/vnd.apache.arrow.stream   Arrow IPC stream; response fields in schema metadata
+
+ROWS_JSON = "application/json"
+COLUMNAR_JSON = "application/vnd.columnar+json"
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+
+SUPPORTED_FORMATS = (ROWS_JSON, COLUMNAR_JSON, ARROW_STREAM)
+
+_ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def negotiate(accept: str | None) -> str:
+    """Pick the wire format from an Accept header; anything unrecognised gets row JSON."""
+    if not accept:
+        return ROWS_JSON
+    ranked = []
+    for position, item in enumerate(accept.split(",")):
+        parts = [p.strip() for p in item.split(";")]
+        media_type = parts[0].lower()
+        quality = 1.0
+        for param in parts[1:]:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if media_type in SUPPORTED_FORMATS and quality > 0:
+            ranked.append((-quality, position, media_type))
+    return min(ranked)[2] if ranked else ROWS_JSON
+
+
+def _default(value):
+    # orjson handles str/int/float/bool/None, datetime/date/time, uuid and
+    # numpy arrays/scalars itself; this covers what database drivers and
+    # pandas add on top.
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if value is pd.NaT:
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    if isinstance(value, pd.Timedelta):
+        return value.total_seconds()
+    if isinstance(value, datetime.timedelta):
+        return value.total_seconds()
+    if isinstance(value, (bytes, memoryview)):
+        return bytes(value).hex()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(value) -> bytes:
+    """Serialize to JSON bytes with orjson."""
+    return orjson.dumps(value, default=_default, option=_ORJSON_OPTIONS)
+
+
+def _column_values(series: pd.Series):
+    values = series.to_numpy()
+    # numeric and datetime arrays are written by orjson directly (NaN -> null)
+    if values.dtype.kind in "biuf":
+        return np.ascontiguousarray(values)
+    if values.dtype.kind == "M" and not series.isna().any():
+        return np.ascontiguousarray(values)
+    return series.astype(object).where(series.notna(), None).tolist()
+
+
+def rows_data(df: pd.DataFrame) -> list:
+    """Row-oriented data: one dict per row."""
+    columns = df.columns.tolist()
+    return [dict(zip(columns, row)) for row in df.itertuples(index=False, name=None)]
+
+
+def columnar_data(df: pd.DataFrame) -> dict:
+    """Column-oriented data: column name -> list/array of values."""
+    return {column: _column_values(df[column]) for column in df.columns}
+
+
+def arrow_ipc(df: pd.DataFrame, metadata: dict) -> bytes:
+    """
+    Encode the result as an Arrow IPC stream. Non-data response fields go in
+    the schema metadata under "response", JSON encoded.
+    """
+    import pyarrow as pa
+
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+        # mixed-type object columns; fall back to text for those
+        logger.warning(f"Arrow conversion failed ({e}), sending object columns as text")
+        df = df.copy()
+        for column in df.columns:
+            if df[column].dtype == object:
+                df[column] = df[column].map(lambda v: None if v is None else str(v))
+        table = pa.Table.from_pandas(df, preserve_index=False)
+
+    table = table.replace_schema_metadata({"response": dumps(metadata)})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
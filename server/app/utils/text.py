@@ -0,0 +1,32 @@
+import re
+
+_NON_WORD = re.compile(r"[^\w\s-]+")
+_SPACES = re.compile(r"\s+")
+
+# Phrases that make a question depend on earlier turns (mirrors the
+# CONTEXT USAGE rule in SQL_SYSTEM_PROMPT)
+_CONTEXT_REFERENCE = re.compile(
+    r"\b(same|above|previous|earlier|that|those|these|this|it|them|again|instead|also)\b"
+)
+
+_NUMBER = re.compile(r"\d+(?:[.,/-]\d+)*")
+_QUOTED = re.compile(r"(?<!\w)'([^']+)'(?!\w)|\"([^\"]+)\"")
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace."""
+    text = _NON_WORD.sub(" ", question.lower())
+    return _SPACES.sub(" ", text).strip()
+
+
+def refers_to_context(normalized_question: str) -> bool:
+    """True when a normalized question points back at earlier turns ("same year", "those")."""
+    return _CONTEXT_REFERENCE.search(normalized_question) is not None
+
+
+def question_literals(question: str) -> set:
+    """Numbers (years, amounts) and quoted strings in a question, normalized."""
+    literals = {m.group(0) for m in _NUMBER.finditer(question)}
+    for m in _QUOTED.finditer(question):
+        literals.add(normalize_question(m.group(1) or m.group(2)))
+    return literals
@@ -1,5 +1,6 @@
 # Python CLI entry point (chainlit removed)
 from pathlib import Path
+import asyncio
 import uuid
 
 # ensure the `server` directory is on sys.path so that `app` package imports work
@@ -7,15 +8,14 @@ ROOT_DIR = Path(__file__).resolve().parent
 import sys
 sys.path.insert(0, str(ROOT_DIR))
 
-from app.schema.selector import select_schema
-from app.schema.builder import build_schema
-from app.llm.text_to_sql import generate_sql
-from app.llm.formatter import format_result
-from app.llm.intent_detector import detect_intent, get_conversational_response
-from app.security.sql_guard import validate_sql
-from app.db.executor import execute_sql
-from app.memory.chat_store import init_db, save_message
-from app.memory.context_builder import build_context
+from app.db.connection import close_all_async_pools
+from app.llm.factory import close_llms
+from app.llm.intent_detector import close_intent_log
+from app.schema.embedding_cache import question_embedding_cache
+from app.memory.chat_store import init_db
+from app.memory.history_writer import history_writer
+from app.memory.store_factory import close_chat_store
+from app.pipeline.question_pipeline import answer_question
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -24,26 +24,14 @@ logger = get_logger(__name__)
 init_db()
 
 
-def process_question(question: str, session_id: str) -> str:
-    """Run the core logic for a single user question and return the assistant reply."""
-    save_message(session_id, "user", question)
-    context = build_context(session_id)
-    intent = detect_intent(question)
-
-    if intent == "conversation":
-        reply = get_conversational_response(question, context)
-        save_message(session_id, "assistant", reply)
-        return reply
+# one event loop for the whole CLI session so the asyncpg pools are reused
+_runner = asyncio.Runner()
 
-    schema_keys = select_schema(question)
-    schema = build_schema(schema_keys)
-    sql = generate_sql(question, schema, context)
 
-    validate_sql(sql)
-    df = execute_sql(sql, question)
-    answer = format_result(df, question)
-    save_message(session_id, "assistant", answer)
-    return answer
+def process_question(question: str, session_id: str) -> str:
+    """Run the core logic for a single user question and return the assistant reply."""
+    result = _runner.run(answer_question(question, session_id))
+    return result["answer"]
 
 
 if __name__ == "__main__":
@@ -58,3 +46,11 @@ if __name__ == "__main__":
             break
         reply = process_question(question, session_id)
         print(f"\n{reply}")
+
+    history_writer.close()
+    close_chat_store()
+    close_intent_log()
+    _runner.run(close_all_async_pools())
+    _runner.run(close_llms())
+    question_embedding_cache.save()
+    _runner.close()
@@ -0,0 +1,6 @@
+# make sure the `server` directory is on sys.path so that `app` package imports work
+from pathlib import Path
+import sys
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
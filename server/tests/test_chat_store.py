@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+from app.config.settings import settings
+from app.memory import chat_store, store_factory
+from app.memory.backends.sqlite_store import SQLiteChatStore
+from app.memory.history_writer import HistoryWriter
+
+SESSION = "5d0c2f0a-3b1e-4c55-8f7e-2b9d6c1a4e01"
+
+
+@pytest.fixture
+def writer(tmp_path, monkeypatch):
+    store = SQLiteChatStore(str(tmp_path / "chat_history.db"))
+    store.init()
+    monkeypatch.setattr(store_factory, "_store", store)
+    # queued messages stay pending until flush() is called
+    writer = HistoryWriter(flush_interval=60, write=store.write)
+    monkeypatch.setattr(chat_store, "history_writer", writer)
+    monkeypatch.setattr(settings, "CHAT_WRITE_BEHIND", True)
+    monkeypatch.setattr(settings, "HISTORY_MAX_PAGE_SIZE", 200)
+    yield writer
+    writer.close(timeout=5)
+    store.close()
+
+
+def _save(*contents):
+    for content in contents:
+        chat_store.save_message(SESSION, "user", content)
+
+
+def _walk(limit):
+    """Every page from the newest back, as lists of contents."""
+    pages, before = [], None
+    while True:
+        page = chat_store.get_history_page(SESSION, limit=limit, before=before)
+        pages.append([content for _, content in page["messages"]])
+        before = page["next_before"]
+        if before is None:
+            return pages
+
+
+def test_committed_pages(writer):
+    _save("m1", "m2", "m3", "m4", "m5")
+    writer.flush(timeout=5)
+    assert _walk(2) == [["m4", "m5"], ["m2", "m3"], ["m1"]]
+
+
+def test_first_page_respects_limit_with_many_pending(writer):
+    _save(*(f"m{i}" for i in range(1, 9)))
+    page = chat_store.get_history_page(SESSION, limit=3)
+    assert [content for _, content in page["messages"]] == ["m6", "m7", "m8"]
+    assert page["next_before"] is not None
+
+
+def test_pages_after_pending_have_no_gaps_or_repeats(writer):
+    _save(*(f"m{i}" for i in range(1, 9)))
+    pages = _walk(3)
+    assert pages == [["m6", "m7", "m8"], ["m3", "m4", "m5"], ["m1", "m2"]]
+
+
+def test_pending_are_the_newest(writer):
+    _save("m1", "m2", "m3")
+    writer.flush(timeout=5)
+    _save("m4", "m5")
+    page = chat_store.get_history_page(SESSION, limit=4)
+    assert [content for _, content in page["messages"]] == ["m2", "m3", "m4", "m5"]
+    rest = chat_store.get_history_page(SESSION, limit=4, before=page["next_before"])
+    assert [content for _, content in rest["messages"]] == ["m1"]
+    assert rest["next_before"] is None
+
+
+def test_oldest_shown_message_pending(writer):
+    _save("m1", "m2")
+    writer.flush(timeout=5)
+    _save("m3", "m4")
+    page = chat_store.get_history_page(SESSION, limit=2)
+    assert [content for _, content in page["messages"]] == ["m3", "m4"]
+    rest = chat_store.get_history_page(SESSION, limit=2, before=page["next_before"])
+    assert [content for _, content in rest["messages"]] == ["m1", "m2"]
+
+
+def test_etag_changes_only_with_the_page(writer):
+    _save("m1", "m2")
+    writer.flush(timeout=5)
+    first = chat_store.get_history_page(SESSION, limit=10)["etag"]
+    assert chat_store.get_history_page(SESSION, limit=10)["etag"] == first
+
+    _save("m3")
+    queued = chat_store.get_history_page(SESSION, limit=10)["etag"]
+    assert queued != first
+    writer.flush(timeout=5)
+    assert chat_store.get_history_page(SESSION, limit=10)["etag"] not in (first, queued)
+
+
+def test_history_includes_pending(writer):
+    _save("m1")
+    writer.flush(timeout=5)
+    _save("m2")
+    assert [content for _, content, _ in asyncio.run(chat_store.aget_history(SESSION))] == ["m1", "m2"]
+    assert [content for _, content, _ in asyncio.run(chat_store.aget_history(SESSION, limit=1))] == ["m2"]
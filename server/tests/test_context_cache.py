@@ -0,0 +1,148 @@
+import asyncio
+
+import pytest
+
+from app.memory.context_cache import ContextCache, _ROW_OVERHEAD
+
+
+def _history(*contents):
+    return [("user", content, None) for content in contents]
+
+
+class Store:
+    """Stub history store counting reads."""
+
+    def __init__(self):
+        self.sessions = {}
+        self.reads = 0
+
+    def fetch(self, session_id):
+        def fetch(n):
+            self.reads += 1
+            return self.sessions.get(session_id, [])[-n:]
+        return fetch
+
+
+@pytest.fixture
+def store():
+    return Store()
+
+
+def test_hit_after_fill(store):
+    cache = ContextCache(turns=4, max_sessions=10, max_bytes=10 ** 6)
+    store.sessions["s"] = _history("a", "b", "c")
+    assert [c for _, c, _ in cache.recent("s", 2, store.fetch("s"))] == ["b", "c"]
+    assert [c for _, c, _ in cache.recent("s", 3, store.fetch("s"))] == ["a", "b", "c"]
+    assert store.reads == 1
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 1)
+
+
+def test_more_than_turns_reads_the_store(store):
+    cache = ContextCache(turns=2, max_sessions=10, max_bytes=10 ** 6)
+    store.sessions["s"] = _history("a", "b", "c")
+    assert len(cache.recent("s", 3, store.fetch("s"))) == 3
+    assert cache.stats()["sessions"] == 0
+
+
+def test_ring_buffer_keeps_the_last_turns(store):
+    cache = ContextCache(turns=3, max_sessions=10, max_bytes=10 ** 6)
+    store.sessions["s"] = _history("a", "b", "c", "d")
+    cache.recent("s", 3, store.fetch("s"))
+    cache.append("s", "assistant", "e")
+    cache.append("s", "user", "f")
+    assert [c for _, c, _ in cache.recent("s", 3, store.fetch("s"))] == ["d", "e", "f"]
+    assert cache.stats()["bytes"] == 3 * (1 + _ROW_OVERHEAD)
+    assert store.reads == 1
+
+
+def test_append_to_unknown_session_is_ignored():
+    cache = ContextCache(turns=3, max_sessions=10, max_bytes=10 ** 6)
+    cache.append("s", "user", "hello")
+    assert cache.stats()["sessions"] == 0
+
+
+def test_lru_eviction_by_session_count(store):
+    cache = ContextCache(turns=3, max_sessions=2, max_bytes=10 ** 6)
+    for sid in ("a", "b"):
+        store.sessions[sid] = _history(sid)
+        cache.recent(sid, 1, store.fetch(sid))
+    cache.recent("a", 1, store.fetch("a"))  # "b" is now least recently used
+    store.sessions["c"] = _history("c")
+    cache.recent("c", 1, store.fetch("c"))
+
+    reads = store.reads
+    cache.recent("a", 1, store.fetch("a"))
+    assert store.reads == reads
+    cache.recent("b", 1, store.fetch("b"))
+    assert store.reads == reads + 1
+    assert cache.stats()["evictions"] == 2
+
+
+def test_lru_eviction_by_bytes(store):
+    size = 100 + _ROW_OVERHEAD
+    cache = ContextCache(turns=3, max_sessions=10, max_bytes=2 * size)
+    for sid in ("a", "b"):
+        store.sessions[sid] = _history("x" * 100)
+        cache.recent(sid, 1, store.fetch(sid))
+    assert cache.stats()["bytes"] == 2 * size
+
+    cache.append("b", "assistant", "y" * 100)
+    stats = cache.stats()
+    assert (stats["sessions"], stats["bytes"], stats["evictions"]) == (1, 2 * size, 1)
+
+    # a session larger than the budget on its own is not kept
+    cache.append("b", "user", "z")
+    assert cache.stats()["sessions"] == 0
+    assert cache.stats()["bytes"] == 0
+
+
+def test_fill_racing_a_save_is_not_installed(store):
+    cache = ContextCache(turns=3, max_sessions=10, max_bytes=10 ** 6)
+    store.sessions["s"] = _history("a")
+
+    def fetch(n):
+        # the read returns, then a message is saved before the fill lands
+        rows = store.fetch("s")(n)
+        store.sessions["s"] = _history("a", "b")
+        cache.append("s", "user", "b")
+        return rows
+
+    assert [c for _, c, _ in cache.recent("s", 3, fetch)] == ["a"]
+    assert cache.stats()["stale_fills"] == 1
+    assert cache.stats()["sessions"] == 0
+    # the next read fills from the store again and sees the saved message
+    assert [c for _, c, _ in cache.recent("s", 3, store.fetch("s"))] == ["a", "b"]
+
+
+def test_failed_fill_is_abandoned(store):
+    cache = ContextCache(turns=3, max_sessions=10, max_bytes=10 ** 6)
+
+    def fetch(n):
+        raise ConnectionError("store down")
+
+    with pytest.raises(ConnectionError):
+        cache.recent("s", 3, fetch)
+    cache.append("s", "user", "a")
+    store.sessions["s"] = _history("a")
+    assert len(cache.recent("s", 3, store.fetch("s"))) == 1
+    assert cache.stats()["stale_fills"] == 0
+
+
+def test_arecent(store):
+    cache = ContextCache(turns=3, max_sessions=10, max_bytes=10 ** 6)
+    store.sessions["s"] = _history("a", "b")
+
+    async def fetch(n):
+        return store.fetch("s")(n)
+
+    assert [c for _, c, _ in asyncio.run(cache.arecent("s", 1, fetch))] == ["b"]
+    assert [c for _, c, _ in asyncio.run(cache.arecent("s", 2, fetch))] == ["a", "b"]
+    assert store.reads == 1
+
+
+def test_disabled_cache_always_reads(store):
+    cache = ContextCache(turns=3, max_sessions=10, max_bytes=10 ** 6, enabled=False)
+    store.sessions["s"] = _history("a")
+    cache.recent("s", 1, store.fetch("s"))
+    cache.recent("s", 1, store.fetch("s"))
+    assert store.reads == 2
@@ -0,0 +1,136 @@
+import asyncio
+import json
+
+import pytest
+
+from app.db.cost_gate import CostGate, plan_estimate
+
+
+def _plan(cost, rows):
+    return json.dumps([{"Plan": {"Node Type": "Seq Scan", "Total Cost": cost, "Plan Rows": rows}}])
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, params=None):
+        self.conn.executed.append((sql, params))
+        if isinstance(self.conn.plan, Exception):
+            raise self.conn.plan
+
+    def fetchone(self):
+        return (self.conn.plan,)
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, plan):
+        self.plan = plan
+        self.executed = []
+        self.rolled_back = False
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        self.rolled_back = True
+
+
+class FakeAsyncConnection:
+    def __init__(self, plan):
+        self.plan = plan
+
+    async def fetchval(self, sql, *params):
+        if isinstance(self.plan, Exception):
+            raise self.plan
+        return self.plan
+
+
+@pytest.fixture
+def gate():
+    return CostGate(max_cost=1_000_000, max_rows=50_000, stream_rows=10_000)
+
+
+def test_plan_estimate():
+    assert plan_estimate(_plan(1234.5, 42)) == (1234.5, 42)
+    assert plan_estimate(json.loads(_plan(10, 1))) == (10.0, 1)
+    assert plan_estimate([]) == (None, None)
+    assert plan_estimate([{"Plan": {}}]) == (None, None)
+
+
+def test_allow(gate):
+    conn = FakeConnection(_plan(500.0, 120))
+    plan = gate.check(conn, "SELECT * FROM t WHERE a = $1;", ["x"], row_cap=500)
+    assert (plan.action, plan.cost, plan.rows, plan.row_cap) == ("allow", 500.0, 120, 500)
+    assert conn.executed == [("EXPLAIN (FORMAT JSON) SELECT * FROM t WHERE a = %(p1)s", {"p1": "x"})]
+
+
+def test_reject(gate):
+    plan = gate.check(FakeConnection(_plan(2_500_000.0, 900_000)), "SELECT * FROM t")
+    assert plan.action == "reject"
+    assert "2,500,000" in plan.message and "900,000" in plan.message
+    assert plan.hint
+
+
+def test_cap_only_without_a_row_cap(gate):
+    plan = gate.check(FakeConnection(_plan(9000.0, 80_000)), "SELECT * FROM t", streaming=True)
+    assert (plan.action, plan.row_cap) == ("cap", 50_000)
+    # a statement already capped at MAX_ROWS is left alone
+    plan = gate.check(FakeConnection(_plan(9000.0, 80_000)), "SELECT * FROM t", row_cap=500)
+    assert (plan.action, plan.row_cap) == ("allow", 500)
+
+
+def test_stream(gate):
+    plan = gate.decide(9000.0, 20_000, None)
+    assert (plan.action, plan.row_cap) == ("stream", None)
+    # capped, then more rows than the stream threshold are still expected
+    assert gate.decide(9000.0, 80_000, None).action == "stream"
+    # streaming callers already send rows as they arrive
+    assert gate.decide(9000.0, 20_000, None, streaming=True).action == "allow"
+    # the row cap bounds what would be built in memory
+    assert gate.decide(9000.0, 20_000, 500).action == "allow"
+
+
+def test_zero_disables_a_rule():
+    gate = CostGate(max_cost=0, max_rows=0, stream_rows=0)
+    plan = gate.decide(1e12, 10 ** 9, None)
+    assert (plan.action, plan.row_cap) == ("allow", None)
+
+
+def test_disabled_gate_does_not_explain():
+    gate = CostGate(max_cost=1, max_rows=1, stream_rows=1, enabled=False)
+    conn = FakeConnection(_plan(1e9, 10 ** 9))
+    assert gate.check(conn, "SELECT * FROM t", row_cap=500).action == "allow"
+    assert conn.executed == []
+    assert gate.stats()["checked"] == 0
+
+
+def test_explain_failure_allows(gate):
+    conn = FakeConnection(RuntimeError("relation does not exist"))
+    plan = gate.check(conn, "SELECT * FROM missing", row_cap=500)
+    assert (plan.action, plan.cost, plan.row_cap) == ("allow", None, 500)
+    assert conn.rolled_back
+
+    plan = asyncio.run(gate.acheck(FakeAsyncConnection(RuntimeError("boom")), "SELECT 1"))
+    assert (plan.action, plan.cost) == ("allow", None)
+
+
+def test_acheck(gate):
+    plan = asyncio.run(gate.acheck(FakeAsyncConnection(_plan(2e6, 10)), "SELECT 1"))
+    assert plan.action == "reject"
+
+
+def test_counters(gate):
+    gate.decide(10.0, 5, 500)
+    gate.decide(2e6, 5, 500)
+    gate.decide(10.0, 80_000, None, streaming=True)
+    gate.decide(10.0, 20_000, None)
+    gate.decide(None, None, 500)
+    stats = gate.stats()
+    assert {k: stats[k] for k in ("checked", "allowed", "rejected", "capped", "streamed", "unplanned")} == {
+        "checked": 5, "allowed": 1, "rejected": 1, "capped": 1, "streamed": 1, "unplanned": 1,
+    }
+    assert stats["reject_rate"] == 0.25
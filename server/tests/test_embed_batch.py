@@ -0,0 +1,136 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+
+from app.llm import base
+from app.llm.base import BaseLLM, RateLimitError, parse_retry_after
+
+
+class StubLLM(BaseLLM):
+    """Embeds a text as [len(text)]; `failures` maps a text to errors raised before it succeeds."""
+
+    MAX_EMBED_BATCH = 3
+    MAX_EMBED_BATCH_CHARS = 10
+
+    def __init__(self, failures=None, delay=0.0):
+        self.failures = failures or {}
+        self.delay = delay
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def chat(self, messages, temperature=0):
+        raise NotImplementedError
+
+    def embed(self, text):
+        return [float(len(text))]
+
+    async def _aembed_chunk(self, texts):
+        self.calls.append(list(texts))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            for text in texts:
+                errors = self.failures.get(text)
+                if errors:
+                    raise errors.pop(0)
+            return [self.embed(text) for text in texts]
+        finally:
+            self.in_flight -= 1
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+
+    async def sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(base.asyncio, "sleep", sleep)
+    monkeypatch.setattr(base.random, "random", lambda: 0.0)
+    return delays
+
+
+def _chunks(llm, texts, batch_size):
+    return list(llm._chunks(texts, batch_size))
+
+
+def test_chunks_by_count():
+    llm = StubLLM()
+    assert _chunks(llm, ["a"] * 7, batch_size=100) == [[0, 1, 2], [3, 4, 5], [6]]
+    assert _chunks(llm, ["a"] * 3, batch_size=2) == [[0, 1], [2]]
+    assert _chunks(llm, ["a"] * 2, batch_size=0) == [[0], [1]]
+    assert _chunks(llm, [], batch_size=10) == []
+
+
+def test_chunks_by_characters():
+    llm = StubLLM()
+    assert _chunks(llm, ["aaaa", "bbbb", "cccc", "d"], batch_size=10) == [[0, 1], [2, 3]]
+    # a single text over the budget still gets a chunk of its own
+    assert _chunks(llm, ["x" * 25, "y"], batch_size=10) == [[0], [1]]
+
+
+def test_vectors_come_back_in_input_order():
+    texts = ["a" * n for n in range(1, 9)]
+    llm = StubLLM(delay=0.01)
+    vectors = asyncio.run(llm.aembed_batch(texts, batch_size=2, concurrency=4, max_retries=0))
+    assert vectors == [[float(n)] for n in range(1, 9)]
+    # pairs while they fit in MAX_EMBED_BATCH_CHARS, then one text per chunk
+    assert [len(chunk) for chunk in llm.calls] == [2, 2, 1, 1, 1, 1]
+
+
+def test_concurrency_limit():
+    llm = StubLLM(delay=0.01)
+    asyncio.run(llm.aembed_batch(["a"] * 12, batch_size=1, concurrency=3, max_retries=0))
+    assert llm.max_in_flight == 3
+
+
+def test_failed_chunks_are_retried_with_backoff(sleeps):
+    llm = StubLLM(failures={"bb": [ConnectionError("reset"), ConnectionError("reset")]})
+    vectors = asyncio.run(llm.aembed_batch(["a", "bb", "ccc", "dddd"], batch_size=2, concurrency=1, max_retries=3))
+    assert vectors == [[1.0], [2.0], [3.0], [4.0]]
+    assert llm.calls == [["a", "bb"], ["a", "bb"], ["a", "bb"], ["ccc", "dddd"]]
+    assert sleeps == [0.5, 1.0]
+
+
+def test_retry_after_hint_is_honoured(sleeps):
+    llm = StubLLM(failures={"a": [RateLimitError("slow down", retry_after=7.0)]})
+    asyncio.run(llm.aembed_batch(["a"], max_retries=1))
+    assert sleeps == [7.0]
+
+
+def test_gives_up_after_max_retries(sleeps):
+    llm = StubLLM(failures={"a": [ConnectionError("down")] * 3})
+    with pytest.raises(ConnectionError):
+        asyncio.run(llm.aembed_batch(["a"], max_retries=2))
+    assert len(llm.calls) == 3
+
+
+def test_other_errors_are_not_retried(sleeps):
+    llm = StubLLM(failures={"a": [ValueError("bad input")]})
+    with pytest.raises(ValueError):
+        asyncio.run(llm.aembed_batch(["a"], max_retries=3))
+    assert sleeps == []
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("5", 5.0),
+    ("0.5", 0.5),
+    ("-3", 0.0),
+    (None, None),
+    ("", None),
+    ("soon", None),
+    ("nan", None),
+    ("Wed, 21 Oct 2015 07:28:00 GMT", 0.0),
+])
+def test_parse_retry_after(value, expected):
+    assert parse_retry_after(value) == expected
+
+
+def test_parse_retry_after_http_date():
+    when = datetime.now(timezone.utc) + timedelta(seconds=120)
+    assert 100 < parse_retry_after(format_datetime(when, usegmt=True)) <= 120
@@ -0,0 +1,54 @@
+import numpy as np
+
+from app.schema.embedding_cache import EmbeddingCache
+
+
+def test_lookup_by_normalized_text():
+    cache = EmbeddingCache(max_entries=10)
+    cache.put("Show budget by State?", [1.0, 2.0])
+    vector = cache.get("show  budget by state")
+    assert vector.dtype == np.float32
+    assert vector.tolist() == [1.0, 2.0]
+
+
+def test_lru_eviction():
+    cache = EmbeddingCache(max_entries=2)
+    cache.put("a", [1.0])
+    cache.put("b", [2.0])
+    cache.get("a")
+    cache.put("c", [3.0])
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_vectors_are_keyed_by_model(monkeypatch):
+    from app.config.settings import settings
+
+    cache = EmbeddingCache(max_entries=10)
+    monkeypatch.setattr(settings, "LLM_PROVIDER", "openai")
+    cache.put("question", [1.0])
+    monkeypatch.setattr(settings, "LLM_PROVIDER", "gemini")
+    assert cache.get("question") is None
+
+
+def test_persisted_and_reloaded(tmp_path):
+    path = tmp_path / "embeddings.pkl"
+    cache = EmbeddingCache(max_entries=10, path=path, save_every=1000)
+    cache.put("question", [0.5, 0.25])
+    cache.save()
+
+    reloaded = EmbeddingCache(max_entries=10, path=path)
+    assert reloaded.get("question").tolist() == [0.5, 0.25]
+
+
+def test_reload_keeps_only_max_entries(tmp_path):
+    path = tmp_path / "embeddings.pkl"
+    cache = EmbeddingCache(max_entries=10, path=path)
+    for i in range(5):
+        cache.put(f"q{i}", [float(i)])
+    cache.save()
+
+    reloaded = EmbeddingCache(max_entries=2, path=path)
+    assert reloaded.get("q4") is not None
+    assert reloaded.get("q0") is None
@@ -0,0 +1,169 @@
+import asyncio
+import contextlib
+import json
+
+import pytest
+
+from app.config.settings import settings
+from app.db import executor
+from app.db.cost_gate import CostGate
+from app.db.executor import wants_all
+from app.db.statements import statement_registry
+
+
+@pytest.mark.parametrize("question", [
+    "show all projects in Odisha",
+    "list  all states",
+    "give me the full list of districts",
+    "Everything about CSR spend in 2023-24",
+    "entire table please",
+])
+def test_wants_all(question):
+    assert wants_all(question)
+
+
+@pytest.mark.parametrize("question", [
+    "How many completed projects by state",
+    "total budget for the fully funded projects",
+    "overall spend for small projects",
+    "",
+    None,
+])
+def test_wants_all_needs_whole_words(question):
+    assert not wants_all(question)
+
+
+# ============================================================
+# Row cap and truncation
+# ============================================================
+
+def _plan(rows):
+    return json.dumps([{"Plan": {"Total Cost": 100.0, "Plan Rows": rows}}])
+
+
+class StubCursor:
+    """psycopg2 cursor over canned rows; unnamed cursors answer EXPLAIN."""
+
+    def __init__(self, conn, name=None):
+        self.conn = conn
+        self.name = name
+        self.description = None
+        self._rows = []
+
+    def execute(self, sql, params=None):
+        self.conn.executed.append(sql)
+        if sql.startswith("EXPLAIN"):
+            self._rows = [(_plan(self.conn.estimate),)]
+        else:
+            self._rows = list(self.conn.rows)
+            self.description = [("id",), ("name",)]
+
+    def fetchone(self):
+        return self._rows.pop(0)
+
+    def fetchmany(self, size):
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+    def close(self):
+        pass
+
+
+class StubConnection:
+    def __init__(self, rows, estimate):
+        self.rows = rows
+        self.estimate = estimate
+        self.executed = []
+
+    def cursor(self, name=None):
+        return StubCursor(self, name)
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class StubAsyncConnection:
+    def __init__(self, rows, estimate):
+        self.rows = rows
+        self.estimate = estimate
+        self.executed = []
+
+    async def fetch(self, sql, *args):
+        self.executed.append(sql)
+        return self.rows
+
+    async def fetchval(self, sql, *args):
+        self.executed.append(sql)
+        return _plan(self.estimate)
+
+
+@pytest.fixture
+def stub_db(monkeypatch):
+    monkeypatch.setattr(settings, "MAX_ROWS", 3)
+    monkeypatch.setattr(settings, "RESULT_CACHE_ENABLED", False)
+    monkeypatch.setattr(executor, "cost_gate", CostGate(max_cost=0, max_rows=0, stream_rows=0))
+
+    def install(rows, estimate=1234):
+        sync_conn = StubConnection(rows, estimate)
+        async_conn = StubAsyncConnection(rows, estimate)
+
+        @contextlib.asynccontextmanager
+        async def acquire(pool):
+            yield async_conn
+
+        async def aprepare(conn, sql, params=()):
+            return sql, tuple(params), statement_registry.shape(sql)
+
+        async def acolumns(conn, statement, entry, records):
+            return ["id", "name"]
+
+        monkeypatch.setattr(executor, "get_connection", lambda pool: sync_conn)
+        monkeypatch.setattr(executor, "acquire", acquire)
+        monkeypatch.setattr(executor, "aprepare", aprepare)
+        monkeypatch.setattr(executor, "acolumns", acolumns)
+        return sync_conn, async_conn
+
+    return install
+
+
+def _rows(n):
+    return [(i, f"project {i}") for i in range(n)]
+
+
+def test_execute_fetches_one_extra_row_to_detect_truncation(stub_db):
+    _, conn = stub_db(_rows(settings.MAX_ROWS + 1))
+    df = asyncio.run(executor.aexecute_sql("SELECT id, name FROM projects", "projects in Odisha"))
+    assert conn.executed[-1].endswith(f"LIMIT {settings.MAX_ROWS + 1}")
+    assert len(df) == settings.MAX_ROWS
+    assert df.attrs["truncated"] is True
+    assert df.attrs["total_rows_estimate"] == 1234
+
+
+def test_execute_exactly_max_rows_is_not_truncated(stub_db):
+    stub_db(_rows(settings.MAX_ROWS))
+    df = asyncio.run(executor.aexecute_sql("SELECT id, name FROM projects", "projects in Odisha"))
+    assert len(df) == settings.MAX_ROWS
+    assert df.attrs["truncated"] is False
+    assert df.attrs["total_rows_estimate"] == settings.MAX_ROWS
+
+
+def test_execute_all_data_is_not_capped(stub_db):
+    _, conn = stub_db(_rows(10))
+    df = asyncio.run(executor.aexecute_sql("SELECT id, name FROM projects", "show all projects"))
+    assert "LIMIT" not in conn.executed[-1]
+    assert len(df) == 10
+    assert df.attrs["truncated"] is False
+
+
+def test_stream_sql_truncation(stub_db):
+    conn, _ = stub_db(_rows(settings.MAX_ROWS + 1))
+    info = {}
+    batches = list(executor.stream_sql("SELECT id, name FROM projects", "projects", batch_size=2, info=info))
+    assert [len(rows) for _, rows in batches] == [2, 1]
+    assert batches[0][0] == ["id", "name"]
+    assert any(sql.endswith(f"LIMIT {settings.MAX_ROWS + 1}") for sql in conn.executed)
+    assert info["truncated"] is True
+    assert info["total_rows_estimate"] == 1234
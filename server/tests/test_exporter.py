@@ -0,0 +1,20 @@
+import os
+
+from app.export.exporter import ExportManager
+
+EID = "0123456789abcdef0123456789abcdef"
+
+
+def test_reap_only_touches_export_artifacts(tmp_path):
+    manager = ExportManager(tmp_path, workers=1, max_age=60)
+    names = [f"{EID}.csv", f"{EID}.xlsx.part", "notes.csv", ".gitkeep", f"{EID}.txt"]
+    for name in names:
+        path = tmp_path / name
+        path.write_text("x")
+        os.utime(path, (0, 0))
+    try:
+        assert manager.reap(force=True) == 2
+        assert sorted(p.name for p in tmp_path.iterdir()) == [".gitkeep", f"{EID}.txt", "notes.csv"]
+        assert manager.stats()["files"] == 0
+    finally:
+        manager.shutdown()
@@ -0,0 +1,123 @@
+import threading
+
+import pytest
+
+from app.memory.history_writer import HistoryWriter
+
+SESSION = "7c0d5c1e-8f3a-4d7e-9a55-0d7f0d8b6f10"
+
+
+class FakeStore:
+    """Committed rows per session; `gate` holds writes back until it is set."""
+
+    def __init__(self):
+        self.rows = []
+        self.gate = threading.Event()
+        self.gate.set()
+        self.writing = threading.Event()
+
+    def write(self, messages):
+        self.writing.set()
+        self.gate.wait(5)
+        self.rows.extend(messages)
+
+    def fetch(self, session_id):
+        return [(role, content, created_at) for sid, role, content, created_at in self.rows if sid == session_id]
+
+
+@pytest.fixture
+def store():
+    return FakeStore()
+
+
+@pytest.fixture
+def writer(store):
+    writer = HistoryWriter(batch_size=100, flush_interval=60, write=store.write)
+    yield writer
+    store.gate.set()
+    writer.close(timeout=5)
+
+
+def _contents(rows, pending):
+    return [content for _, content, _ in list(rows) + pending]
+
+
+def test_queued_message_is_read_back(writer, store):
+    writer.enqueue(SESSION, "user", "hello")
+    rows, pending = writer.read(SESSION, lambda: store.fetch(SESSION))
+    assert rows == []
+    assert [(role, content) for role, content, _ in pending] == [("user", "hello")]
+
+
+def test_written_message_leaves_pending(writer, store):
+    writer.enqueue(SESSION, "user", "hello")
+    assert writer.flush(timeout=5)
+    rows, pending = writer.read(SESSION, lambda: store.fetch(SESSION))
+    assert _contents(rows, pending) == ["hello"]
+    assert pending == []
+
+
+def test_pending_and_written_rows_share_created_at(writer, store):
+    writer.enqueue(SESSION, "user", "hello")
+    _, pending = writer.read(SESSION, lambda: store.fetch(SESSION))
+    writer.flush(timeout=5)
+    assert store.rows[0][3] == pending[0][2]
+
+
+def test_read_during_commit_sees_message_once(writer, store):
+    store.gate.clear()
+    writer.enqueue(SESSION, "user", "hello")
+    flusher = threading.Thread(target=writer.flush, args=(5,))
+    flusher.start()
+    assert store.writing.wait(5)
+
+    threading.Timer(0.1, store.gate.set).start()
+    rows, pending = writer.read(SESSION, lambda: store.fetch(SESSION))
+    flusher.join(5)
+    assert _contents(rows, pending) == ["hello"]
+
+
+def test_other_sessions_are_not_blocked_by_a_commit(writer, store):
+    other = "0b7b6a4e-52d4-4a8e-8d47-5a0c6b1f2e33"
+    store.gate.clear()
+    writer.enqueue(SESSION, "user", "hello")
+    threading.Thread(target=writer.flush, args=(5,)).start()
+    assert store.writing.wait(5)
+    writer.enqueue(other, "user", "hi")
+    rows, pending = writer.read(other, lambda: store.fetch(other))
+    assert _contents(rows, pending) == ["hi"]
+
+
+def test_full_queue_drops(store):
+    writer = HistoryWriter(flush_interval=60, max_pending=2, write=store.write)
+    assert writer.enqueue(SESSION, "user", "a")
+    assert writer.enqueue(SESSION, "user", "b")
+    assert not writer.enqueue(SESSION, "user", "c")
+    assert writer.stats()["dropped"] == 1
+    writer.close(timeout=5)
+
+
+def test_close_drains_the_queue(store):
+    writer = HistoryWriter(flush_interval=60, write=store.write)
+    for i in range(5):
+        writer.enqueue(SESSION, "user", str(i))
+    writer.close(timeout=5)
+    assert [content for _, _, content, _ in store.rows] == ["0", "1", "2", "3", "4"]
+    assert not writer.enqueue(SESSION, "user", "late")
+
+
+def test_failed_batch_is_retried(store):
+    failures = []
+
+    def flaky(messages):
+        if not failures:
+            failures.append(1)
+            raise RuntimeError("database went away")
+        store.write(messages)
+
+    writer = HistoryWriter(flush_interval=60, write=flaky)
+    writer.enqueue(SESSION, "user", "hello")
+    assert writer.flush(timeout=5)
+    assert len(store.rows) == 1
+    assert writer.stats()["failures"] == 1
+    writer.close(timeout=5)
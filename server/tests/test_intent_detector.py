@@ -0,0 +1,65 @@
+import pytest
+
+from app.llm import intent_detector
+from app.llm.intent_detector import _keyword_intent, classify_intent
+
+
+@pytest.fixture(autouse=True)
+def no_model(monkeypatch):
+    # keyword and short-message rules only; a trained model file would change the results
+    monkeypatch.setattr(intent_detector, "get_intent_model", lambda: None)
+
+
+@pytest.mark.parametrize("message", ["hi", "Hello there!", "thank you", "good morning", "who are you"])
+def test_greetings(message):
+    assert _keyword_intent(message) == "conversation"
+
+
+@pytest.mark.parametrize("message", [
+    "show total budget by state",
+    "list all projects",
+    "how many records are there",
+    "which states have the most customers",
+])
+def test_database_keywords(message):
+    assert _keyword_intent(message) == "database"
+
+
+@pytest.mark.parametrize("message", ["his budget", "which budget", "this expenditure", "they"])
+def test_greeting_words_inside_other_words(message):
+    # "hi" must not match "his", "which" or "this", nor "hey" "they"
+    assert _keyword_intent(message) != "conversation"
+
+
+def test_only_db_keywords_are_pluralized():
+    assert _keyword_intent("states") == "database"
+    assert _keyword_intent("his") is None
+
+
+def test_db_keyword_beats_greeting():
+    assert _keyword_intent("hi, show sales by state") == "database"
+
+
+def test_keyword_hit_decides_alone():
+    assert classify_intent("show budget") == ("database", 1.0, "keyword")
+
+
+def test_short_message_without_keywords_is_conversation():
+    intent, _, source = classify_intent("his budget")
+    assert (intent, source) == ("conversation", "short")
+
+
+def test_ambiguous_message_goes_to_llm():
+    intent, _, _ = classify_intent("what was spent on education in the northern districts this year")
+    assert intent is None
+
+
+def test_confident_model_decides(monkeypatch):
+    class Model:
+        def predict(self, message):
+            return 0.95
+
+    monkeypatch.setattr(intent_detector, "get_intent_model", lambda: Model())
+    intent, confidence, source = classify_intent("what was spent on education in the northern districts")
+    assert (intent, source) == ("database", "model")
+    assert confidence == pytest.approx(0.95)
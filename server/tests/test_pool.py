@@ -0,0 +1,165 @@
+import itertools
+
+import pytest
+from psycopg2 import extensions
+
+from app.db import pool as pool_module
+from app.db.pool import ConnectionPool
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql):
+        self.conn.pings += 1
+        if not self.conn.healthy:
+            raise RuntimeError("server closed the connection unexpectedly")
+
+    def fetchone(self):
+        return (1,)
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    ids = itertools.count(1)
+
+    def __init__(self):
+        self.id = next(self.ids)
+        self.closed = 0
+        self.healthy = True
+        self.pings = 0
+        self.rollbacks = 0
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+
+    def get_transaction_status(self):
+        return self.status
+
+    def close(self):
+        self.closed = 1
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(pool_module, "time", clock)
+    return clock
+
+
+def _pool(monkeypatch, **kwargs):
+    pool = ConnectionPool("test", {}, **kwargs)
+    opened = []
+
+    def connect():
+        conn = FakeConnection()
+        opened.append(conn)
+        return conn, pool_module.time.monotonic()
+
+    monkeypatch.setattr(pool, "_connect", connect)
+    return pool, opened
+
+
+def test_reuses_returned_connections(monkeypatch):
+    pool, opened = _pool(monkeypatch, minconn=1, maxconn=2)
+    pool.warm()
+    first = pool.getconn()
+    raw = first.raw
+    first.close()
+    first.close()  # second close is a no-op
+    assert pool.getconn().raw is raw
+    assert len(opened) == 1
+    assert pool.stats()["checkouts"] == 2
+
+
+def test_checkout_timeout(monkeypatch):
+    pool, _ = _pool(monkeypatch, maxconn=1, timeout=0.05)
+    held = pool.getconn()
+    with pytest.raises(ConnectionError):
+        pool.getconn()
+    assert pool.stats()["timeouts"] == 1
+    held.close()
+    assert pool.getconn() is not None
+
+
+def test_recycle_by_age(monkeypatch, clock):
+    pool, opened = _pool(monkeypatch, recycle=60.0, healthcheck_interval=1e9)
+    pool.getconn().close()
+    clock.now += 61
+    conn = pool.getconn()
+    assert conn.raw is opened[1]
+    assert opened[0].closed
+    assert pool.stats()["discarded"] == 1
+    assert pool.stats()["open"] == 1
+
+
+def test_health_check_after_idle(monkeypatch, clock):
+    pool, opened = _pool(monkeypatch, healthcheck_interval=30.0)
+    pool.getconn().close()
+    clock.now += 5
+    pool.getconn().close()
+    assert opened[0].pings == 0
+
+    clock.now += 31
+    pool.getconn().close()
+    assert opened[0].pings == 1
+
+    clock.now += 31
+    opened[0].healthy = False
+    conn = pool.getconn()
+    assert conn.raw is opened[1]
+    assert opened[0].closed
+    assert pool.stats()["failed_health_checks"] == 1
+
+
+def test_putconn_rolls_back_open_transaction(monkeypatch):
+    pool, opened = _pool(monkeypatch)
+    conn = pool.getconn()
+    opened[0].status = extensions.TRANSACTION_STATUS_INTRANS
+    conn.close()
+    assert opened[0].rollbacks == 1
+    assert pool.getconn().raw is opened[0]
+
+
+def test_putconn_discards_failed_rollback_and_unknown_status(monkeypatch):
+    pool, opened = _pool(monkeypatch, maxconn=2)
+    first, second = pool.getconn(), pool.getconn()
+
+    def broken_rollback():
+        raise RuntimeError("connection lost")
+
+    opened[0].status = extensions.TRANSACTION_STATUS_INERROR
+    opened[0].rollback = broken_rollback
+    opened[1].status = extensions.TRANSACTION_STATUS_UNKNOWN
+    first.close()
+    second.close()
+
+    assert opened[0].closed and opened[1].closed
+    assert pool.stats()["open"] == 0
+    assert pool.stats()["discarded"] == 2
+
+
+def test_closed_pool(monkeypatch):
+    pool, opened = _pool(monkeypatch)
+    conn = pool.getconn()
+    pool.closeall()
+    with pytest.raises(ConnectionError):
+        pool.getconn()
+    conn.close()
+    assert opened[0].closed
@@ -0,0 +1,96 @@
+import pandas as pd
+import pytest
+
+from app.db import result_cache as result_cache_module
+from app.db.result_cache import ResultCache, _parse_table_ttls
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(result_cache_module, "time", clock)
+    return clock
+
+
+def _frame(rows=3):
+    return pd.DataFrame({"state": [f"s{i}" for i in range(rows)], "amount": range(rows)})
+
+
+def test_key_ignores_case_whitespace_and_comments(clock):
+    cache = ResultCache(max_bytes=10_000_000, default_ttl=60)
+    cache.put("SELECT * FROM budgets", _frame())
+    assert cache.get("select *\n  from budgets -- again") is not None
+
+
+def test_params_are_part_of_the_key(clock):
+    cache = ResultCache(max_bytes=10_000_000, default_ttl=60)
+    cache.put("SELECT * FROM budgets WHERE state = $1", _frame(), params=("Odisha",))
+    assert cache.get("SELECT * FROM budgets WHERE state = $1", params=("Bihar",)) is None
+    assert cache.get("SELECT * FROM budgets WHERE state = $1", params=("Odisha",)) is not None
+
+
+def test_get_returns_a_copy(clock):
+    cache = ResultCache(max_bytes=10_000_000, default_ttl=60)
+    cache.put("SELECT * FROM budgets", _frame())
+    df = cache.get("SELECT * FROM budgets")
+    df.loc[0, "amount"] = 99
+    assert cache.get("SELECT * FROM budgets").loc[0, "amount"] == 0
+
+
+def test_expiry_uses_the_shortest_table_ttl(clock):
+    cache = ResultCache(max_bytes=10_000_000, default_ttl=300, table_ttls={"budgets": 10})
+    sql = "SELECT * FROM budgets b JOIN projects p ON p.project_id = b.project_id"
+    cache.put(sql, _frame())
+    clock.now += 9
+    assert cache.get(sql) is not None
+    clock.now += 2
+    assert cache.get(sql) is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_zero_ttl_is_not_cached(clock):
+    cache = ResultCache(max_bytes=10_000_000, default_ttl=60, table_ttls={"live": 0})
+    cache.put("SELECT * FROM live", _frame())
+    assert not cache.contains("SELECT * FROM live")
+
+
+def test_lru_eviction_by_bytes(clock):
+    size = int(_frame().memory_usage(index=True, deep=True).sum())
+    cache = ResultCache(max_bytes=size * 4 + 1, default_ttl=60)
+    for table in ("a", "b", "c", "d"):
+        cache.put(f"SELECT * FROM {table}", _frame())
+    cache.get("SELECT * FROM a")  # a is now the most recently used
+    cache.put("SELECT * FROM e", _frame())
+    assert cache.contains("SELECT * FROM a")
+    assert not cache.contains("SELECT * FROM b")
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] <= cache.max_bytes
+
+
+def test_large_result_is_skipped(clock):
+    cache = ResultCache(max_bytes=1_000, default_ttl=60)
+    cache.put("SELECT * FROM budgets", _frame(100))
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["skipped_too_large"] == 1
+
+
+def test_invalidate_tables(clock):
+    cache = ResultCache(max_bytes=10_000_000, default_ttl=60)
+    cache.put("SELECT * FROM budgets", _frame())
+    cache.put("SELECT * FROM budgets JOIN states USING (state_id)", _frame())
+    cache.put("SELECT * FROM projects", _frame())
+    assert cache.invalidate_tables(["public.States"]) == 1
+    assert cache.invalidate_tables(["budgets"]) == 1
+    assert cache.contains("SELECT * FROM projects")
+
+
+def test_parse_table_ttls():
+    assert _parse_table_ttls("budgets=60, Projects = 5,bad,x=y") == {"budgets": 60.0, "projects": 5.0}
@@ -0,0 +1,194 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app.schema import sync
+from app.schema.sync import build_content, content_hash, diff, load_snapshot, save_snapshot
+
+
+def _table(*columns, definition=None, type="table"):
+    return {
+        "type": type,
+        "description": None,
+        "definition": definition,
+        "columns": [{"name": c, "type": "text", "not_null": True, "comment": None, "notes": []} for c in columns],
+    }
+
+
+def _hash(name, obj):
+    return content_hash(build_content(name, obj), obj)
+
+
+# ============================================================
+# Hashing and diff
+# ============================================================
+
+def test_diff():
+    previous = {"states": "h1", "years": "h2", "old_table": "h3"}
+    current = {"states": "h1", "years": "h2*", "new_table": "h4"}
+    assert diff(current, previous) == (["new_table"], ["years"], ["old_table"])
+    assert diff(previous, previous) == ([], [], [])
+
+
+def test_column_change_alters_the_hash():
+    assert _hash("t", _table("a", "b")) == _hash("t", _table("a", "b"))
+    assert _hash("t", _table("a", "b")) != _hash("t", _table("a", "c"))
+
+
+def test_view_body_change_alters_the_hash():
+    before = _table("state_name", type="view", definition="SELECT state_name FROM states")
+    after = _table("state_name", type="view", definition="SELECT state_name FROM states WHERE active")
+    assert build_content("v", before) == build_content("v", after)
+    assert _hash("v", before) != _hash("v", after)
+
+
+# ============================================================
+# Snapshot file
+# ============================================================
+
+def test_snapshot_round_trip(tmp_path):
+    path = tmp_path / "schema_snapshot.json"
+    save_snapshot({"years": "h2", "states": "h1"}, "openai:small", path)
+    snapshot = load_snapshot(path)
+    assert snapshot["embed_model"] == "openai:small"
+    assert list(snapshot["objects"]) == ["states", "years"]
+    assert not (tmp_path / "schema_snapshot.json.tmp").exists()
+
+
+@pytest.mark.parametrize("content", ["", "not json", "[]", json.dumps({"version": 99, "objects": {}})])
+def test_unusable_snapshot_is_ignored(tmp_path, content):
+    path = tmp_path / "schema_snapshot.json"
+    path.write_text(content)
+    assert load_snapshot(path) == {}
+
+
+def test_missing_snapshot(tmp_path):
+    assert load_snapshot(tmp_path / "missing.json") == {}
+
+
+# ============================================================
+# sync_schema decisions
+# ============================================================
+
+OBJECTS = {
+    "states": _table("state_id", "state_name"),
+    "years": _table("year_id", "year_name"),
+    "csr_expenditure_view": _table("state_name", type="view", definition="SELECT state_name FROM states"),
+}
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self.rowcount = 0
+
+    def execute(self, sql, params=None):
+        self.db.executed.append((" ".join(sql.split()), params))
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self):
+        self.executed = []
+        self.committed = False
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.committed = True
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class StubLLM:
+    def __init__(self):
+        self.embedded = []
+
+    def embed_batch(self, texts):
+        self.embedded.extend(texts)
+        return [[0.5, 0.25] for _ in texts]
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    snapshot = tmp_path / "schema_snapshot.json"
+    conn = FakeConnection()
+    llm = StubLLM()
+    upserts = []
+
+    monkeypatch.setattr(sync, "get_connection", lambda pool: conn)
+    monkeypatch.setattr(sync, "introspect", lambda conn, schemas: {k: dict(v) for k, v in OBJECTS.items()})
+    monkeypatch.setattr(sync, "ensure_registry_table", lambda conn: None)
+    monkeypatch.setattr(sync, "get_llm", lambda: llm)
+    monkeypatch.setattr(sync, "embedding_model_key", lambda: "model-a")
+    monkeypatch.setattr(sync, "execute_values", lambda cur, sql, rows, **kw: upserts.extend(r[0] for r in rows))
+    monkeypatch.setattr(sync, "load_snapshot", lambda: load_snapshot(snapshot))
+    monkeypatch.setattr(sync, "save_snapshot", lambda hashes, model: save_snapshot(hashes, model, snapshot))
+
+    env = SimpleNamespace(
+        snapshot=snapshot, conn=conn, llm=llm, upserts=upserts, registry={},
+        hashes={name: _hash(name, obj) for name, obj in OBJECTS.items()},
+    )
+    monkeypatch.setattr(sync, "registry_hashes", lambda conn: dict(env.registry))
+    return env
+
+
+def _sync(**kwargs):
+    return sync.sync_schema(schemas=["public"], exclude=[], **kwargs)
+
+
+def test_unchanged_changed_and_dropped(env):
+    previous = dict(env.hashes, years="stale", dropped_table="h")
+    save_snapshot(previous, "model-a", env.snapshot)
+    summary = _sync()
+    assert (summary["changed"], summary["removed"], summary["unchanged"], summary["embedded"]) == (1, 1, 2, 1)
+    assert env.upserts == ["years"]
+    assert ("DELETE FROM semantic_schema_registry WHERE object_name = ANY(%s)", (["dropped_table"],)) in env.conn.executed
+    assert env.conn.committed
+    assert load_snapshot(env.snapshot)["objects"] == env.hashes
+
+    # a second run finds nothing to do
+    env.upserts.clear()
+    summary = _sync()
+    assert (summary["added"], summary["changed"], summary["removed"], summary["embedded"]) == (0, 0, 0, 0)
+    assert env.upserts == []
+
+
+def test_empty_snapshot_falls_back_to_registry_hashes(env):
+    env.snapshot.write_text("")
+    env.registry = dict(env.hashes, states="stale")
+    summary = _sync()
+    assert (summary["changed"], summary["unchanged"]) == (1, 2)
+    assert env.upserts == ["states"]
+
+
+def test_embed_model_change_reembeds_everything(env):
+    save_snapshot(env.hashes, "model-b", env.snapshot)
+    summary = _sync()
+    assert summary["embedded"] == len(OBJECTS)
+    assert sorted(env.upserts) == sorted(OBJECTS)
+    assert load_snapshot(env.snapshot)["embed_model"] == "model-a"
+
+
+def test_full_sync_removes_rows_missing_from_the_database(env):
+    save_snapshot(env.hashes, "model-a", env.snapshot)
+    env.registry = dict(env.hashes, dropped_table="h")
+    summary = _sync(full=True)
+    assert (summary["embedded"], summary["removed"]) == (len(OBJECTS), 1)
+
+
+def test_dry_run_writes_nothing(env):
+    save_snapshot(dict(env.hashes, years="stale"), "model-a", env.snapshot)
+    before = env.snapshot.read_text()
+    summary = _sync(dry_run=True)
+    assert summary["changed_names"] == ["years"]
+    assert env.upserts == [] and env.llm.embedded == []
+    assert env.snapshot.read_text() == before
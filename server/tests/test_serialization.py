@@ -0,0 +1,76 @@
+import datetime
+import decimal
+import uuid
+
+import numpy as np
+import orjson
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from app.utils.serialization import (
+    ARROW_STREAM, COLUMNAR_JSON, ROWS_JSON, arrow_ipc, columnar_data, dumps, negotiate, rows_data,
+)
+
+
+@pytest.mark.parametrize("accept, expected", [
+    (None, ROWS_JSON),
+    ("", ROWS_JSON),
+    ("text/html", ROWS_JSON),
+    (COLUMNAR_JSON, COLUMNAR_JSON),
+    (f"{ROWS_JSON};q=0.5, {ARROW_STREAM}", ARROW_STREAM),
+    (f"{ARROW_STREAM};q=0.2, {COLUMNAR_JSON};q=0.9", COLUMNAR_JSON),
+    (f"{COLUMNAR_JSON}, {ARROW_STREAM}", COLUMNAR_JSON),
+    (f"{ARROW_STREAM};q=0", ROWS_JSON),
+    (f"{ARROW_STREAM};q=abc", ROWS_JSON),
+])
+def test_negotiate(accept, expected):
+    assert negotiate(accept) == expected
+
+
+def _frame():
+    return pd.DataFrame({
+        "state": ["Odisha", None],
+        "amount": [decimal.Decimal("10.50"), decimal.Decimal("2")],
+        "count": np.array([1, 2], dtype="int64"),
+        "ratio": [0.5, np.nan],
+        "day": [datetime.date(2024, 4, 1), datetime.date(2024, 4, 2)],
+    })
+
+
+def test_dumps_database_and_pandas_types():
+    value = {
+        "d": decimal.Decimal("1.25"),
+        "t": pd.Timestamp("2024-01-02 03:04:05"),
+        "nat": pd.NaT,
+        "u": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+        "n": np.int64(3),
+    }
+    assert orjson.loads(dumps(value)) == {
+        "d": 1.25, "t": "2024-01-02T03:04:05", "nat": None,
+        "u": "12345678-1234-5678-1234-567812345678", "n": 3,
+    }
+
+
+def test_rows_and_columnar_carry_the_same_values():
+    df = _frame()
+    rows = orjson.loads(dumps(rows_data(df)))
+    columns = orjson.loads(dumps(columnar_data(df)))
+    assert rows[0] == {"state": "Odisha", "amount": 10.5, "count": 1, "ratio": 0.5, "day": "2024-04-01"}
+    assert rows[1]["state"] is None and rows[1]["ratio"] is None
+    assert columns == {column: [row[column] for row in rows] for column in df.columns}
+
+
+def test_arrow_ipc_round_trip():
+    df = pd.DataFrame({"state": ["Odisha", "Bihar"], "amount": [1.5, 2.5]})
+    body = arrow_ipc(df, {"answer": "ok", "truncated": False})
+    table = pa.ipc.open_stream(body).read_all()
+    assert table.column_names == ["state", "amount"]
+    assert table.column("amount").to_pylist() == [1.5, 2.5]
+    assert orjson.loads(table.schema.metadata[b"response"]) == {"answer": "ok", "truncated": False}
+
+
+def test_arrow_ipc_mixed_object_column_as_text():
+    df = pd.DataFrame({"value": [1, "two", None]})
+    table = pa.ipc.open_stream(arrow_ipc(df, {})).read_all()
+    assert table.column("value").to_pylist() == ["1", "two", None]
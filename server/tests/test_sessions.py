@@ -0,0 +1,111 @@
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.config.settings import settings
+from app.memory import chat_store, store_factory
+from app.memory.backends.base import TITLE_LENGTH
+from app.memory.backends.sqlite_store import SQLiteChatStore
+from app.memory.history_writer import HistoryWriter
+
+START = datetime(2025, 1, 1, 9, 0, 0)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = SQLiteChatStore(str(tmp_path / "chat_history.db"))
+    store.init()
+    monkeypatch.setattr(store_factory, "_store", store)
+    # queued messages stay pending until flush() is called
+    writer = HistoryWriter(flush_interval=60, write=store.write)
+    monkeypatch.setattr(chat_store, "history_writer", writer)
+    monkeypatch.setattr(settings, "CHAT_WRITE_BEHIND", True)
+    monkeypatch.setattr(settings, "SESSIONS_MAX_PAGE_SIZE", 200)
+    yield store
+    writer.close(timeout=5)
+    store.close()
+
+
+def _sid(n):
+    return str(uuid.UUID(int=n))
+
+
+def _write(store, session_id, minutes, role="user", content="question"):
+    store.write([(session_id, role, content, START + timedelta(minutes=minutes))])
+
+
+def _page_ids(page):
+    return [s["session_id"] for s in page["sessions"]]
+
+
+def test_sessions_upkeep_on_insert(store):
+    sid = _sid(1)
+    _write(store, sid, 5, "assistant", "hello")
+    long_question = "total   budget\nby state " + "x" * 200
+    store.write([
+        (sid, "user", long_question, START + timedelta(minutes=7)),
+        (sid, "user", "second question", START + timedelta(minutes=6)),
+    ])
+    _write(store, sid, 1, "user", "an earlier question written late")
+
+    [(session_id, started_at, last_activity, count, title)] = store.sessions(10)
+    assert session_id == sid
+    assert count == 4
+    # started_at is fixed by the first write; last_activity never moves back
+    assert started_at == START + timedelta(minutes=5)
+    assert last_activity == START + timedelta(minutes=7)
+    assert title.startswith("total budget by state x")
+    assert len(title) == TITLE_LENGTH and title.endswith("...")
+
+
+def test_keyset_paging_visits_every_session_once(store):
+    # sessions 3 and 4 share a last_activity; session_id breaks the tie
+    for n, minutes in [(1, 1), (2, 2), (3, 3), (4, 3), (5, 4)]:
+        _write(store, _sid(n), minutes)
+
+    seen, cursor = [], None
+    while True:
+        page = chat_store.get_sessions(limit=2, cursor=cursor)
+        seen.extend(_page_ids(page))
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == [_sid(5), _sid(4), _sid(3), _sid(2), _sid(1)]
+
+
+def test_exact_last_page_has_no_cursor(store):
+    for n in (1, 2):
+        _write(store, _sid(n), n)
+    page = chat_store.get_sessions(limit=2)
+    assert _page_ids(page) == [_sid(2), _sid(1)]
+    assert page["next_cursor"] is None
+
+
+def test_cursor_round_trip():
+    row = {"last_activity": START + timedelta(microseconds=1500), "session_id": _sid(7)}
+    cursor = chat_store._encode_cursor(row)
+    assert chat_store._decode_cursor(cursor) == (row["last_activity"], _sid(7))
+
+
+@pytest.mark.parametrize("cursor", ["nonsense", "2025-01-01T09:00:00_not-a-uuid", f"yesterday_{_sid(1)}"])
+def test_malformed_cursor(store, cursor):
+    with pytest.raises(ValueError):
+        chat_store.get_sessions(cursor=cursor)
+
+
+def test_queued_messages_show_on_the_first_page(store):
+    _write(store, _sid(1), 1)
+    _write(store, _sid(2), 2)
+    chat_store.save_message(_sid(1), "user", "follow-up")
+    chat_store.save_message(_sid(3), "user", "brand new session")
+
+    page = chat_store.get_sessions(limit=10)
+    assert _page_ids(page) == [_sid(3), _sid(1), _sid(2)]
+    counts = {s["session_id"]: s["message_count"] for s in page["sessions"]}
+    assert counts == {_sid(1): 2, _sid(2): 1, _sid(3): 1}
+    assert page["sessions"][0]["title"] == "brand new session"
+
+    # later pages skip sessions with queued messages, which were shown first
+    page = chat_store.get_sessions(limit=1)
+    assert _page_ids(chat_store.get_sessions(limit=10, cursor=page["next_cursor"])) == [_sid(2)]
@@ -0,0 +1,101 @@
+import pytest
+
+from app.security.row_limiter import apply_limit
+from app.security.sql_analyzer import analyze
+from app.security.sql_guard import validate_sql
+
+
+# -----------------------------
+# ANALYZER
+# -----------------------------
+
+def test_keywords_are_whole_tokens():
+    a = analyze("SELECT updated_at, is_deleted FROM orders WHERE note = 'drop-off'")
+    assert a.statement_type == "select"
+    assert a.tables == {"orders"}
+    assert a.statements == 1
+
+
+def test_cte_and_main_statement():
+    a = analyze("WITH t AS (SELECT 1 AS x) SELECT x FROM t JOIN states s ON true")
+    assert a.statement_type == "select"
+    assert list(a.cte_types) == ["select"]
+    assert a.tables == {"states"}
+
+
+def test_top_level_limit_only():
+    a = analyze("SELECT * FROM (SELECT * FROM t LIMIT 5) x LIMIT 20")
+    assert a.limit == 20
+    assert a.has_limit
+    assert analyze("SELECT * FROM (SELECT * FROM t LIMIT 5) x").limit is None
+
+
+def test_canonical_ignores_case_whitespace_and_comments():
+    a = analyze("select  *\nFROM t -- all rows\nWHERE name = 'Odisha'")
+    b = analyze("SELECT * FROM t WHERE name = 'Odisha'")
+    assert a.canonical == b.canonical
+    assert analyze("SELECT * FROM t WHERE name = 'odisha'").canonical != b.canonical
+
+
+def test_fingerprint_masks_literals():
+    a = analyze("SELECT * FROM t WHERE state = 'Odisha' LIMIT 10")
+    b = analyze("SELECT * FROM t WHERE state = 'Bihar' LIMIT 50")
+    assert a.fingerprint == b.fingerprint
+
+
+def test_unterminated_quote():
+    assert analyze("SELECT 'abc FROM t").unterminated
+
+
+# -----------------------------
+# GUARD
+# -----------------------------
+
+@pytest.mark.parametrize("sql", [
+    "SELECT * FROM projects",
+    "SELECT updated_at FROM t WHERE status = 'delete me'",
+    "WITH x AS (SELECT 1) SELECT * FROM x",
+    "VALUES (1), (2)",
+    "SELECT 1;",
+])
+def test_read_only_queries_pass(sql):
+    validate_sql(sql)
+
+
+@pytest.mark.parametrize("sql, message", [
+    ("DELETE FROM projects", "Forbidden SQL statement"),
+    ("SELECT 1; DROP TABLE projects", "Multiple SQL statements"),
+    ("WITH d AS (DELETE FROM t RETURNING *) SELECT * FROM d", "in WITH"),
+    ("SELECT * INTO backup FROM t", "INTO"),
+    ("SELECT * FROM t FOR UPDATE", "Row locking"),
+    ("SELECT pg_sleep(10)", "pg_sleep"),
+    ("SELECT 'abc", "Unterminated"),
+    ("  ", "Empty"),
+])
+def test_unsafe_queries_rejected(sql, message):
+    with pytest.raises(ValueError, match=message):
+        validate_sql(sql)
+
+
+# -----------------------------
+# ROW LIMITER
+# -----------------------------
+
+def test_limit_appended():
+    assert apply_limit("SELECT * FROM t;", 501) == "SELECT * FROM t\nLIMIT 501"
+
+
+def test_smaller_limit_kept():
+    assert apply_limit("SELECT * FROM t LIMIT 10", 501) == "SELECT * FROM t LIMIT 10"
+
+
+def test_larger_limit_wrapped():
+    sql = apply_limit("SELECT * FROM t LIMIT 5000", 501)
+    assert sql.startswith("SELECT * FROM (") and sql.endswith("LIMIT 501")
+    assert analyze(sql).limit == 501
+
+
+def test_offset_wrapped():
+    sql = apply_limit("SELECT * FROM t OFFSET 10", 50)
+    assert analyze(sql).limit == 50
+    assert "OFFSET 10" in sql
@@ -0,0 +1,86 @@
+import pytest
+
+from app.db.dimensions import DimensionIndex, dimension_cache
+from app.llm import sql_cache as sql_cache_module
+from app.llm.sql_cache import SemanticSQLCache, cache_scope
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(sql_cache_module, "time", clock)
+    return clock
+
+
+@pytest.fixture(autouse=True)
+def states(monkeypatch):
+    index = DimensionIndex({("states", "state_name"): ["Odisha", "Bihar"]})
+    monkeypatch.setattr(dimension_cache, "_index", index)
+
+
+@pytest.fixture
+def cache(clock):
+    return SemanticSQLCache(threshold=0.9, ttl=100, registry_check_interval=1e9)
+
+
+def test_exact_match_after_normalization(cache):
+    cache.store("Total budget?", "s", "SQL")
+    assert cache.lookup("total   BUDGET", "s") == "SQL"
+    assert cache.lookup("total budget", "other scope") is None
+
+
+def test_similar_question_hits(cache):
+    cache.store("budget of Odisha", "s", "SQL", [1.0, 0.0])
+    assert cache.lookup("what is the budget of Odisha", "s", [1.0, 0.1]) == "SQL"
+    assert cache.stats()["semantic_hits"] == 1
+
+
+def test_similar_question_with_another_state_misses(cache):
+    cache.store("budget of Odisha", "s", "SQL", [1.0, 0.0])
+    assert cache.lookup("budget of Bihar", "s", [1.0, 0.01]) is None
+
+
+def test_similar_question_with_another_number_misses(cache):
+    cache.store("top 5 projects by budget", "s", "SQL", [1.0, 0.0])
+    assert cache.lookup("top 10 projects by budget", "s", [1.0, 0.01]) is None
+
+
+def test_dissimilar_question_misses(cache):
+    cache.store("budget of Odisha", "s", "SQL", [1.0, 0.0])
+    assert cache.lookup("Odisha", "s", [0.0, 1.0]) is None
+
+
+def test_expired_nearest_falls_back_to_next_best(cache, clock):
+    cache.store("budget of Odisha", "s", "OLD", [1.0, 0.0])
+    clock.now += 60
+    cache.store("what is the budget for Odisha", "s", "NEW", [1.0, 0.3])
+    clock.now += 50  # OLD is 110s old, NEW 50s
+    assert cache.lookup("budget in Odisha", "s", [1.0, 0.0]) == "NEW"
+    assert cache.stats()["expirations"] == 1
+
+
+def test_lru_eviction(cache):
+    cache.max_entries = 2
+    cache.store("a", "s", "A")
+    cache.store("b", "s", "B")
+    cache.lookup("a", "s")
+    cache.store("c", "s", "C")
+    assert cache.lookup("b", "s") is None
+    assert cache.lookup("a", "s") == "A"
+
+
+def test_scope_depends_on_context_only_when_referenced():
+    context = [{"role": "user", "content": "budget of Odisha"}]
+    assert cache_scope("total budget", "schema", context) == cache_scope("total budget", "schema", None)
+    assert cache_scope("same for Bihar", "schema", context) != cache_scope("same for Bihar", "schema", [])
@@ -0,0 +1,62 @@
+import pytest
+
+from app.db.dimensions import DimensionIndex
+from app.llm.sql_templates import _match
+
+
+@pytest.fixture
+def index():
+    return DimensionIndex({
+        ("states", "state_name"): ["Odisha", "Bihar"],
+        ("csr_expenditure_view", "state_name"): ["Odisha", "Bihar"],
+        ("years", "year_name"): ["2023-24", "2024-25"],
+        ("csr_expenditure_view", "financial_year"): ["FY 2023-24"],
+        ("projects", "project_name"): ["Water", "Clean Village Drive"],
+    })
+
+
+def _params(question, index, context=None):
+    match = _match(question, index, context)
+    return match and (match.name, match.params)
+
+
+def test_breakdown_without_filters(index):
+    assert _params("total budget by state", index) == ("budget_by_state", ())
+
+
+def test_state_filter(index):
+    match = _match("total budget for Odisha", index)
+    assert (match.name, match.params) == ("total_budget", ("Odisha",))
+    assert "s.state_name = $1" in match.sql
+    assert "s.state_name = 'Odisha'" in match.rendered_sql
+
+
+def test_year_bound_as_spelled_in_the_filtered_column(index):
+    assert _params("total budget in 2023-2024", index) == ("total_budget", ("2023-24",))
+    assert _params("total expenditure in 2023-24", index) == ("total_expenditure", ("FY 2023-24",))
+
+
+def test_year_missing_from_the_filtered_column(index):
+    # 2024-25 is a year label but the view has no rows for it
+    assert _match("total expenditure in 2024-25", index) is None
+
+
+def test_one_word_project_needs_the_entity_word(index):
+    assert _params("budget of project Water", index) == ("project_budget", ("Water",))
+    assert _params("budget of Clean Village Drive", index) == ("project_budget", ("Clean Village Drive",))
+    assert _match("what is the budget for water supply", index) is None
+
+
+@pytest.mark.parametrize("question", [
+    "total budget for Odisha and Bihar",
+    "top 5 states by budget",
+    "average budget by state",
+    "budget by district",
+])
+def test_unsupported_questions_go_to_the_llm(index, question):
+    assert _match(question, index) is None
+
+
+def test_reference_to_earlier_turns(index):
+    context = [{"role": "user", "content": "total budget for Odisha"}]
+    assert _match("same for this state", index, context) is None
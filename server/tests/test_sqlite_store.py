@@ -0,0 +1,115 @@
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+
+import pytest
+
+from app.config.settings import settings
+from app.memory import chat_store, store_factory
+from app.memory.backends.sqlite_store import SQLiteChatStore
+from app.memory.history_writer import HistoryWriter
+
+SESSION = str(uuid.UUID(int=1))
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLiteChatStore(str(tmp_path / "chat" / "chat_history.db"))
+    store.init()
+    yield store
+    store.close()
+
+
+def test_init_creates_the_file_in_wal_mode(store):
+    assert store.path.exists()
+    assert store._reader().execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert store._write_conn().execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+
+
+def test_readers_do_not_wait_for_the_writer(store):
+    store.write([(SESSION, "user", "first", datetime(2025, 1, 1))])
+    writer = store._write_conn()
+    writer.execute("BEGIN IMMEDIATE")
+    writer.execute("INSERT INTO chat_history (session_id, role, content) VALUES (?, 'user', 'uncommitted')", (SESSION,))
+    try:
+        result = []
+        reader = threading.Thread(target=lambda: result.append(store.history(SESSION)))
+        reader.start()
+        reader.join(timeout=5)
+        assert [content for _, content, _ in result[0]] == ["first"]
+    finally:
+        writer.execute("ROLLBACK")
+
+
+def test_failed_write_rolls_back(store):
+    with pytest.raises(sqlite3.IntegrityError):
+        store.write([(SESSION, "user", "ok", datetime(2025, 1, 1)), (SESSION, "system", "bad", datetime(2025, 1, 1))])
+    assert store.history(SESSION) == []
+    assert store.sessions(10) == []
+
+
+def test_history_and_pages(store):
+    store.write([(SESSION, "user" if i % 2 == 0 else "assistant", f"m{i}", datetime(2025, 1, 1, 9, i)) for i in range(5)])
+    assert [c for _, c, _ in store.history(SESSION)] == ["m0", "m1", "m2", "m3", "m4"]
+    assert [c for _, c, _ in store.history(SESSION, limit=2)] == ["m3", "m4"]
+    assert store.history(SESSION)[0][2] == datetime(2025, 1, 1, 9, 0)
+    page = store.history_page(SESSION, 2)
+    assert [c for _, _, c in page] == ["m4", "m3"]
+    assert [c for _, _, c in store.history_page(SESSION, 2, before=page[-1][0])] == ["m2", "m1"]
+
+
+def test_init_backfills_sessions_from_existing_history(tmp_path):
+    path = tmp_path / "legacy.db"
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE chat_history (id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT NOT NULL, "
+        "role TEXT NOT NULL, content TEXT NOT NULL, created_at TEXT DEFAULT CURRENT_TIMESTAMP)"
+    )
+    conn.executemany(
+        "INSERT INTO chat_history (session_id, role, content, created_at) VALUES (?, ?, ?, ?)",
+        [(SESSION, "assistant", "welcome", "2025-01-01 09:00:00"),
+         (SESSION, "user", "budget by state", "2025-01-01 09:01:00")],
+    )
+    conn.commit()
+    conn.close()
+
+    store = SQLiteChatStore(str(path))
+    try:
+        store.init()
+        store.init()  # only once
+        assert store.sessions(10) == [
+            (SESSION, datetime(2025, 1, 1, 9, 0), datetime(2025, 1, 1, 9, 1), 2, "budget by state")
+        ]
+    finally:
+        store.close()
+
+
+def test_messages_are_written_on_the_writer_thread(store, monkeypatch):
+    threads = []
+
+    def write(messages):
+        threads.append(threading.current_thread().name)
+        store.write(messages)
+
+    writer = HistoryWriter(write=write)
+    monkeypatch.setattr(store_factory, "_store", store)
+    monkeypatch.setattr(chat_store, "history_writer", writer)
+    # without write-behind a save waits for the single writer thread
+    monkeypatch.setattr(settings, "CHAT_WRITE_BEHIND", False)
+    try:
+        chat_store.save_message(SESSION, "user", "q1")
+        chat_store.save_message(SESSION, "assistant", "a1")
+        assert [c for _, c, _ in store.history(SESSION)] == ["q1", "a1"]
+        assert set(threads) == {"chat-history-writer"}
+        assert store.sessions(10)[0][3] == 2
+    finally:
+        writer.close(timeout=5)
+
+
+def test_close_then_reopen(store):
+    store.write([(SESSION, "user", "q1", datetime(2025, 1, 1))])
+    store.close()
+    assert [c for _, c, _ in store.history(SESSION)] == ["q1"]
+    store.write([(SESSION, "user", "q2", datetime(2025, 1, 2))])
+    assert len(store.history(SESSION)) == 2
@@ -0,0 +1,121 @@
+import asyncio
+
+import pytest
+
+from app.pipeline.stage_graph import StageGraph
+
+
+def _graph(log):
+    graph = StageGraph("test")
+
+    def stage(name, deps=(), when=None, delay=0.0):
+        @graph.stage(name, deps=deps, when=when)
+        async def run(results):
+            log.append(("start", name))
+            await asyncio.sleep(delay)
+            log.append(("end", name))
+            return f"{name}({','.join(results[d] for d in deps) or results['question']})"
+
+    stage("embed", delay=0.05)
+    stage("intent", delay=0.05)
+    stage("schema", deps=["embed"])
+    stage("sql", deps=["schema", "intent"], when=lambda r: r["intent"] != "intent(hi)")
+    stage("answer", deps=["sql"])
+    return graph
+
+
+def test_dependencies_run_first():
+    log = []
+    run = asyncio.run(_graph(log).run({"question": "q"}))
+    ends = [name for event, name in log if event == "end"]
+    assert ends.index("schema") > ends.index("embed")
+    assert ends.index("sql") > max(ends.index("schema"), ends.index("intent"))
+    assert run.results["answer"] == "answer(sql(schema(embed(q)),intent(q)))"
+    assert run.skipped == set()
+
+
+def test_independent_stages_run_concurrently():
+    log = []
+    asyncio.run(_graph(log).run({"question": "q"}, targets=["embed", "intent"]))
+    # both started before either finished
+    assert log[:2] == [("start", "embed"), ("start", "intent")]
+
+
+def test_targets_run_only_what_they_need():
+    log = []
+    run = asyncio.run(_graph(log).run({"question": "q"}, targets=["schema"]))
+    assert {name for _, name in log} == {"embed", "schema"}
+    assert "sql" not in run.results
+
+
+def test_when_skips_the_stage_and_its_dependents():
+    run = asyncio.run(_graph([]).run({"question": "hi"}))
+    assert run.skipped == {"sql", "answer"}
+    assert "answer" not in run.results
+
+
+def test_resume_from_earlier_results():
+    graph = _graph([])
+    first = asyncio.run(graph.run({"question": "q"}, targets=["schema", "intent"]))
+    log = []
+    graph = _graph(log)
+    second = asyncio.run(graph.run(first.results))
+    assert {name for _, name in log} == {"sql", "answer"}
+    assert second.results["answer"] == "answer(sql(schema(embed(q)),intent(q)))"
+
+
+def test_timings_per_run_and_aggregated():
+    graph = _graph([])
+    run = asyncio.run(graph.run({"question": "q"}))
+    assert set(run.timings) == {"embed", "intent", "schema", "sql", "answer"}
+    assert run.timings["embed"] >= 40
+    asyncio.run(graph.run({"question": "q"}, targets=["embed"]))
+    stats = graph.stats()["stages"]
+    assert stats["embed"]["count"] == 2
+    assert stats["answer"]["count"] == 1
+    assert stats["embed"]["max_ms"] >= stats["embed"]["avg_ms"] >= 40
+
+
+def test_iter_run_yields_stages_as_they_finish():
+    async def collect():
+        return [name async for name, _ in _graph([]).iter_run({"question": "q"})]
+
+    names = asyncio.run(collect())
+    assert names[-1] == "__run__"
+    assert names.index("answer") > names.index("sql") > names.index("schema")
+
+
+def test_failure_cancels_the_rest():
+    graph = StageGraph("failing")
+    cancelled = []
+
+    @graph.stage("slow")
+    async def slow(results):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append("slow")
+            raise
+
+    @graph.stage("broken")
+    async def broken(results):
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(graph.run({}))
+    assert cancelled == ["slow"]
+
+
+def test_registration_errors():
+    graph = StageGraph("errors")
+
+    async def noop(results):
+        return None
+
+    graph.stage("a")(noop)
+    with pytest.raises(ValueError):
+        graph.stage("a")(noop)
+    with pytest.raises(ValueError):
+        graph.stage("b", deps=["missing"])(noop)
+    with pytest.raises(ValueError):
+        asyncio.run(graph.run({}, targets=["missing"]))
@@ -0,0 +1,32 @@
+from app.db.statements import parameterize, pyformat
+
+
+def test_pyformat_rewrites_placeholders_only():
+    sql, params = pyformat(
+        "SELECT '$1 off', $$ $2 $$, \"$1\" FROM t -- $2\nWHERE a = $1 AND b LIKE 'x%' AND c = $2",
+        ["A", "B"],
+    )
+    assert sql == (
+        "SELECT '$1 off', $$ $2 $$, \"$1\" FROM t -- $2\nWHERE a = %(p1)s AND b LIKE 'x%%' AND c = %(p2)s"
+    )
+    assert params == {"p1": "A", "p2": "B"}
+
+
+def test_pyformat_without_params_is_unchanged():
+    assert pyformat("SELECT '50%'", ()) == ("SELECT '50%'", None)
+
+
+def test_parameterize_literals():
+    shape, literals = parameterize("SELECT * FROM t WHERE state = 'Odisha' AND amount > 10 LIMIT 501")
+    assert shape == "select * from t where state = $1 and amount > $2 limit $3"
+    assert literals == [("str", "Odisha"), ("num", "10"), ("num", "501")]
+
+
+def test_parameterize_keeps_positional_and_typed_literals():
+    sql = "SELECT amount::numeric(12,2) FROM t WHERE d > DATE '2024-01-01' ORDER BY 1"
+    assert parameterize(sql) == (sql, [])
+
+
+def test_parameterize_leaves_dollar_quoted_statements_alone():
+    sql = "SELECT $$a 'b'$$ FROM t WHERE x = 1"
+    assert parameterize(sql) == (sql, [])
@@ -0,0 +1,116 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app import api
+from app.db.cost_gate import QueryPlan
+from app.pipeline import question_pipeline
+from app.utils.serialization import ARROW_STREAM
+
+SESSION = "3f1b0f4e-6a0d-4c1a-9a7e-9f1f5b2d8c44"
+
+
+def _run(action="stream"):
+    return SimpleNamespace(results={
+        "question": "show all budgets",
+        "sql": "SELECT state_name, amount FROM budgets",
+        "sql_source": "llm",
+        "plan": QueryPlan(action, None, None, None),
+    })
+
+
+def _rows(*batches, fail_after=None):
+    async def astream_sql(sql, question, info=None, params=None, plan=None):
+        info["total_rows_estimate"] = sum(len(b) for b in batches)
+        for i, batch in enumerate(batches):
+            if fail_after is not None and i == fail_after:
+                raise RuntimeError("connection lost")
+            yield ["state", "amount"], batch
+    return astream_sql
+
+
+@pytest.fixture(autouse=True)
+def stubs(monkeypatch):
+    saved = []
+
+    async def asave_message(session_id, role, content):
+        saved.append((role, content))
+
+    async def aformat_result(df, question, total_rows=None):
+        return f"INSIGHTS:\n{len(df)} rows.\n\nDOWNLOAD:\nYou can download this data."
+
+    monkeypatch.setattr(api, "asave_message", asave_message)
+    monkeypatch.setattr(question_pipeline, "asave_message", asave_message)
+    monkeypatch.setattr(api, "aformat_result", aformat_result)
+    monkeypatch.setattr(api, "executable_sql", lambda results: (results["sql"], ()))
+    return saved
+
+
+def _body(run):
+    async def collect():
+        return "".join([chunk async for chunk in api._stream_all_rows("show all budgets", SESSION, run)])
+    return json.loads(asyncio.run(collect()))
+
+
+def test_rows_then_answer(monkeypatch, stubs):
+    monkeypatch.setattr(api, "astream_sql", _rows([("Odisha", 1), ("Bihar", 2)], [("Assam", 3)]))
+    body = _body(_run())
+    assert body["data"] == [
+        {"state": "Odisha", "amount": 1}, {"state": "Bihar", "amount": 2}, {"state": "Assam", "amount": 3},
+    ]
+    assert body["columns"] == ["state", "amount"]
+    assert "3 rows" in body["answer"]
+    assert body["query_id"]
+    assert stubs == [("assistant", body["answer"])]
+
+
+def test_empty_result_is_a_complete_document(monkeypatch):
+    monkeypatch.setattr(api, "astream_sql", _rows())
+    body = _body(_run())
+    assert body["data"] == [] and body["columns"] == []
+
+
+def test_cursor_error_closes_the_document(monkeypatch):
+    monkeypatch.setattr(api, "astream_sql", _rows([("Odisha", 1)], [("Bihar", 2)], fail_after=1))
+    body = _body(_run())
+    assert body["data"] == [{"state": "Odisha", "amount": 1}]
+    assert body["answer"] == "Error: connection lost"
+
+
+def test_insight_error_after_rows_closes_the_document(monkeypatch):
+    async def aformat_result(df, question, total_rows=None):
+        raise RuntimeError("LLM unavailable")
+
+    monkeypatch.setattr(api, "astream_sql", _rows([("Odisha", 1)]))
+    monkeypatch.setattr(api, "aformat_result", aformat_result)
+    body = _body(_run())
+    assert body["data"] == [{"state": "Odisha", "amount": 1}]
+    assert body["answer"] == "Error: LLM unavailable"
+
+
+def test_save_error_after_rows_closes_the_document(monkeypatch):
+    async def asave_message(session_id, role, content):
+        raise RuntimeError("chat store down")
+
+    monkeypatch.setattr(api, "astream_sql", _rows([("Odisha", 1)]))
+    monkeypatch.setattr(api, "asave_message", asave_message)
+    body = _body(_run())
+    assert body["answer"] == "Error: chat store down"
+
+
+def test_rejected_plan(monkeypatch):
+    run = _run("reject")
+    run.results["plan"] = QueryPlan("reject", 1e9, None, None, message="Too expensive", hint="Add a filter")
+    body = _body(run)
+    assert body["answer"] == "Too expensive"
+    assert "data" not in body
+
+
+def test_streamed_question_refuses_other_formats():
+    request = api.QueryRequest(question="show all budgets", session_id=SESSION)
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(api.query(request, accept=ARROW_STREAM))
+    assert e.value.status_code == 406
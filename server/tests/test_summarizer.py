@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.config.settings import settings
+from app.llm.summarizer import classify_shape, summarize
+
+
+@pytest.fixture(autouse=True)
+def fast_insights(monkeypatch):
+    monkeypatch.setattr(settings, "FAST_INSIGHTS_ENABLED", True)
+    monkeypatch.setattr(settings, "FAST_INSIGHTS_TOP_K", 3)
+    monkeypatch.setattr(settings, "FAST_INSIGHTS_MAX_GROUPS", 50)
+    monkeypatch.setattr(settings, "FAST_INSIGHTS_WIDE_COLUMNS", 8)
+
+
+def _insights(text):
+    return text.split("INSIGHTS:\n", 1)[1].split("\n\nDOWNLOAD:", 1)[0]
+
+
+def test_scalar():
+    text = summarize(pd.DataFrame({"total_budget": [1234567.5]}))
+    assert _insights(text) == "For the selected criteria, the total budget is 1,234,567.50."
+
+
+def test_breakdown_totals_and_lowest():
+    df = pd.DataFrame({"state": list("ABCDE"), "amount": [50, 20, 15, 10, 5]})
+    text = _insights(summarize(df))
+    assert "adds up to 100" in text
+    assert "A (50, 50.0%)" in text
+    assert "The lowest is E at 5." in text
+
+
+def test_lowest_not_repeated_from_the_top():
+    df = pd.DataFrame({"state": list("ABCD"), "amount": [4.0, 3.0, 2.0, np.nan]})
+    text = _insights(summarize(df))
+    assert "The lowest" not in text
+    assert "1 entry has no recorded value." in text
+
+
+def test_time_series():
+    df = pd.DataFrame({"financial_year": ["2021-22", "2022-23", "2023-24"], "amount": [100, 150, 120]})
+    text = _insights(summarize(df))
+    assert "from 2021-22 to 2023-24" in text
+    assert "increased from 100 to 120 (+20.0%)" in text
+
+
+def test_wide_table_with_measures():
+    df = pd.DataFrame({f"label_{i}": ["x", "y"] for i in range(7)})
+    df["amount"] = [1, 2]
+    assert classify_shape(df)[0] == "wide"
+    assert "Amount ranges from 1 to 2 with a total of 3." in _insights(summarize(df))
+
+
+def test_results_without_measure_values_go_to_the_llm():
+    assert summarize(pd.DataFrame({f"label_{i}": ["x", "y"] for i in range(9)})) is None
+    assert summarize(pd.DataFrame({"state": ["A", "B"], "amount": [np.nan, np.nan]})) is None
+
+
+def test_partial_results_go_to_the_llm():
+    df = pd.DataFrame({"state": ["A", "B"], "amount": [1, 2]})
+    assert summarize(df, total_rows=10) is None
+    df.attrs["truncated"] = True
+    assert summarize(df) is None
@@ -0,0 +1,201 @@
+"""
+Load benchmark: sync pipeline on a bounded threadpool vs the async /query pipeline.
+
+The sync path runs the pipeline's steps one after another, each blocking its
+worker thread (as a plain `def` endpoint would), on a ThreadPoolExecutor sized
+like Starlette's default threadpool (40 workers); every worker drives the async
+stage functions on its own event loop. The async path awaits the shared
+stage-graph pipeline behind `app.api.query` directly with asyncio.gather.
+
+LLM calls are replaced by a provider that sleeps for --llm-latency seconds, so
+the numbers reflect how many questions one worker can keep in flight rather than
+model speed. Database calls are simulated with --db-latency unless --real-db is
+given, in which case the configured PostgreSQL database is used (each sync
+worker then opens its own pools).
+
+Usage (from the server directory):
+    python tools/bench_async_pipeline.py --requests 400 --llm-latency 0.3
+"""
+from pathlib import Path
+import argparse
+import asyncio
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+import pandas as pd
+
+from app.db.cost_gate import QueryPlan
+from app.llm.base import BaseLLM
+
+STARLETTE_THREADPOOL_SIZE = 40
+QUESTION = "show total budget by state"
+
+
+class LatencyLLM(BaseLLM):
+    """Stand-in provider that only costs wall-clock time."""
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    @staticmethod
+    def _reply(messages):
+        system = messages[0]["content"]
+        if "SQL generation engine" in system:
+            return "SELECT 1 AS value"
+        if "intent classifier" in system:
+            return "database"
+        return "INSIGHTS:\nBenchmark answer.\n\nDOWNLOAD:\nYou can download this data as an Excel file."
+
+    def chat(self, messages, temperature=0):
+        time.sleep(self.latency)
+        return self._reply(messages)
+
+    def embed(self, text):
+        time.sleep(self.latency)
+        return [0.0] * 8
+
+    async def achat(self, messages, temperature=0):
+        await asyncio.sleep(self.latency)
+        return self._reply(messages)
+
+    async def aembed(self, text):
+        await asyncio.sleep(self.latency)
+        return [0.0] * 8
+
+
+def _install_stubs(llm, db_latency, real_db):
+    from app.llm import intent_detector, text_to_sql, formatter
+    from app.schema import selector
+    from app.pipeline import question_pipeline as pipeline
+
+    for module in (intent_detector, text_to_sql, formatter, selector):
+        module.get_llm = lambda: llm
+    # every request repeats QUESTION; keep the embedding call in both paths
+    selector.question_embedding_cache.max_entries = 0
+    selector.question_embedding_cache.path = None
+
+    if real_db:
+        return
+
+    df = pd.DataFrame({"value": [1]})
+
+    async def asave_message(session_id, role, content):
+        await asyncio.sleep(db_latency)
+
+    async def abuild_context(session_id, limit=10):
+        await asyncio.sleep(db_latency)
+        return []
+
+    async def aselect_schema(question, top_k=5, embedding=None):
+        if embedding is None:
+            await llm.aembed(question)
+        await asyncio.sleep(db_latency)
+        return []
+
+    async def aplan_sql(sql, user_query="", params=None, streaming=False):
+        await asyncio.sleep(db_latency)
+        return QueryPlan("allow", None, None, None)
+
+    async def aexecute_sql(sql, user_query="", params=None, plan=None):
+        await asyncio.sleep(db_latency)
+        return df
+
+    pipeline.asave_message = asave_message
+    pipeline.abuild_context = abuild_context
+    pipeline.aselect_schema = aselect_schema
+    pipeline.aplan_sql = aplan_sql
+    pipeline.aexecute_sql = aexecute_sql
+
+
+_worker = threading.local()
+
+
+def _blocking(coro):
+    """Run one step to completion on this worker thread's event loop, blocking the thread."""
+    runner = getattr(_worker, "runner", None)
+    if runner is None:
+        runner = _worker.runner = asyncio.Runner()
+    return runner.run(coro)
+
+
+def sync_pipeline(question, session_id):
+    """The blocking, strictly sequential pipeline a plain `def` endpoint would run."""
+    from app.pipeline import question_pipeline as pipeline
+    from app.schema.builder import build_schema
+    from app.security.sql_guard import validate_sql
+
+    _blocking(pipeline.asave_message(session_id, "user", question))
+    context = _blocking(pipeline.abuild_context(session_id))
+    if _blocking(pipeline.adetect_intent(question)) == "conversation":
+        reply = _blocking(pipeline.aget_conversational_response(question, context))
+        _blocking(pipeline.asave_message(session_id, "assistant", reply))
+        return reply
+
+    schema = build_schema(_blocking(pipeline.aselect_schema(question)))
+    sql = _blocking(pipeline.agenerate_sql(question, schema, context))
+    validate_sql(sql)
+    plan = _blocking(pipeline.aplan_sql(sql, question))
+    df = _blocking(pipeline.aexecute_sql(sql, question, plan=plan))
+    answer = _blocking(pipeline.aformat_result(df, question))
+    _blocking(pipeline.asave_message(session_id, "assistant", answer))
+    return answer
+
+
+def _report(label, total, latencies):
+    latencies.sort()
+    n = len(latencies)
+    print(
+        f"{label:<6} requests={n:<5} wall={total:7.2f}s  "
+        f"throughput={n / total:8.1f} req/s  "
+        f"p50={latencies[n // 2] * 1000:8.1f}ms  "
+        f"p95={latencies[int(n * 0.95) - 1] * 1000:8.1f}ms"
+    )
+
+
+def run_sync(n):
+    def one(_):
+        start = time.perf_counter()
+        sync_pipeline(QUESTION, str(uuid.uuid4()))
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=STARLETTE_THREADPOOL_SIZE) as pool:
+        latencies = list(pool.map(one, range(n)))
+    _report("sync", time.perf_counter() - start, latencies)
+
+
+async def run_async(n):
+    from app import api
+
+    async def one():
+        start = time.perf_counter()
+        await api.query(api.QueryRequest(question=QUESTION, session_id=str(uuid.uuid4())), accept=None)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(one() for _ in range(n)))
+    _report("async", time.perf_counter() - start, list(latencies))
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400, help="concurrent questions per path")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="simulated seconds per LLM call")
+    parser.add_argument("--db-latency", type=float, default=0.005, help="simulated seconds per DB call")
+    parser.add_argument("--real-db", action="store_true", help="use the configured PostgreSQL database")
+    args = parser.parse_args()
+
+    _install_stubs(LatencyLLM(args.llm_latency), args.db_latency, args.real_db)
+
+    run_sync(args.requests)
+    asyncio.run(run_async(args.requests))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,183 @@
+"""
+Benchmark: chat history throughput with one transaction per message vs
+the write-behind writer (app/memory/history_writer.py), which hands queued
+messages to the chat store in batches, one transaction per batch.
+
+By default the store is simulated: every statement costs one network round
+trip (--rtt), every commit waits for the WAL flush (--commit) and each
+inserted row adds --row-cost; the per-message path shares --connections
+connections like the chat pool does. --sqlite writes to a temporary
+WAL-mode SQLite store (app/memory/backends/sqlite_store.py) and also times
+history reads. --database writes to the configured CHAT_STORE_BACKEND and
+deletes the messages afterwards.
+
+Usage (from the server directory):
+    python tools/bench_chat_writer.py --messages 2000 --clients 20
+    python tools/bench_chat_writer.py --sqlite
+    python tools/bench_chat_writer.py --database
+"""
+from pathlib import Path
+import argparse
+import json
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from app.memory.backends.base import utc_now
+from app.memory.backends.sqlite_store import SQLiteChatStore
+from app.memory.history_writer import HistoryWriter
+from app.memory.store_factory import get_chat_store
+
+
+class SimulatedStore:
+    """Chat store whose writes cost round trips and a commit, on a limited pool."""
+
+    def __init__(self, args):
+        self.args = args
+        self.slots = threading.BoundedSemaphore(args.connections)
+
+    def write(self, messages):
+        with self.slots:
+            # INSERT messages, upsert sessions, COMMIT
+            time.sleep((3 * self.args.rtt + self.args.commit) / 1000 + len(messages) * self.args.row_cost / 1e6)
+
+
+def make_store(args, directory):
+    if args.database:
+        return get_chat_store()
+    if args.sqlite:
+        store = SQLiteChatStore(path=Path(directory) / "bench_chat_history.db")
+        store.init()
+        return store
+    return SimulatedStore(args)
+
+
+def messages(args, session_ids):
+    for i in range(args.messages):
+        yield session_ids[i % len(session_ids)], "user" if i % 2 == 0 else "assistant", f"benchmark message {i} " * 8
+
+
+def per_message(args, store, session_ids):
+    def save(message):
+        start = time.perf_counter()
+        store.write([(*message, utc_now())])
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.clients) as pool:
+        waits = list(pool.map(save, messages(args, session_ids)))
+    return time.perf_counter() - start, waits
+
+
+def write_behind(args, store, session_ids):
+    writer = HistoryWriter(batch_size=args.batch_size, flush_interval=args.flush_interval,
+                           max_pending=args.messages, write=store.write)
+
+    def save(message):
+        start = time.perf_counter()
+        writer.enqueue(*message)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.clients) as pool:
+        waits = list(pool.map(save, messages(args, session_ids)))
+    writer.flush()
+    elapsed = time.perf_counter() - start
+    writer.close()
+    return elapsed, waits, writer.stats()
+
+
+def cleanup(store, session_ids):
+    if isinstance(store, SQLiteChatStore):
+        conn = sqlite3.connect(store.path)
+        with conn:
+            for table in ("chat_history", "chat_sessions"):
+                conn.execute(f"DELETE FROM {table} WHERE session_id IN (SELECT value FROM json_each(?))",
+                             (json.dumps(session_ids),))
+        conn.close()
+        return
+
+    from app.db.connection import get_connection, CHAT_POOL
+    conn = get_connection(CHAT_POOL)
+    try:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM chat_history WHERE session_id = ANY(%s)", (session_ids,))
+        cur.execute("DELETE FROM chat_sessions WHERE session_id = ANY(%s)", (session_ids,))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def read_latency(store, session_ids, repeat=2000):
+    """Average ms of a context read (last 10 messages) and a first history page (30)."""
+    timings = {}
+    for label, read in (("history(limit=10)", lambda sid: store.history(sid, 10)),
+                        ("history_page(30)", lambda sid: store.history_page(sid, 30))):
+        start = time.perf_counter()
+        for i in range(repeat):
+            read(session_ids[i % len(session_ids)])
+        timings[label] = (time.perf_counter() - start) / repeat * 1000
+    return timings
+
+
+def report(label, elapsed, waits, count):
+    waits = sorted(waits)
+    p50 = waits[len(waits) // 2] * 1000
+    p99 = waits[int(len(waits) * 0.99)] * 1000
+    print(f"{label:22}{count / elapsed:>12,.0f}{p50:>14.3f}{p99:>14.3f}")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--clients", type=int, default=20, help="concurrent callers saving messages")
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--flush-interval", type=float, default=0.05)
+    parser.add_argument("--connections", type=int, default=5, help="simulated chat pool size")
+    parser.add_argument("--rtt", type=float, default=0.5, help="simulated round trip, ms")
+    parser.add_argument("--commit", type=float, default=1.0, help="simulated WAL flush per commit, ms")
+    parser.add_argument("--row-cost", type=float, default=5.0, help="simulated insert cost per row, us")
+    parser.add_argument("--sqlite", action="store_true", help="write to a temporary SQLite store")
+    parser.add_argument("--database", action="store_true", help="write to the configured chat store")
+    args = parser.parse_args()
+
+    session_ids = [str(uuid.uuid4()) for _ in range(args.sessions)]
+    with tempfile.TemporaryDirectory() as directory:
+        store = make_store(args, directory)
+        if args.database:
+            target = f"{type(store).__name__} (CHAT_STORE_BACKEND)"
+        elif args.sqlite:
+            target = "temporary SQLite store (WAL)"
+        else:
+            target = f"simulated: rtt {args.rtt} ms, commit {args.commit} ms, {args.connections} connections"
+        print(f"{args.messages} messages, {args.clients} clients, {target}\n")
+
+        try:
+            elapsed, waits = per_message(args, store, session_ids)
+            batched, batched_waits, stats = write_behind(args, store, session_ids)
+            reads = read_latency(store, session_ids) if hasattr(store, "history") else {}
+        finally:
+            if args.database:
+                cleanup(store, session_ids)
+            if args.sqlite:
+                store.close()
+
+    print(f"{'':22}{'messages/s':>12}{'p50 wait ms':>14}{'p99 wait ms':>14}")
+    report("per-message commit", elapsed, waits, args.messages)
+    report("write-behind", batched, batched_waits, args.messages)
+    print(f"\n{stats['batches']} batches, {stats['avg_batch']} messages per batch, "
+          f"{stats['avg_flush_ms']} ms per flush")
+    for label, ms in reads.items():
+        print(f"{label:22}{ms:>12.3f} ms per read")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,174 @@
+"""
+Benchmark: per-call client overhead of LLM providers before and after the
+shared provider registry.
+
+A local stub HTTP server answers OpenAI-compatible chat requests instantly,
+so the timings are pure client-side cost: building the client, opening a
+connection and parsing the response. "before" reproduces the old behaviour
+(a new OpenAI client per call, `requests.post` / a throwaway httpx client for
+Grok); "after" goes through `get_llm()`, which reuses one provider instance and
+the pooled keep-alive connections from app/llm/http.py.
+
+The stub speaks plain HTTP on localhost; against a real API each avoided
+connection also saves the TLS handshake and its network round trips.
+
+Usage (from the server directory):
+    python tools/bench_llm_clients.py --calls 300
+"""
+from pathlib import Path
+import argparse
+import asyncio
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+import httpx
+import requests
+from openai import OpenAI
+
+from app.config.settings import settings
+from app.llm import factory
+
+MESSAGES = [{"role": "user", "content": "ping"}]
+REPLY = json.dumps({
+    "id": "chatcmpl-bench",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "stub",
+    "choices": [{"index": 0, "message": {"role": "assistant", "content": "pong"}, "finish_reason": "stop"}],
+    "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+}).encode("utf-8")
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    # send headers and body in one segment, without Nagle delays
+    wbufsize = 64 * 1024
+    disable_nagle_algorithm = True
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        StubHandler.connections += 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(REPLY)))
+        self.end_headers()
+        self.wfile.write(REPLY)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def measure(label, calls, fn):
+    StubHandler.connections = 0
+    fn()  # warm up imports and, for shared clients, the connection
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<34}{elapsed / calls * 1000:>10.3f} ms/call{StubHandler.connections:>8} connections")
+    return elapsed / calls
+
+
+async def ameasure(label, calls, fn):
+    StubHandler.connections = 0
+    await fn()
+    start = time.perf_counter()
+    for _ in range(calls):
+        await fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<34}{elapsed / calls * 1000:>10.3f} ms/call{StubHandler.connections:>8} connections")
+    return elapsed / calls
+
+
+def configure(base_url):
+    settings.OPENAI_API_KEY = "bench"
+    settings.OPENAI_BASE_URL = f"{base_url}/v1"
+    settings.OPENAI_MODEL = "stub"
+    settings.GROK_API_KEY = "bench"
+    settings.GROK_API_URL = f"{base_url}/v1/chat/completions"
+    settings.GROK_MODEL = "stub"
+
+
+def grok_before():
+    res = requests.post(
+        settings.GROK_API_URL,
+        headers={"Authorization": f"Bearer {settings.GROK_API_KEY}"},
+        json={"model": settings.GROK_MODEL, "messages": MESSAGES, "temperature": 0},
+        timeout=30,
+    )
+    return res.json()["choices"][0]["message"]["content"]
+
+
+async def agrok_before():
+    async with httpx.AsyncClient(timeout=30) as client:
+        res = await client.post(
+            settings.GROK_API_URL,
+            headers={"Authorization": f"Bearer {settings.GROK_API_KEY}"},
+            json={"model": settings.GROK_MODEL, "messages": MESSAGES, "temperature": 0},
+        )
+    return res.json()["choices"][0]["message"]["content"]
+
+
+def openai_before():
+    client = OpenAI(api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL)
+    res = client.chat.completions.create(model=settings.OPENAI_MODEL, messages=MESSAGES, temperature=0)
+    return res.choices[0].message.content
+
+
+def use_provider(name):
+    settings.LLM_PROVIDER = name
+    return lambda: factory.get_llm().chat(MESSAGES)
+
+
+def use_async_provider(name):
+    settings.LLM_PROVIDER = name
+    return lambda: factory.get_llm().achat(MESSAGES)
+
+
+async def run_async(calls):
+    before = await ameasure("grok async, client per call", calls, agrok_before)
+    after = await ameasure("grok async, shared client", calls, use_async_provider("grok"))
+    print(f"{'':<34}{before / after:>10.1f}x faster\n")
+    await factory.close_llms()
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=300, help="sequential calls per variant")
+    args = parser.parse_args()
+
+    server, base_url = start_stub()
+    configure(base_url)
+    print(f"stub server at {base_url}, {args.calls} sequential calls per variant\n")
+
+    before = measure("openai, client per call", args.calls, openai_before)
+    after = measure("openai, shared client", args.calls, use_provider("openai"))
+    print(f"{'':<34}{before / after:>10.1f}x faster\n")
+
+    before = measure("grok, requests.post per call", args.calls, grok_before)
+    after = measure("grok, shared client", args.calls, use_provider("grok"))
+    print(f"{'':<34}{before / after:>10.1f}x faster\n")
+
+    asyncio.run(run_async(args.calls))
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,137 @@
+"""
+Benchmark: cost of analyzing generated SQL once for the guard, the row
+limiter and the cache keys.
+
+Runs the single-pass analyzer (app/security/sql_analyzer.py) uncached and
+memoized over statements shaped like the ones the LLM writes for the CSR
+views (joins, CTEs, window functions, date filters), and compares it with
+the previous approach: two substring keyword scans (text_to_sql and
+sql_guard) plus a separate regex canonicalization and FROM/JOIN scan for
+the result cache. Also lists the statements the substring scans rejected.
+
+Usage (from the server directory):
+    python tools/bench_sql_analyzer.py --repeat 2000
+"""
+from pathlib import Path
+import argparse
+import re
+import sys
+import time
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from app.security.row_limiter import apply_limit
+from app.security.sql_analyzer import _analyze, analyze
+from app.security.sql_guard import validate_sql
+
+SAMPLES = [
+    """SELECT state_name, SUM(expenditure_amount) AS total_expenditure
+FROM csr_expenditure_view
+WHERE financial_year = '2022-23'
+GROUP BY state_name
+ORDER BY total_expenditure DESC
+LIMIT 10;""",
+    """SELECT p.project_name, p.updated_at, SUM(b.amount) AS total_budget
+FROM projects p
+JOIN budgets b ON b.project_id = p.project_id
+LEFT JOIN states s ON s.state_id = p.state_id
+WHERE s.state_name = 'Maharashtra' AND p.is_deleted = false
+GROUP BY p.project_name, p.updated_at
+ORDER BY total_budget DESC""",
+    """WITH yearly AS (
+    SELECT y.year_name, SUM(b.amount) AS total_budget
+    FROM budgets b
+    JOIN projects p ON p.project_id = b.project_id
+    JOIN years y ON y.year_id = p.year_id
+    GROUP BY y.year_name
+)
+SELECT year_name, total_budget,
+       total_budget - LAG(total_budget) OVER (ORDER BY year_name) AS change
+FROM yearly
+ORDER BY year_name""",
+    """SELECT district_name, COUNT(DISTINCT project_id) AS projects,
+       SUM(beneficiaries) FILTER (WHERE gender = 'female') AS women_beneficiaries
+FROM csr_expenditure_view
+WHERE state_name = 'Odisha'
+  AND EXTRACT(YEAR FROM start_date) >= 2021
+  AND project_status NOT IN ('dropped', 'deleted')
+GROUP BY district_name
+HAVING COUNT(DISTINCT project_id) > 2
+ORDER BY projects DESC""",
+    """SELECT sector, ROUND(AVG(expenditure_amount)::numeric, 2) AS avg_spend,
+       RANK() OVER (ORDER BY AVG(expenditure_amount) DESC) AS spend_rank
+FROM csr_expenditure_view
+WHERE report_date BETWEEN DATE '2023-04-01' AND DATE '2024-03-31'
+GROUP BY sector""",
+    """SELECT p.project_name, p.created_at, p.last_updated_by
+FROM projects p
+WHERE p.project_name ILIKE '%school%'
+  AND p.project_id NOT IN (SELECT project_id FROM budgets WHERE amount = 0)
+ORDER BY p.created_at DESC
+LIMIT 50""",
+]
+
+# The checks this analyzer replaced, kept here for comparison
+_LEGACY_GENERATION = ["update ", "delete ", "insert ", "drop ", "alter ", "truncate "]
+_LEGACY_GUARD = ["drop", "delete", "update", "insert", "truncate", "alter", "grant", "revoke"]
+_LEGACY_TOKEN = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|--[^\n]*|/\*.*?\*/|\s+|[^\s'\"]+", re.S)
+_LEGACY_TABLE = re.compile(r"\b(?:from|join)\s+((?:[a-z_][\w$]*\.)?[a-z_][\w$]*)")
+
+
+def legacy(sql):
+    lowered = sql.lower().strip()
+    if not lowered.startswith("select") or any(w in lowered for w in _LEGACY_GENERATION):
+        return False
+    if any(w in lowered for w in _LEGACY_GUARD) or ";" in lowered[:-1]:
+        return False
+    parts = []
+    for token in _LEGACY_TOKEN.findall(sql):
+        if token.startswith(("--", "/*")) or token.isspace():
+            parts.append(" ")
+        else:
+            parts.append(token if token[0] in "'\"" else token.lower())
+    canonical = re.sub(r" {2,}", " ", "".join(parts)).strip().rstrip(";").strip()
+    unquoted = re.sub(r"'(?:[^']|'')*'", "''", canonical)
+    {name.split(".")[-1] for name in _LEGACY_TABLE.findall(unquoted)}
+    return True
+
+
+def current(sql):
+    validate_sql(sql)
+    apply_limit(sql, 501)
+    analyze(sql).canonical
+    analyze(sql).tables
+
+
+def timed(fn, statements, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for sql in statements:
+            fn(sql)
+    return (time.perf_counter() - start) / (repeat * len(statements)) * 1e6
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    rejected = [sql for sql in SAMPLES if not legacy(sql)]
+    print(f"{len(SAMPLES)} statements, {len(rejected)} rejected by the substring scans:")
+    for sql in rejected:
+        print("  " + sql.splitlines()[0][:70] + " ...")
+    for sql in SAMPLES:
+        validate_sql(sql)
+    print("all accepted by validate_sql\n")
+
+    print(f"{'':38}{'us/statement':>14}")
+    print(f"{'analyze, uncached':38}{timed(_analyze, SAMPLES, args.repeat):>14.1f}")
+    analyze.cache_clear()
+    print(f"{'analyze, memoized':38}{timed(analyze, SAMPLES, args.repeat):>14.2f}")
+    print(f"{'guard + limit + cache key (memoized)':38}{timed(current, SAMPLES, args.repeat):>14.2f}")
+    print(f"{'previous substring + regex checks':38}{timed(legacy, SAMPLES, args.repeat):>14.1f}")
+
+
+if __name__ == "__main__":
+    main_cli()
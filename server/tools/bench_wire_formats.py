@@ -0,0 +1,106 @@
+"""
+Benchmark: payload size and serialization time of query results per wire format.
+
+Compares the previous /query encoding (DataFrame.to_dict(orient="records")
+followed by FastAPI's jsonable_encoder and stdlib json) with the formats
+negotiated by /query today: row JSON and columnar JSON through orjson, and
+Arrow IPC. The result is a synthetic CSR-style table with text, integer,
+decimal, float and date columns, similar to what the analytics views return.
+
+Usage (from the server directory):
+    python tools/bench_wire_formats.py --rows 500 --repeat 200
+"""
+from pathlib import Path
+import argparse
+import datetime
+import decimal
+import json
+import random
+import sys
+import time
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+
+from app.utils.serialization import arrow_ipc, columnar_data, dumps, rows_data
+
+STATES = ["Maharashtra", "Karnataka", "Tamil Nadu", "Gujarat", "Odisha", "Assam", "Bihar"]
+
+
+def sample_frame(rows):
+    rng = random.Random(7)
+    start = datetime.date(2020, 4, 1)
+    return pd.DataFrame({
+        "state_name": [rng.choice(STATES) for _ in range(rows)],
+        "district_name": [f"District {rng.randint(1, 700)}" for _ in range(rows)],
+        "project_count": [rng.randint(0, 400) for _ in range(rows)],
+        "beneficiaries": [rng.randint(0, 2_000_000) for _ in range(rows)],
+        "amount_spent": [decimal.Decimal(rng.randint(0, 10**9)) / 100 for _ in range(rows)],
+        "utilization_pct": [rng.random() * 100 for _ in range(rows)],
+        "report_date": [start + datetime.timedelta(days=rng.randint(0, 1500)) for _ in range(rows)],
+    })
+
+
+def payload(data, columns):
+    return {
+        "answer": "INSIGHTS:\nSample answer.\n\nDOWNLOAD:\nYou can download this data as an Excel file.",
+        "sql": "SELECT * FROM csr_expenditure_view",
+        "columns": columns,
+        "data": data,
+    }
+
+
+def encode_legacy(df):
+    return json.dumps(jsonable_encoder(payload(df.to_dict(orient="records"), df.columns.tolist()))).encode("utf-8")
+
+
+def encode_rows(df):
+    return dumps(payload(rows_data(df), df.columns.tolist()))
+
+
+def encode_columnar(df):
+    return dumps(payload(columnar_data(df), df.columns.tolist()))
+
+
+def encode_arrow(df):
+    return arrow_ipc(df, {"answer": "INSIGHTS:\nSample answer.", "sql": "SELECT * FROM csr_expenditure_view"})
+
+
+FORMATS = [
+    ("legacy json (to_dict + stdlib)", encode_legacy),
+    ("row json (orjson)", encode_rows),
+    ("columnar json (orjson)", encode_columnar),
+    ("arrow ipc", encode_arrow),
+]
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500, help="rows in the sample result")
+    parser.add_argument("--repeat", type=int, default=200, help="encodings per format")
+    args = parser.parse_args()
+
+    df = sample_frame(args.rows)
+    baseline = None
+    print(f"{args.rows} rows x {len(df.columns)} columns, {args.repeat} runs each\n")
+    print(f"{'format':<32}{'bytes':>10}{'size':>8}{'ms/encode':>12}{'speedup':>10}")
+
+    for label, encode in FORMATS:
+        body = encode(df)  # warm up
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            encode(df)
+        ms = (time.perf_counter() - start) * 1000 / args.repeat
+        if baseline is None:
+            baseline = (len(body), ms)
+        print(
+            f"{label:<32}{len(body):>10}{len(body) / baseline[0]:>7.0%}"
+            f"{ms:>12.3f}{baseline[1] / ms:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,39 @@
+"""
+Full rebuild of semantic_schema_registry: embeds every table and view again.
+
+Same as `incremental_schema_sync.py --full`; use it after changing the
+embedding model or the content format, or to (re)populate a new vector
+database. It also refreshes data/schema_embeddings.pkl from SCHEMA_REGISTRY.
+
+Usage (from the server directory):
+    python tools/generate_schema_registry.py
+"""
+from pathlib import Path
+import argparse
+import json
+import sys
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from app.db.connection import close_all_pools
+from app.schema.embeddings import generate_embeddings
+from app.schema.sync import sync_schema
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--schemas", help="comma-separated schemas (default: SCHEMA_SYNC_SCHEMAS)")
+    args = parser.parse_args()
+
+    schemas = [s.strip() for s in args.schemas.split(",")] if args.schemas else None
+    try:
+        summary = sync_schema(full=True, schemas=schemas)
+    finally:
+        close_all_pools()
+    generate_embeddings()
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,42 @@
+"""
+Incremental schema sync: re-embed only the tables and views whose definition changed.
+
+Introspects pg_catalog for the schemas in SCHEMA_SYNC_SCHEMAS, hashes each
+object's definition, diffs the hashes against data/schema_snapshot.json and
+upserts only new/changed objects into semantic_schema_registry. Rows of
+dropped objects are deleted. Meant to run nightly (cron, CI, ...).
+
+Usage (from the server directory):
+    python tools/incremental_schema_sync.py            # sync changes
+    python tools/incremental_schema_sync.py --dry-run  # show what would change
+    python tools/incremental_schema_sync.py --full     # re-embed everything
+"""
+from pathlib import Path
+import argparse
+import json
+import sys
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from app.db.connection import close_all_pools
+from app.schema.sync import sync_schema
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--full", action="store_true", help="re-embed every object, ignoring the snapshot")
+    parser.add_argument("--dry-run", action="store_true", help="report the diff without embedding or writing")
+    parser.add_argument("--schemas", help="comma-separated schemas (default: SCHEMA_SYNC_SCHEMAS)")
+    args = parser.parse_args()
+
+    schemas = [s.strip() for s in args.schemas.split(",")] if args.schemas else None
+    try:
+        summary = sync_schema(full=args.full, dry_run=args.dry_run, schemas=schemas)
+    finally:
+        close_all_pools()
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,163 @@
+"""
+Train the local intent classifier (hashed n-gram logistic regression).
+
+Training data, later sources overriding earlier ones for the same text:
+  1. a small built-in seed set, so a fresh checkout can train a model
+  2. the intent log (INTENT_LOG_FILE, e.g. data/intent_log.jsonl, and its
+     rotated copies): decisions logged by the intent detector. Only labels from
+     the LLM and from unambiguous keyword matches are used, never the
+     model's own guesses.
+  3. --labels files: hand-labelled CSV (text,intent) or JSONL ({"text", "intent"})
+
+Writes data/intent_model.npz (INTENT_MODEL_FILE) and reports hold-out
+accuracy, how many messages clear INTENT_THRESHOLD, and prediction latency.
+
+Usage (from the server directory):
+    python tools/train_intent_model.py
+    python tools/train_intent_model.py --labels reviewed_intents.csv
+"""
+from pathlib import Path
+import argparse
+import csv
+import json
+import random
+import sys
+import time
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from app.config.settings import settings
+from app.llm.intent_model import DATA_DIR, IntentModel, model_path
+from app.utils.text import normalize_question
+
+TRUSTED_LOG_SOURCES = {"llm", "keyword"}
+
+SEED = {
+    "database": [
+        "show total budget by state",
+        "how many projects started in 2023",
+        "which district has the highest expenditure",
+        "list projects in maharashtra",
+        "total beneficiaries by program",
+        "what is the csr spend for 2022-23",
+        "compare expenditure across years",
+        "top 5 states by budget",
+        "how much was spent on education",
+        "number of women beneficiaries in odisha",
+        "projects ending this year",
+        "average budget per project",
+        "give me the breakdown of spend by sector",
+        "which projects have no expenditure",
+        "trend of expenditure over financial years",
+    ],
+    "conversation": [
+        "hi",
+        "hello there",
+        "thanks a lot",
+        "thank you",
+        "who are you",
+        "what can you do",
+        "good morning",
+        "bye",
+        "how are you doing today",
+        "that was helpful",
+        "ok great",
+        "can you explain what you are",
+        "nice work",
+        "what is your name",
+        "see you tomorrow",
+    ],
+}
+
+
+def _load_log(path):
+    """Trusted decisions from the log and its rotated copies, newest last so they win."""
+    path = Path(path)
+    files = sorted(path.parent.glob(f"{path.name}.[0-9]*"), key=lambda p: int(p.suffix[1:]), reverse=True)
+    examples = {}
+    for file in files + [path]:
+        try:
+            with open(file, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if entry.get("source") in TRUSTED_LOG_SOURCES and entry.get("intent") in ("database", "conversation"):
+                        examples[normalize_question(entry["text"])] = entry["intent"]
+        except FileNotFoundError:
+            pass
+    return examples
+
+
+def _load_labels(path):
+    examples = {}
+    with open(path, "r", encoding="utf-8") as f:
+        if str(path).endswith(".jsonl"):
+            rows = (json.loads(line) for line in f if line.strip())
+        else:
+            rows = csv.DictReader(f)
+        for row in rows:
+            intent = (row.get("intent") or "").strip().lower()
+            if intent in ("database", "conversation") and row.get("text"):
+                examples[normalize_question(row["text"])] = intent
+    return examples
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--labels", action="append", default=[], help="hand-labelled CSV or JSONL file")
+    parser.add_argument("--log", default=str(DATA_DIR / settings.INTENT_LOG_FILE) if settings.INTENT_LOG_FILE else None)
+    parser.add_argument("--features", type=int, default=2 ** 16, help="hashed feature buckets")
+    parser.add_argument("--epochs", type=int, default=300)
+    parser.add_argument("--holdout", type=float, default=0.2, help="fraction kept for evaluation")
+    args = parser.parse_args()
+
+    examples = {normalize_question(t): intent for intent, texts in SEED.items() for t in texts}
+    if args.log:
+        logged = _load_log(args.log)
+        print(f"{len(logged)} usable examples from {args.log}")
+        examples.update(logged)
+    for path in args.labels:
+        labelled = _load_labels(path)
+        print(f"{len(labelled)} examples from {path}")
+        examples.update(labelled)
+
+    items = list(examples.items())
+    random.Random(13).shuffle(items)
+    n_eval = int(len(items) * args.holdout) if len(items) >= 50 else 0
+    evaluation, training = items[:n_eval], items[n_eval:]
+
+    texts = [t for t, _ in training]
+    labels = [1 if intent == "database" else 0 for _, intent in training]
+    print(f"training on {len(training)} examples ({sum(labels)} database), {args.features} features")
+    model = IntentModel.train(texts, labels, n_features=args.features, epochs=args.epochs)
+
+    if evaluation:
+        correct = confident = confident_correct = 0
+        for text, intent in evaluation:
+            p = model.predict(text)
+            predicted = "database" if p >= 0.5 else "conversation"
+            correct += predicted == intent
+            if max(p, 1 - p) >= settings.INTENT_THRESHOLD:
+                confident += 1
+                confident_correct += predicted == intent
+        print(f"hold-out accuracy: {correct / len(evaluation):.3f} on {len(evaluation)} examples")
+        print(
+            f"above threshold {settings.INTENT_THRESHOLD}: {confident / len(evaluation):.1%} of messages, "
+            f"accuracy {confident_correct / max(confident, 1):.3f}"
+        )
+
+    start = time.perf_counter()
+    for text, _ in items[:1000]:
+        model.predict(text)
+    print(f"predict latency: {(time.perf_counter() - start) / min(len(items), 1000) * 1e6:.1f} us/message")
+
+    path = model_path()
+    model.save(path)
+    print(f"saved {path} ({path.stat().st_size} bytes)")
+
+
+if __name__ == "__main__":
+    main_cli()